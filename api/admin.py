@@ -119,5 +119,13 @@ admin.site.register(models.ShiftStatus)
 admin.site.register(models.ShiftNote)
 admin.site.register(models.Priority)
 admin.site.register(models.HouseKeepingState)
+admin.site.register(models.DailyOccupancy)
+admin.site.register(models.ReportWatermark)
+admin.site.register(models.ReportInvalidation)
+admin.site.register(models.DailyLabor)
+admin.site.register(models.FolioCharge)
+admin.site.register(models.NightAudit)
 # admin.site.register(IntervalSchedule)
 # admin.site.register(PeriodicTask)
+admin.site.register(models.OutboxEvent)
+admin.site.register(models.ComplaintRoutingRule)
@@ -0,0 +1,45 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from utils import reference
+
+
+class CachedSlugRelatedField(serializers.SlugRelatedField):
+    """
+    SlugRelatedField for reference tables: slugs and foreign keys are resolved
+    from the process-local reference cache instead of the database. Anything
+    the cache cannot answer, e.g. a row created in the current transaction or
+    a filtered queryset, falls back to the default behaviour.
+    """
+
+    def use_reference_cache(self) -> bool:
+        queryset = self.queryset
+        return (
+            queryset is not None
+            and reference.is_reference_model(queryset.model)
+            and not queryset.query.where
+        )
+
+    def to_internal_value(self, data):
+        if self.use_reference_cache():
+            obj = reference.get_by(self.queryset.model, self.slug_field, data)
+            if obj is not None:
+                return obj
+        return super().to_internal_value(data)
+
+    def get_attribute(self, instance):
+        if self.use_reference_cache() and "." not in self.source:
+            try:
+                field = instance._meta.get_field(self.source)
+                attname = field.attname
+            except (FieldDoesNotExist, AttributeError):
+                return super().get_attribute(instance)
+            if field.is_cached(instance):
+                # already loaded, e.g. through select_related()
+                return super().get_attribute(instance)
+            pk = getattr(instance, attname, None)
+            if pk is None:
+                return None
+            obj = reference.get(self.queryset.model, pk)
+            if obj is not None:
+                return obj
+        return super().get_attribute(instance)
@@ -1,5 +1,7 @@
 from django.contrib.auth.models import BaseUserManager
 from django.db import transaction
+from django.db.models import Manager
+from django.utils import timezone
 from rest_framework import serializers
 from . import models
 
@@ -52,3 +54,41 @@ class CustomUserManager(BaseUserManager):
             password=password,
             **extra_fields,
         )
+
+
+class OutboxEventManager(Manager):
+    def publish(self, event_type: str, instance, payload: dict = None):
+        '''
+        Records a domain event about `instance`. Call it inside the transaction
+        that makes the state change so the event is committed, or rolled back,
+        together with it.
+        '''
+        return self.create(
+            event_type=event_type,
+            aggregate_type=instance._meta.model_name,
+            aggregate_id=str(instance.pk),
+            payload=payload or {},
+        )
+
+    def publish_many(self, event_type: str, events: list) -> list:
+        '''
+        Records one event per (instance, payload) pair with a single insert.
+        '''
+        return self.bulk_create(
+            [
+                self.model(
+                    event_type=event_type,
+                    aggregate_type=instance._meta.model_name,
+                    aggregate_id=str(instance.pk),
+                    payload=payload or {},
+                )
+                for instance, payload in events
+            ]
+        )
+
+    def pending(self, max_attempts: int):
+        return self.filter(
+            processed_at__isnull=True,
+            available_at__lte=timezone.now(),
+            attempts__lt=max_attempts,
+        )
@@ -0,0 +1,483 @@
+# Generated by Django 5.1.2 on 2026-10-19 12:47
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+def copy_room_amenities(apps, schema_editor):
+    Room = apps.get_model('api', 'Room')
+    RoomAmenity = apps.get_model('api', 'RoomAmenity')
+    RoomAmenity.objects.bulk_create(
+        [
+            RoomAmenity(room_id=room_id, amenity_id=amenity_id)
+            for room_id, amenity_id in Room.amenities.through.objects.values_list(
+                'room_id', 'amenity_id'
+            ).iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0029_customuser_email'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='guest',
+            options={'verbose_name': 'Guest', 'verbose_name_plural': 'Guests'},
+        ),
+        migrations.RemoveField(
+            model_name='booking',
+            name='amount_paid',
+        ),
+        migrations.RemoveField(
+            model_name='booking',
+            name='arrival_mode',
+        ),
+        migrations.RemoveField(
+            model_name='booking',
+            name='modified_by',
+        ),
+        migrations.RemoveField(
+            model_name='booking',
+            name='number_of_older_guests',
+        ),
+        migrations.RemoveField(
+            model_name='booking',
+            name='number_of_younger_guests',
+        ),
+        migrations.RemoveField(
+            model_name='booking',
+            name='promo_code',
+        ),
+        migrations.RemoveField(
+            model_name='booking',
+            name='rate',
+        ),
+        migrations.RemoveField(
+            model_name='booking',
+            name='receipt',
+        ),
+        migrations.RemoveField(
+            model_name='booking',
+            name='room',
+        ),
+        migrations.RemoveField(
+            model_name='booking',
+            name='room_number',
+        ),
+        migrations.RemoveField(
+            model_name='booking',
+            name='vip_status',
+        ),
+        migrations.RemoveField(
+            model_name='guest',
+            name='loyalty_programs',
+        ),
+        migrations.RemoveField(
+            model_name='passwordreset',
+            name='token',
+        ),
+        migrations.RemoveField(
+            model_name='room',
+            name='max_guests',
+        ),
+        migrations.RemoveField(
+            model_name='room',
+            name='rate',
+        ),
+        migrations.RemoveField(
+            model_name='roomcategory',
+            name='amenities',
+        ),
+        migrations.RemoveField(
+            model_name='roomtype',
+            name='area_in_feet',
+        ),
+        migrations.RemoveField(
+            model_name='roomtype',
+            name='area_in_meters',
+        ),
+        migrations.RemoveField(
+            model_name='roomtype',
+            name='bed_types',
+        ),
+        migrations.RemoveField(
+            model_name='roomtype',
+            name='max_guests',
+        ),
+        migrations.RemoveField(
+            model_name='roomtype',
+            name='rate',
+        ),
+        migrations.RemoveField(
+            model_name='roomtype',
+            name='room_category',
+        ),
+        migrations.RemoveField(
+            model_name='roomtype',
+            name='view',
+        ),
+        migrations.AddField(
+            model_name='amenity',
+            name='description',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='amenity',
+            name='icon',
+            field=models.ImageField(blank=True, null=True, upload_to='amenities_icons'),
+        ),
+        migrations.AddField(
+            model_name='bedtype',
+            name='description',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='booking_cost',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=11),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='booking_source',
+            field=models.CharField(choices=[('walk-in', 'Walk-in'), ('online', 'Online'), ('phone', 'Phone'), ('email', 'Email'), ('travel-agency', 'Travel Agency'), ('corporate', 'Corporate'), ('other', 'Other')], default='walk-in', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='booking_status',
+            field=models.CharField(choices=[('confirmed', 'Confirmed'), ('cancelled', 'Cancelled'), ('checked-in', 'Checked In'), ('checked-out', 'Checked Out'), ('no-show', 'No Show'), ('pending', 'Pending')], default='pending', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='number_of_children_guests',
+            field=models.PositiveIntegerField(blank=True, default=0, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='sponsor_type',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bookings', to='api.sponsortype'),
+        ),
+        migrations.AddField(
+            model_name='country',
+            name='created_by',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.profile'),
+        ),
+        migrations.AddField(
+            model_name='country',
+            name='date_created',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='user_category',
+            field=models.CharField(blank=True, choices=[('staff', 'Staff'), ('guest', 'Guest')], max_length=30, null=True),
+        ),
+        migrations.AddField(
+            model_name='department',
+            name='created_by',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='department',
+            name='date_created',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='department',
+            name='description',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='gender',
+            name='created_by',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='genders_created', to='api.profile'),
+        ),
+        migrations.AddField(
+            model_name='gender',
+            name='date_created',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='guest',
+            name='created_by',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='guests_created', to='api.profile'),
+        ),
+        migrations.AddField(
+            model_name='guest',
+            name='date_created',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='guest',
+            name='user',
+            field=models.OneToOneField(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='guest_profile', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='hotelfloor',
+            name='description',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='hotelview',
+            name='description',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='identificationtype',
+            name='created_by',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.profile'),
+        ),
+        migrations.AddField(
+            model_name='identificationtype',
+            name='date_created',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='identificationtype',
+            name='description',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='nametitle',
+            name='created_by',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.profile'),
+        ),
+        migrations.AddField(
+            model_name='nametitle',
+            name='date_created',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='nametitle',
+            name='description',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='passwordreset',
+            name='reset_code',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='passwordreset',
+            name='reset_token',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddField(
+            model_name='role',
+            name='description',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='current_guest',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.guest'),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='current_price',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='is_available',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='is_cleaned',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='max_occupancy',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='room_area',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='room_view',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.hotelview'),
+        ),
+        migrations.AddField(
+            model_name='roomcategory',
+            name='description',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='roomcategory',
+            name='room_area',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='roomtype',
+            name='base_price',
+            field=models.DecimalField(decimal_places=2, default=0.0, max_digits=10),
+        ),
+        migrations.AddField(
+            model_name='roomtype',
+            name='max_occupancy',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='bedtype',
+            name='name',
+            field=models.CharField(max_length=255, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='payment_status',
+            field=models.CharField(choices=[('paid', 'Paid'), ('unpaid', 'Unpaid'), ('partially-paid', 'Partially Paid'), ('refunded', 'Refunded')], default='unpaid', max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='department',
+            name='name',
+            field=models.CharField(db_index=True, max_length=255, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='hotelfloor',
+            name='name',
+            field=models.CharField(max_length=255, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='hotelview',
+            name='name',
+            field=models.CharField(max_length=255, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='role',
+            name='name',
+            field=models.CharField(db_index=True, max_length=255, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='room',
+            name='room_maintenance_status',
+            field=models.CharField(choices=[('default', 'Default'), ('cleaned', 'Cleaned'), ('under-maintenance', 'Under-maintenance'), ('broken', 'Broken')], default='default', max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='room',
+            name='room_number',
+            field=models.CharField(db_index=True, max_length=255, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='room',
+            name='room_type',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rooms', to='api.roomtype'),
+        ),
+        migrations.AlterField(
+            model_name='roomtype',
+            name='amenities',
+            field=models.ManyToManyField(related_name='room_types', to='api.amenity'),
+        ),
+        migrations.AlterField(
+            model_name='roomtype',
+            name='name',
+            field=models.CharField(max_length=255, unique=True),
+        ),
+        migrations.AlterModelTable(
+            name='guest',
+            table='guest',
+        ),
+        migrations.CreateModel(
+            name='BookingPayment',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('amount_paid', models.DecimalField(decimal_places=2, default=0.0, max_digits=11)),
+                ('payment_timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+                ('date_modified', models.DateTimeField(auto_now=True)),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payments', to='api.booking')),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='booking_payments', to='api.profile')),
+                ('last_modified_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='modified_booking_payments', to='api.profile')),
+                ('payment_method', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.paymentmethod')),
+                ('receipt', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='booking_payments', to='api.receipt')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='RoomAmenity',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('quantity', models.IntegerField(default=1)),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+                ('amenity', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='room_amenities', to='api.amenity')),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.profile')),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='room_amenities', to='api.room')),
+            ],
+            options={
+                'verbose_name': 'Room Amenity',
+                'verbose_name_plural': 'Room Amenities',
+                'db_table': 'roomamenity',
+                'abstract': False,
+            },
+        ),
+        # a plain many-to-many cannot be altered into one with a through
+        # model, so the links are copied over before the old table goes
+        migrations.RunPython(copy_room_amenities, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='room',
+            name='amenities',
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='amenities',
+            field=models.ManyToManyField(related_name='rooms', through='api.RoomAmenity', to='api.amenity'),
+        ),
+        migrations.CreateModel(
+            name='RoomImage',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('image', models.ImageField(upload_to='room_images')),
+                ('caption', models.TextField(blank=True, null=True)),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.profile')),
+                ('room', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='room_images', to='api.room')),
+            ],
+            options={
+                'verbose_name': 'Room Image',
+                'verbose_name_plural': 'Room Images',
+                'db_table': 'roomimage',
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='RoomRate',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('start_date', models.DateField(default=django.utils.timezone.now)),
+                ('end_date', models.DateField(default=django.utils.timezone.now)),
+                ('price', models.DecimalField(decimal_places=2, default=0.0, max_digits=10)),
+                ('discount', models.DecimalField(blank=True, decimal_places=2, default=0.0, max_digits=5, null=True)),
+                ('notes', models.TextField(blank=True, null=True)),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+                ('date_modified', models.DateTimeField(auto_now=True)),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.profile')),
+                ('last_modified_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='modified_room_rates', to='api.profile')),
+                ('room_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='room_rates', to='api.roomtype')),
+            ],
+            options={
+                'verbose_name': 'Room Rate',
+                'verbose_name_plural': 'Room Rates',
+                'db_table': 'roomrate',
+                'abstract': False,
+            },
+        ),
+    ]
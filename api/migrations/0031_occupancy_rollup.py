@@ -0,0 +1,76 @@
+# Generated by Django 5.1.2 on 2026-10-19 12:48
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0030_sync_models'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReportInvalidation',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('name', models.CharField(db_index=True, max_length=255)),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Report Invalidation',
+                'verbose_name_plural': 'Report Invalidations',
+                'db_table': 'reportinvalidation',
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ReportWatermark',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('last_processed', models.DateTimeField(blank=True, null=True)),
+                ('date_modified', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Report Watermark',
+                'verbose_name_plural': 'Report Watermarks',
+                'db_table': 'reportwatermark',
+                'abstract': False,
+            },
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='date_modified',
+            field=models.DateTimeField(auto_now=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='DailyOccupancy',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('date', models.DateField(db_index=True)),
+                ('booking_source', models.CharField(choices=[('walk-in', 'Walk-in'), ('online', 'Online'), ('phone', 'Phone'), ('email', 'Email'), ('travel-agency', 'Travel Agency'), ('corporate', 'Corporate'), ('other', 'Other')], default='walk-in', max_length=255)),
+                ('rooms_sold', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0.0, max_digits=13)),
+                ('guests', models.PositiveIntegerField(default=0)),
+                ('arrivals', models.PositiveIntegerField(default=0)),
+                ('departures', models.PositiveIntegerField(default=0)),
+                ('no_shows', models.PositiveIntegerField(default=0)),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+                ('room_type', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_occupancy', to='api.roomtype')),
+                ('sponsor_type', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_occupancy', to='api.sponsortype')),
+            ],
+            options={
+                'verbose_name': 'Daily Occupancy',
+                'verbose_name_plural': 'Daily Occupancy',
+                'db_table': 'dailyoccupancy',
+                'ordering': ['date'],
+                'abstract': False,
+                'indexes': [models.Index(fields=['date', 'room_type'], name='dailyoccupa_date_33e3bc_idx')],
+            },
+        ),
+    ]
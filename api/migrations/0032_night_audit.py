@@ -0,0 +1,62 @@
+# Generated by Django 5.1.2 on 2026-10-19 12:48
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0031_occupancy_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NightAudit',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('business_date', models.DateField(unique=True)),
+                ('no_shows', models.PositiveIntegerField(default=0)),
+                ('overstays', models.PositiveIntegerField(default=0)),
+                ('room_charges_posted', models.PositiveIntegerField(default=0)),
+                ('room_revenue_posted', models.DecimalField(decimal_places=2, default=0.0, max_digits=13)),
+                ('started_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Night Audit',
+                'verbose_name_plural': 'Night Audits',
+                'db_table': 'nightaudit',
+                'ordering': ['-business_date'],
+                'abstract': False,
+            },
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='is_overstay',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='FolioCharge',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('charge_date', models.DateField(default=django.utils.timezone.now)),
+                ('charge_type', models.CharField(choices=[('room', 'Room'), ('extra', 'Extra'), ('adjustment', 'Adjustment')], default='room', max_length=255)),
+                ('description', models.CharField(blank=True, max_length=255, null=True)),
+                ('amount', models.DecimalField(decimal_places=2, default=0.0, max_digits=11)),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='folio_charges', to='api.booking')),
+                ('posted_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='folio_charges', to='api.profile')),
+            ],
+            options={
+                'verbose_name': 'Folio Charge',
+                'verbose_name_plural': 'Folio Charges',
+                'db_table': 'foliocharge',
+                'ordering': ['charge_date'],
+                'abstract': False,
+                'constraints': [models.UniqueConstraint(fields=('booking', 'charge_date', 'charge_type'), name='unique_folio_charge_per_day')],
+            },
+        ),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.1.2 on 2026-10-19 12:48
+
+import django.db.models.deletion
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_booking_nights(apps, schema_editor):
+    # bookings made before nights were recorded would otherwise look like free
+    # inventory; each night is priced at the booking's average nightly cost
+    Booking = apps.get_model('api', 'Booking')
+    BookingNight = apps.get_model('api', 'BookingNight')
+    db_alias = schema_editor.connection.alias
+    missing = (
+        Booking.objects.using(db_alias)
+        .filter(nights__isnull=True)
+        .values_list('id', 'room_type_id', 'check_in_date', 'check_out_date', 'booking_cost')
+    )
+    nights = []
+    for booking_id, room_type_id, check_in_date, check_out_date, booking_cost in missing.iterator():
+        first_night = timezone.localtime(check_in_date).date()
+        stay = [
+            first_night + timedelta(days=offset)
+            for offset in range((timezone.localtime(check_out_date).date() - first_night).days)
+        ]
+        average_rate = (Decimal(booking_cost or 0) / max(len(stay), 1)).quantize(Decimal('0.01'))
+        nights.extend(
+            BookingNight(booking_id=booking_id, night=night, room_type_id=room_type_id, rate=average_rate)
+            for night in stay
+        )
+        if len(nights) >= 1000:
+            BookingNight.objects.using(db_alias).bulk_create(nights)
+            nights = []
+    BookingNight.objects.using(db_alias).bulk_create(nights)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0032_night_audit'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingNight',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('night', models.DateField()),
+                ('rate', models.DecimalField(decimal_places=2, default=0.0, max_digits=11)),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='nights', to='api.booking')),
+                ('room_type', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='booked_nights', to='api.roomtype')),
+            ],
+            options={
+                'verbose_name': 'Booking Night',
+                'verbose_name_plural': 'Booking Nights',
+                'db_table': 'bookingnight',
+                'ordering': ['night'],
+                'abstract': False,
+                'indexes': [models.Index(fields=['room_type', 'night'], name='bookingnigh_room_ty_94d9ab_idx')],
+                'constraints': [models.UniqueConstraint(fields=('booking', 'night'), name='unique_booking_night')],
+            },
+        ),
+        migrations.RunPython(backfill_booking_nights, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.2 on 2026-10-19 12:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0035_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='roomamenity',
+            name='from_room_type',
+            field=models.BooleanField(default=False),
+        ),
+    ]
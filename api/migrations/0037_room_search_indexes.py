@@ -0,0 +1,21 @@
+# Generated by Django 5.1.2 on 2026-10-19 12:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0036_roomamenity_from_room_type'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['current_price'], name='room_current_c0ed1c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='room',
+            index=models.Index(fields=['max_occupancy'], name='room_max_occ_272a78_idx'),
+        ),
+    ]
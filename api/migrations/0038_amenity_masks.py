@@ -0,0 +1,66 @@
+# Generated by Django 5.1.2 on 2026-10-19 12:48
+
+from collections import defaultdict
+from django.db import migrations, models
+
+# the bits of a signed BigIntegerField mask, as api.models.AMENITY_MASK_BITS
+AMENITY_MASK_BITS = 63
+
+
+def backfill_amenity_masks(apps, schema_editor):
+    # amenities and rooms saved before the masks existed have no bit or a zero
+    # mask, and would never match the bitwise amenity filter
+    Amenity = apps.get_model('api', 'Amenity')
+    Room = apps.get_model('api', 'Room')
+    RoomType = apps.get_model('api', 'RoomType')
+    RoomAmenity = apps.get_model('api', 'RoomAmenity')
+    db_alias = schema_editor.connection.alias
+    amenities = Amenity.objects.using(db_alias)
+    bits = dict(amenities.exclude(bit=None).values_list('id', 'bit'))
+    free = (bit for bit in range(AMENITY_MASK_BITS) if bit not in bits.values())
+    for amenity_id in amenities.filter(bit=None).order_by('date_created').values_list('id', flat=True):
+        bit = next(free, None)
+        if bit is None:
+            break
+        amenities.filter(id=amenity_id).update(bit=bit)
+        bits[amenity_id] = bit
+
+    for model, assignments in (
+        (Room, RoomAmenity.objects.values_list('room_id', 'amenity_id')),
+        (RoomType, RoomType.amenities.through.objects.values_list('roomtype_id', 'amenity_id')),
+    ):
+        masks = defaultdict(int)
+        for owner_id, amenity_id in assignments.using(db_alias).iterator():
+            if amenity_id in bits:
+                masks[owner_id] |= 1 << bits[amenity_id]
+        owners_by_mask = defaultdict(list)
+        for owner_id, mask in masks.items():
+            owners_by_mask[mask].append(owner_id)
+        for mask, ids in owners_by_mask.items():
+            model.objects.using(db_alias).filter(id__in=ids).update(amenity_mask=mask)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0037_room_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='amenity',
+            name='bit',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='amenity_mask',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='roomtype',
+            name='amenity_mask',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_amenity_masks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.1.2 on 2026-10-19 12:49
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+def seed_assigned_status(apps, schema_editor):
+    # routed complaints are moved to this status; databases that already have
+    # it under another spelling keep theirs
+    ComplaintStatus = apps.get_model('api', 'ComplaintStatus')
+    statuses = ComplaintStatus.objects.using(schema_editor.connection.alias)
+    if not statuses.filter(name__iexact='assigned').exists():
+        statuses.create(name='Assigned')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0038_amenity_masks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintRoutingRule',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('is_active', models.BooleanField(default=True)),
+                ('keywords', models.TextField(blank=True, default='')),
+                ('active_from', models.TimeField(blank=True, null=True)),
+                ('active_to', models.TimeField(blank=True, null=True)),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+                ('amenities', models.ManyToManyField(blank=True, related_name='routing_rules', to='api.amenity')),
+                ('department', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.department')),
+                ('floors', models.ManyToManyField(blank=True, related_name='routing_rules', to='api.hotelfloor')),
+                ('hashtags', models.ManyToManyField(blank=True, related_name='routing_rules', to='api.hashtag')),
+                ('priority', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='api.priority')),
+            ],
+            options={
+                'verbose_name': 'Complaint Routing Rule',
+                'verbose_name_plural': 'Complaint Routing Rules',
+                'db_table': 'complaintroutingrule',
+                'ordering': ['position', 'date_created'],
+                'abstract': False,
+            },
+        ),
+        migrations.RunPython(seed_assigned_status, migrations.RunPython.noop),
+    ]
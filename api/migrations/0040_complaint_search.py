@@ -0,0 +1,74 @@
+# Generated by Django 5.1.2 on 2026-10-19 12:49
+
+import django.contrib.postgres.search
+import django.db.models.deletion
+import uuid
+from django.contrib.postgres.indexes import GinIndex
+from django.db import migrations, models
+
+SEARCH_VECTOR_INDEX = GinIndex(fields=['search_vector'], name='complaint_search_vector_idx')
+# must match utils.complaint_search.FTS_TABLE
+FTS_TABLE = 'complaint_fts'
+
+
+def create_search_index(apps, schema_editor):
+    # PostgreSQL searches a GIN index over the tsvector column and SQLite an
+    # FTS5 table; other databases scan the stored documents
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.add_index(
+            apps.get_model('api', 'ComplaintSearchDocument'), SEARCH_VECTOR_INDEX
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5('
+            "complaint_id UNINDEXED, title, body, tokenize='porter unicode61')"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.remove_index(
+            apps.get_model('api', 'ComplaintSearchDocument'), SEARCH_VECTOR_INDEX
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0039_complaint_routing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintSearchDocument',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('title', models.TextField(blank=True, default='')),
+                ('body', models.TextField(blank=True, default='')),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(editable=False, null=True)),
+                ('date_modified', models.DateTimeField(auto_now=True)),
+                ('complaint', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='search_document', to='api.complaint')),
+            ],
+            options={
+                'verbose_name': 'Complaint Search Document',
+                'verbose_name_plural': 'Complaint Search Documents',
+                'db_table': 'complaintsearchdocument',
+                'abstract': False,
+            },
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='complaintsearchdocument',
+                    index=SEARCH_VECTOR_INDEX,
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_index, drop_search_index),
+            ],
+        ),
+    ]
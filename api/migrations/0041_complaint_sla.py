@@ -0,0 +1,53 @@
+# Generated by Django 5.1.2 on 2026-10-19 12:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def seed_escalated_status(apps, schema_editor):
+    # overdue assignments are moved to this status; databases that already
+    # have it under another spelling keep theirs
+    ComplaintStatus = apps.get_model('api', 'ComplaintStatus')
+    statuses = ComplaintStatus.objects.using(schema_editor.connection.alias)
+    if not statuses.filter(name__iexact='escalated').exists():
+        statuses.create(name='Escalated')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0040_complaint_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assigncomplaint',
+            name='due_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='assigncomplaint',
+            name='escalation_level',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='department',
+            name='head',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='departments_headed', to='api.profile'),
+        ),
+        migrations.AddField(
+            model_name='priority',
+            name='escalate_to',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.priority'),
+        ),
+        migrations.AddField(
+            model_name='priority',
+            name='sla_minutes',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='assigncomplaint',
+            index=models.Index(condition=models.Q(('due_at__isnull', False)), fields=['due_at'], name='assigncomplaint_due_idx'),
+        ),
+        migrations.RunPython(seed_escalated_status, migrations.RunPython.noop),
+    ]
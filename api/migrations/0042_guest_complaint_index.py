@@ -0,0 +1,22 @@
+# Generated by Django 5.1.2 on 2026-10-19 12:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0041_complaint_sla'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='booking',
+            name='booking_code',
+            field=models.CharField(blank=True, db_index=True, max_length=255, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='checkin',
+            index=models.Index(condition=models.Q(('checked_out', False)), fields=['booking_code', 'room_number'], name='checkin_in_house_code_idx'),
+        ),
+    ]
@@ -0,0 +1,76 @@
+# Generated by Django 5.1.2 on 2026-10-19 12:49
+
+import django.contrib.postgres.constraints
+import django.contrib.postgres.fields.ranges
+from datetime import timedelta
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+
+SHIFT_OVERLAP_CONSTRAINT = django.contrib.postgres.constraints.ExclusionConstraint(
+    condition=models.Q(('shift_end_time__gt', models.F('shift_start_time'))),
+    expressions=[
+        ('profile', '='),
+        (
+            models.Func(
+                'shift_start_time',
+                'shift_end_time',
+                function='TSTZRANGE',
+                output_field=django.contrib.postgres.fields.ranges.DateTimeRangeField(),
+            ),
+            '&&',
+        ),
+    ],
+    name='profileshiftassign_no_overlap',
+)
+
+
+def roll_overnight_shifts(apps, schema_editor):
+    # overnight assignments used to end on their start day; moved to the next
+    # day they can be compared as intervals and checked by the constraint
+    ProfileShiftAssign = apps.get_model('api', 'ProfileShiftAssign')
+    ProfileShiftAssign.objects.using(schema_editor.connection.alias).filter(
+        shift_start_time__isnull=False, shift_end_time__lte=models.F('shift_start_time')
+    ).update(shift_end_time=models.F('shift_end_time') + timedelta(days=1))
+
+
+def add_overlap_constraint(apps, schema_editor):
+    # exclusion constraints exist on PostgreSQL only; other databases rely on
+    # the overlap checks made before every insert
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.add_constraint(
+            apps.get_model('api', 'ProfileShiftAssign'), SHIFT_OVERLAP_CONSTRAINT
+        )
+
+
+def remove_overlap_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.remove_constraint(
+            apps.get_model('api', 'ProfileShiftAssign'), SHIFT_OVERLAP_CONSTRAINT
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0042_guest_complaint_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='profileshiftassign',
+            index=models.Index(fields=['profile', 'shift_start_time', 'shift_end_time'], name='shiftassign_interval_idx'),
+        ),
+        BtreeGistExtension(),
+        migrations.RunPython(roll_overnight_shifts, migrations.RunPython.noop),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddConstraint(
+                    model_name='profileshiftassign',
+                    constraint=SHIFT_OVERLAP_CONSTRAINT,
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(add_overlap_constraint, remove_overlap_constraint),
+            ],
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.1.2 on 2026-10-19 12:49
+
+from django.db import migrations, models
+from django.utils import timezone
+
+# as ProfileShiftAssign.SCHEDULED_STATUS and FINAL_STATUSES
+SCHEDULED_STATUS = 'Pending'
+FINAL_STATUSES = ['Ended', 'Expired', 'Cancelled']
+
+
+def backfill_transitions(apps, schema_editor):
+    # shifts saved before next_transition_at existed get the time
+    # ProfileShiftAssign.next_transition() would give them, so the scheduler
+    # starts or expires them; shifts that ended under a status that does not
+    # change after expiry are left alone, as the scheduler would leave them
+    ProfileShiftAssign = apps.get_model('api', 'ProfileShiftAssign')
+    ShiftStatus = apps.get_model('api', 'ShiftStatus')
+    db_alias = schema_editor.connection.alias
+    statuses = ShiftStatus.objects.using(db_alias)
+    legacy = (
+        ProfileShiftAssign.objects.using(db_alias)
+        .filter(next_transition_at__isnull=True)
+        .exclude(status_id__in=statuses.filter(name__in=FINAL_STATUSES).values('id'))
+        .exclude(
+            shift_end_time__lte=timezone.now(),
+            status_id__in=statuses.exclude(change_after_expiry=True).values('id'),
+        )
+    )
+    scheduled = models.Q(status__isnull=True) | models.Q(
+        status_id__in=statuses.filter(name=SCHEDULED_STATUS).values('id')
+    )
+    legacy.filter(scheduled, shift_start_time__isnull=False).update(
+        next_transition_at=models.F('shift_start_time')
+    )
+    legacy.filter(shift_end_time__isnull=False).update(
+        next_transition_at=models.F('shift_end_time')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0043_shift_overlaps'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profileshiftassign',
+            name='next_transition_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='profileshiftassign',
+            index=models.Index(condition=models.Q(('next_transition_at__isnull', False)), fields=['next_transition_at'], name='shiftassign_transition_idx'),
+        ),
+        migrations.RunPython(backfill_transitions, migrations.RunPython.noop),
+    ]
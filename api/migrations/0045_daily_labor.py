@@ -0,0 +1,39 @@
+# Generated by Django 5.1.2 on 2026-10-19 12:49
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0044_shift_transitions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyLabor',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('date', models.DateField(db_index=True)),
+                ('shifts', models.PositiveIntegerField(default=0)),
+                ('scheduled_hours', models.DecimalField(decimal_places=2, default=0.0, max_digits=7)),
+                ('hours_worked', models.DecimalField(decimal_places=2, default=0.0, max_digits=7)),
+                ('overtime_hours', models.DecimalField(decimal_places=2, default=0.0, max_digits=7)),
+                ('tasks_completed', models.PositiveIntegerField(default=0)),
+                ('rooms_cleaned', models.PositiveIntegerField(default=0)),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+                ('department', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_labor', to='api.department')),
+                ('profile', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_labor', to='api.profile')),
+            ],
+            options={
+                'verbose_name': 'Daily Labor',
+                'verbose_name_plural': 'Daily Labor',
+                'db_table': 'dailylabor',
+                'ordering': ['date'],
+                'abstract': False,
+                'indexes': [models.Index(fields=['department', 'date'], name='dailylabor_departm_087126_idx')],
+            },
+        ),
+    ]
@@ -4,13 +4,18 @@ from django.utils import timezone
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
-from utils import defaults, choices
+from utils import defaults, choices, reference
 import uuid, datetime
 from . import managers
 from django.conf import settings
 from utils.system_variables import PASSWORD_RESET
 from rest_framework import serializers
-from django.db import transaction
+from django.db import IntegrityError, transaction
+from django.core.serializers.json import DjangoJSONEncoder
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateTimeRangeField, RangeOperators
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 
 # Create your models here.
 
@@ -28,6 +33,14 @@ class Department(BaseModel):
         settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True
     )
     date_created = models.DateTimeField(auto_now_add=True)
+    # receives the department's overdue complaints
+    head = models.ForeignKey(
+        "Profile",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="departments_headed",
+    )
 
     def __str__(self):
         return f"{self.name}"
@@ -110,6 +123,7 @@ class Profile(BaseModel):
     )
     birthdate = models.DateField(null=True)
     photo = models.ImageField(upload_to=profile_photo_upload_path, null=True)
+    photo_variants = models.JSONField(default=dict, blank=True)
     phone_number = models.CharField(max_length=30, blank=True, null=True)
     email = models.EmailField(blank=True, null=True)
     residential_address = models.CharField(max_length=255, blank=True, null=True)
@@ -202,22 +216,97 @@ class ProfileShiftAssign(BaseModel):
     status = models.ForeignKey(ShiftStatus, on_delete=models.SET_NULL, null=True)
     time_started = models.DateTimeField(null=True, blank=True)
     time_ended = models.DateTimeField(null=True, blank=True)
+    # when the lifecycle scheduler next has to start or expire the shift
+    next_transition_at = models.DateTimeField(null=True, blank=True)
+
+    SCHEDULED_STATUS = "Pending"
+    STARTED_STATUS = "Started"
+    EXPIRED_STATUS = "Expired"
+    FINAL_STATUSES = ["Ended", "Expired", "Cancelled"]
 
     def __str__(self):
         return f"{datetime.datetime.strftime(self.date, '%a %d %b %Y')} - {self.profile} - {self.shift}"
 
+    def save(self, *args, **kwargs):
+        self.next_transition_at = self.next_transition()
+        super().save(*args, **kwargs)
+
+    def next_transition(self):
+        """
+        A scheduled shift is next due at its start, any other shift still
+        running at its end, and a finished shift never.
+        """
+        status = (reference.get(ShiftStatus, self.status_id) or self.status) if self.status_id else None
+        status_name = status.name if status else self.SCHEDULED_STATUS
+        if status_name in self.FINAL_STATUSES:
+            return None
+        if status_name == self.SCHEDULED_STATUS and self.shift_start_time:
+            return self.shift_start_time
+        return self.shift_end_time
+
     @property
     def is_ended(self):
         return self.shift_end_time >= timezone.now()
 
-    def change_status(self, new_status):
-        self.status = ShiftStatus.objects.get(name=new_status)
+    def change_status(self, new_status, changed_by=None):
+        if not isinstance(new_status, ShiftStatus):
+            new_status = reference.get_by(
+                ShiftStatus, "name", new_status
+            ) or ShiftStatus.objects.get(name=new_status)
+        previous_status = self.status.name if self.status_id else None
+        self.status = new_status
+        OutboxEvent.objects.publish(
+            "shift.status_changed",
+            self,
+            {
+                "profile": self.profile_id,
+                "date": self.date,
+                "previous_status": previous_status,
+                "status": new_status.name,
+                "changed_by": getattr(changed_by, "id", None),
+            },
+        )
 
     class Meta(BaseModel.Meta):
         db_table = "profileshiftassign"
         verbose_name = "Shift Assignment"
         verbose_name_plural = "Shift Assignments"
         ordering = ["-date"]
+        indexes = [
+            # overlap checks scan one person's intervals by start time
+            models.Index(
+                fields=["profile", "shift_start_time", "shift_end_time"],
+                name="shiftassign_interval_idx",
+            ),
+            # the lifecycle scheduler only ever reads shifts still to change
+            models.Index(
+                fields=["next_transition_at"],
+                name="shiftassign_transition_idx",
+                condition=models.Q(next_transition_at__isnull=False),
+            ),
+        ]
+        constraints = [
+            # on PostgreSQL the database itself refuses two overlapping shifts
+            # for one person; other databases rely on the checks in utils.rosters
+            ExclusionConstraint(
+                name="profileshiftassign_no_overlap",
+                expressions=[
+                    ("profile", RangeOperators.EQUAL),
+                    (
+                        models.Func(
+                            "shift_start_time",
+                            "shift_end_time",
+                            function="TSTZRANGE",
+                            output_field=DateTimeRangeField(),
+                        ),
+                        RangeOperators.OVERLAPS,
+                    ),
+                ],
+                # rows without both times, or not yet rolled to end after
+                # they start, would not make a valid range
+                condition=models.Q(shift_end_time__gt=models.F("shift_start_time")),
+            ),
+        ]
 
 class ShiftNote(BaseModel):
     assigned_shift = models.OneToOneField(
@@ -274,16 +363,44 @@ class HotelView(BaseModel):
         verbose_name = "Hotel View"
         verbose_name_plural = "Hotel Views"
 
+# amenity_mask columns are signed 64-bit integers
+AMENITY_MASK_BITS = 63
+AMENITY_BIT_ATTEMPTS = 5
+
 class Amenity(BaseModel):
     name = models.CharField(max_length=255, unique=True)
     created_by = models.ForeignKey(Profile, on_delete=models.SET_NULL, null=True)
     date_created = models.DateTimeField(auto_now_add=True)
     icon = models.ImageField(upload_to="amenities_icons", null=True, blank=True)
     description = models.TextField(blank=True, null=True)
+    # position of the amenity in Room.amenity_mask and RoomType.amenity_mask,
+    # None once every bit is taken
+    bit = models.PositiveSmallIntegerField(unique=True, null=True, blank=True, editable=False)
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if not (self._state.adding and self.bit is None):
+            return super().save(*args, **kwargs)
+        # two amenities created at once can pick the same free bit: the loser
+        # hits the unique constraint and retries with the next free one
+        for _ in range(AMENITY_BIT_ATTEMPTS):
+            taken = set(Amenity.objects.exclude(bit=None).values_list("bit", flat=True))
+            self.bit = next(
+                (bit for bit in range(AMENITY_MASK_BITS) if bit not in taken), None
+            )
+            if self.bit is None:
+                break
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                if not Amenity.objects.filter(bit=self.bit).exists():
+                    raise
+        self.bit = None
+        super().save(*args, **kwargs)
+
     class Meta(BaseModel.Meta):
         db_table = "amenities"
         verbose_name = "Amenity"
@@ -322,6 +439,7 @@ class RoomType(BaseModel):
     name = models.CharField(max_length=255, unique=True) # e.g. Single, Double, Suite, Deluxe, Executive, Premium, Presidential, etc.
     max_occupancy = models.IntegerField(default=0)
     amenities = models.ManyToManyField(Amenity, related_name="room_types")
+    amenity_mask = models.BigIntegerField(default=0, editable=False)
     base_price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     created_by = models.ForeignKey(Profile, on_delete=models.SET_NULL, null=True)
     date_created = models.DateTimeField(auto_now_add=True)
@@ -361,6 +479,7 @@ class Room(BaseModel):
         max_length=255, choices=choices.ROOM_BOOKING_STATUS_CHOICES, default="default"
     ) # e.g. booked, empty, etc.
     amenities = models.ManyToManyField(Amenity, through="RoomAmenity", related_name="rooms")
+    amenity_mask = models.BigIntegerField(default=0, editable=False)
     current_guest = models.ForeignKey("Guest", on_delete=models.SET_NULL, null=True, blank=True)
     current_price = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
     date_created = models.DateTimeField(auto_now_add=True)
@@ -408,6 +527,11 @@ class Room(BaseModel):
 
     class Meta(BaseModel.Meta):
         db_table = "room"
+        # facet filters and counts in room search
+        indexes = [
+            models.Index(fields=["current_price"]),
+            models.Index(fields=["max_occupancy"]),
+        ]
 
 class RoomAmenity(BaseModel):
     room = models.ForeignKey(
@@ -417,6 +541,9 @@ class RoomAmenity(BaseModel):
         Amenity, on_delete=models.CASCADE, related_name="room_amenities"
     )
     quantity = models.IntegerField(default=1)
+    # set when the row was inherited from the room type rather than given
+    # to the room on its own, so type changes only touch their own rows
+    from_room_type = models.BooleanField(default=False)
     created_by = models.ForeignKey(Profile, on_delete=models.SET_NULL, null=True)
     date_created = models.DateTimeField(auto_now_add=True)
 
@@ -459,6 +586,7 @@ class RoomImage(BaseModel):
         Room, on_delete=models.CASCADE, related_name="room_images"
     )
     image = models.ImageField(upload_to="room_images")
+    image_variants = models.JSONField(default=dict, blank=True)
     caption = models.TextField(blank=True, null=True)
     created_by = models.ForeignKey(Profile, on_delete=models.SET_NULL, null=True)
     date_created = models.DateTimeField(auto_now_add=True)
@@ -549,9 +677,21 @@ class RoomKeepingAssign(BaseModel):
         with transaction.atomic():
             self.room_keeping_status_processes.create(
                 room_number=self.room.room_number,
-                status=HouseKeepingState.objects.get(name=new_status),
+                status=reference.get_by(HouseKeepingState, "name", new_status)
+                or HouseKeepingState.objects.get(name=new_status),
                 created_by=created_by,
             )
+            OutboxEvent.objects.publish(
+                "room_keeping.status_changed",
+                self,
+                {
+                    "room": self.room_id,
+                    "room_number": self.room.room_number,
+                    "previous_status": self.current_status,
+                    "status": new_status,
+                    "changed_by": getattr(created_by, "id", None),
+                },
+            )
             self.current_status = new_status
 
     # @property
@@ -817,7 +957,7 @@ class Booking(BaseModel):
     )  # number of children guests (under 12 years)
     # Booking-related fields
     booking_code = models.CharField(
-        max_length=255, blank=True, null=True
+        max_length=255, blank=True, null=True, db_index=True
     )  # this field is used in authenticating Guest complaints and requests
     check_in_date = models.DateTimeField(default=timezone.now)
     check_out_date = models.DateTimeField(default=timezone.now)
@@ -841,7 +981,8 @@ class Booking(BaseModel):
         blank=True,
         related_name="bookings_created",
     )
-    date_modified = models.DateTimeField(default=timezone.now, blank=True, null=True)
+    date_modified = models.DateTimeField(auto_now=True, blank=True, null=True)
+    is_overstay = models.BooleanField(default=False)
 
 
     def __str__(self):
@@ -855,7 +996,7 @@ class Booking(BaseModel):
         Returns:
         None
         """
-        self.check_out = self.check_out + datetime.timedelta(days=num_days)
+        self.check_out_date = self.check_out_date + datetime.timedelta(days=num_days)
 
     def checkout(self):
         """
@@ -890,6 +1031,57 @@ class BookingPayment(BaseModel):
     date_modified = models.DateTimeField(auto_now=True)
 
 
+class BookingNight(BaseModel):
+    # one row per night held by a booking, priced when the night was booked
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name="nights")
+    night = models.DateField()
+    room_type = models.ForeignKey(
+        RoomType, on_delete=models.SET_NULL, null=True, related_name="booked_nights"
+    )
+    rate = models.DecimalField(max_digits=11, decimal_places=2, default=0.00)
+    date_created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.booking} - {self.night} - {self.rate}"
+
+    class Meta(BaseModel.Meta):
+        db_table = "bookingnight"
+        verbose_name = "Booking Night"
+        verbose_name_plural = "Booking Nights"
+        ordering = ["night"]
+        constraints = [
+            models.UniqueConstraint(fields=["booking", "night"], name="unique_booking_night")
+        ]
+        indexes = [models.Index(fields=["room_type", "night"])]
+
+class FolioCharge(BaseModel):
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name="folio_charges")
+    charge_date = models.DateField(default=timezone.now)
+    charge_type = models.CharField(
+        max_length=255, choices=choices.FOLIO_CHARGE_TYPE_CHOICES, default="room"
+    )
+    description = models.CharField(max_length=255, blank=True, null=True)
+    amount = models.DecimalField(max_digits=11, decimal_places=2, default=0.00)
+    posted_by = models.ForeignKey(
+        Profile, on_delete=models.SET_NULL, null=True, blank=True, related_name="folio_charges"
+    )
+    date_created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.booking} - {self.charge_date} - {self.amount}"
+
+    class Meta(BaseModel.Meta):
+        db_table = "foliocharge"
+        verbose_name = "Folio Charge"
+        verbose_name_plural = "Folio Charges"
+        ordering = ["charge_date"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["booking", "charge_date", "charge_type"],
+                name="unique_folio_charge_per_day",
+            )
+        ]
+
 class ArrivalMode(BaseModel):
     name = models.CharField(max_length=255)
 
@@ -985,6 +1177,14 @@ class Checkin(BaseModel):
         db_table="checkin"
         verbose_name="Check-In"
         verbose_name_plural = "Check-Ins"
+        indexes = [
+            # guests authenticate with their booking code and room number
+            models.Index(
+                fields=["booking_code", "room_number"],
+                name="checkin_in_house_code_idx",
+                condition=models.Q(checked_out=False),
+            ),
+        ]
 
 class CheckinPayment(BaseModel):
     check_in = models.ForeignKey(Checkin, on_delete=models.DO_NOTHING)
@@ -1030,6 +1230,15 @@ class Checkout(BaseModel):
 class Priority(BaseModel):
     # eg. low, medium, high
     name = models.CharField(max_length=255)
+    # minutes a complaint of this priority may stay unresolved, None for no target
+    sla_minutes = models.PositiveIntegerField(null=True, blank=True)
+    # the priority an overdue complaint is raised to
+    escalate_to = models.ForeignKey(
+        "self", on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+
+    def due_at(self, start):
+        return start + datetime.timedelta(minutes=self.sla_minutes) if self.sla_minutes else None
 
     def __str__(self):
         return self.name
@@ -1123,15 +1332,32 @@ class AssignComplaint(BaseModel):
     complaint_items = models.ManyToManyField(Amenity)
     priority = models.ForeignKey(Priority, on_delete=models.SET_NULL, null=True)
     hashtags = models.ManyToManyField(Hashtag)
+    # when the priority's SLA runs out; cleared once the complaint is closed
+    due_at = models.DateTimeField(null=True, blank=True)
+    escalation_level = models.PositiveSmallIntegerField(default=0)
 
     def __str__(self):
         return f"{self.complaint} - {self.assigned_to}"
 
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.due_at is None and self.priority_id:
+            priority = reference.get(Priority, self.priority_id) or self.priority
+            self.due_at = priority.due_at(self.date_assigned)
+        super().save(*args, **kwargs)
+
     class Meta(BaseModel.Meta):
         db_table = "assigncomplaint"
         verbose_name = "Assign Complaint"
         verbose_name_plural = "Assign Complaints"
         ordering = ["-created_on"]
+        indexes = [
+            # the escalation scheduler only ever reads open assignments by due time
+            models.Index(
+                fields=["due_at"],
+                name="assigncomplaint_due_idx",
+                condition=models.Q(due_at__isnull=False),
+            ),
+        ]
 
 class ProcessComplaint(BaseModel):
     complaint = models.ForeignKey(
@@ -1169,6 +1395,54 @@ class ProcessComplaint(BaseModel):
         verbose_name = "Process Complaint"
         verbose_name_plural = "Process Complaints"
 
+class ComplaintSearchDocument(BaseModel):
+    # the searchable text of a complaint and everything written about it,
+    # kept up to date on write by utils.complaint_search
+    complaint = models.OneToOneField(
+        Complaint, on_delete=models.CASCADE, related_name="search_document"
+    )
+    title = models.TextField(blank=True, default="")
+    body = models.TextField(blank=True, default="")
+    # only filled on PostgreSQL, where a GIN index is built over it
+    search_vector = SearchVectorField(null=True, editable=False)
+    date_modified = models.DateTimeField(auto_now=True)
+
+    class Meta(BaseModel.Meta):
+        db_table = "complaintsearchdocument"
+        verbose_name = "Complaint Search Document"
+        verbose_name_plural = "Complaint Search Documents"
+        # created on PostgreSQL only, see migration 0040_complaint_search
+        indexes = [GinIndex(fields=["search_vector"], name="complaint_search_vector_idx")]
+
+class ComplaintRoutingRule(BaseModel):
+    # a rule matches a complaint when every condition it sets holds; rules
+    # without any condition match every complaint
+    name = models.CharField(max_length=255, unique=True)
+    position = models.PositiveIntegerField(default=0)
+    is_active = models.BooleanField(default=True)
+    amenities = models.ManyToManyField(Amenity, blank=True, related_name="routing_rules")
+    # comma separated, matched as whole words in the title or message
+    keywords = models.TextField(blank=True, default="")
+    floors = models.ManyToManyField(HotelFloor, blank=True, related_name="routing_rules")
+    # a window ending before it starts runs past midnight
+    active_from = models.TimeField(null=True, blank=True)
+    active_to = models.TimeField(null=True, blank=True)
+    department = models.ForeignKey(
+        Department, on_delete=models.SET_NULL, null=True, blank=True
+    )
+    priority = models.ForeignKey(Priority, on_delete=models.SET_NULL, null=True, blank=True)
+    hashtags = models.ManyToManyField(Hashtag, blank=True, related_name="routing_rules")
+    date_created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+    class Meta(BaseModel.Meta):
+        db_table = "complaintroutingrule"
+        verbose_name = "Complaint Routing Rule"
+        verbose_name_plural = "Complaint Routing Rules"
+        ordering = ["position", "date_created"]
+
 class SponsorClaims(BaseModel):
     sponsor = models.ForeignKey(Sponsor, on_delete=models.SET_NULL, null=True)
     guest = models.ForeignKey(Guest, on_delete=models.SET_NULL, null=True)
@@ -1192,3 +1466,139 @@ class PaymentStatus(BaseModel):
         db_table = "paymentstatus"
         verbose_name = "Payment Status"
         verbose_name_plural = "Payment Statuses"
+
+class ReportWatermark(BaseModel):
+    # records how far an incremental rollup has processed its source tables
+    name = models.CharField(max_length=255, unique=True)
+    last_processed = models.DateTimeField(null=True, blank=True)
+    date_modified = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} - {self.last_processed}"
+
+    class Meta(BaseModel.Meta):
+        db_table = "reportwatermark"
+        verbose_name = "Report Watermark"
+        verbose_name_plural = "Report Watermarks"
+
+class ReportInvalidation(BaseModel):
+    # days an incremental rollup must rebuild although no source row on them
+    # changed, e.g. the nights a booking held before it was moved or deleted
+    name = models.CharField(max_length=255, db_index=True)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    date_created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.name} - {self.start_date} to {self.end_date}"
+
+    class Meta(BaseModel.Meta):
+        db_table = "reportinvalidation"
+        verbose_name = "Report Invalidation"
+        verbose_name_plural = "Report Invalidations"
+
+class DailyOccupancy(BaseModel):
+    # one row per day, room type, booking source and sponsor type
+    date = models.DateField(db_index=True)
+    room_type = models.ForeignKey(
+        RoomType, on_delete=models.SET_NULL, null=True, related_name="daily_occupancy"
+    )
+    booking_source = models.CharField(
+        max_length=255, choices=choices.BOOKING_SOURCE_CHOICES, default="walk-in"
+    )
+    sponsor_type = models.ForeignKey(
+        SponsorType, on_delete=models.SET_NULL, null=True, blank=True, related_name="daily_occupancy"
+    )
+    rooms_sold = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=13, decimal_places=2, default=0.00)
+    guests = models.PositiveIntegerField(default=0)
+    arrivals = models.PositiveIntegerField(default=0)
+    departures = models.PositiveIntegerField(default=0)
+    no_shows = models.PositiveIntegerField(default=0)
+    date_created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.date} - {self.room_type} - {self.booking_source}"
+
+    class Meta(BaseModel.Meta):
+        db_table = "dailyoccupancy"
+        verbose_name = "Daily Occupancy"
+        verbose_name_plural = "Daily Occupancy"
+        ordering = ["date"]
+        indexes = [models.Index(fields=["date", "room_type"])]
+
+class DailyLabor(BaseModel):
+    # one row per staff member and day they had shifts or completed tasks
+    date = models.DateField(db_index=True)
+    profile = models.ForeignKey(
+        Profile, on_delete=models.CASCADE, related_name="daily_labor"
+    )
+    department = models.ForeignKey(
+        Department, on_delete=models.SET_NULL, null=True, related_name="daily_labor"
+    )
+    shifts = models.PositiveIntegerField(default=0)
+    scheduled_hours = models.DecimalField(max_digits=7, decimal_places=2, default=0.00)
+    hours_worked = models.DecimalField(max_digits=7, decimal_places=2, default=0.00)
+    overtime_hours = models.DecimalField(max_digits=7, decimal_places=2, default=0.00)
+    tasks_completed = models.PositiveIntegerField(default=0)
+    rooms_cleaned = models.PositiveIntegerField(default=0)
+    date_created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.date} - {self.profile}"
+
+    class Meta(BaseModel.Meta):
+        db_table = "dailylabor"
+        verbose_name = "Daily Labor"
+        verbose_name_plural = "Daily Labor"
+        ordering = ["date"]
+        indexes = [models.Index(fields=["department", "date"])]
+
+class NightAudit(BaseModel):
+    business_date = models.DateField(unique=True)
+    no_shows = models.PositiveIntegerField(default=0)
+    overstays = models.PositiveIntegerField(default=0)
+    room_charges_posted = models.PositiveIntegerField(default=0)
+    room_revenue_posted = models.DecimalField(max_digits=13, decimal_places=2, default=0.00)
+    started_at = models.DateTimeField(default=timezone.now)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Night audit {self.business_date}"
+
+    class Meta(BaseModel.Meta):
+        db_table = "nightaudit"
+        verbose_name = "Night Audit"
+        verbose_name_plural = "Night Audits"
+        ordering = ["-business_date"]
+
+class OutboxEvent(BaseModel):
+    # domain events written in the same transaction as the change they describe
+    # and delivered to their handlers by the outbox relay task
+    event_type = models.CharField(max_length=255, db_index=True)
+    aggregate_type = models.CharField(max_length=255)
+    aggregate_id = models.CharField(max_length=255)
+    payload = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    available_at = models.DateTimeField(default=timezone.now)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True, default="")
+    date_created = models.DateTimeField(auto_now_add=True)
+
+    objects = managers.OutboxEventManager()
+
+    def __str__(self):
+        return f"{self.event_type} - {self.aggregate_type} {self.aggregate_id}"
+
+    class Meta(BaseModel.Meta):
+        db_table = "outboxevent"
+        verbose_name = "Outbox Event"
+        verbose_name_plural = "Outbox Events"
+        ordering = ["date_created"]
+        indexes = [
+            models.Index(
+                fields=["available_at"],
+                name="outbox_pending_idx",
+                condition=models.Q(processed_at__isnull=True),
+            )
+        ]
@@ -1,13 +1,15 @@
 from rest_framework import serializers
 from . import models
+from .fields import CachedSlugRelatedField
 from rest_framework import status
-from django.db import transaction
+from django.db import IntegrityError, transaction
 from django.db.models import Prefetch
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import Group
 from datetime import timedelta, date, datetime
-from utils import generators, system_variables, notifications, helpers, choices
+from utils import generators, system_variables, notifications, helpers, choices, bookings, pricing, images, versions, complaint_routing, complaint_sla, rosters
+from utils import amenities as amenity_masks
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenBlacklistSerializer
 
 
@@ -75,7 +77,7 @@ class GenderSerializer(serializers.ModelSerializer):
 class DepartmentSerializer(serializers.ModelSerializer):
     class Meta:
         model = models.Department
-        fields = ["id", "name", "description", "created_by", "date_created"]
+        fields = ["id", "name", "description", "head", "created_by", "date_created"]
         read_only_fields = ["id", "created_by", "date_created"]
 
     def create(self, validated_data):
@@ -163,9 +165,10 @@ class CustomUserProfileSerializer(serializers.ModelSerializer):
     department = serializers.SlugRelatedField(
         slug_field="name", queryset=models.Department.objects.all()
     )
-    gender = serializers.SlugRelatedField(
+    gender = CachedSlugRelatedField(
         slug_field="name", queryset=models.Gender.objects.all()
     )
+    photo_variants = serializers.SerializerMethodField()
 
     class Meta:
         model = models.Profile
@@ -178,10 +181,14 @@ class CustomUserProfileSerializer(serializers.ModelSerializer):
             "email",
             "residential_address",
             "photo",
+            "photo_variants",
             "full_name",
             "department",
         ]
         read_only_fields = ["id", "full_name"]
+
+    def get_photo_variants(self, obj):
+        return images.variant_urls(obj.photo, obj.photo_variants)
     
     def create(self, validated_data):
         print(validated_data)
@@ -270,7 +277,7 @@ class ShiftSerializer(serializers.ModelSerializer):
 
 class ProfileShiftAssignSerializer(serializers.ModelSerializer):
     # profile = CustomUserProfileSerializer()
-    status = serializers.SlugRelatedField(
+    status = CachedSlugRelatedField(
         slug_field="name", queryset=models.ShiftStatus.objects.all()
     )
     employee_name = serializers.SerializerMethodField(read_only=True)
@@ -289,7 +296,7 @@ class ProfileShiftAssignSerializer(serializers.ModelSerializer):
             "status",
             "shift_name",
         ]
-        read_only_fields = ["id", "shift_start_time" "shift_end_time"]
+        read_only_fields = ["id", "shift_start_time", "shift_end_time"]
 
     def get_employee_name(self, obj):
         return obj.profile.full_name if obj.profile else None
@@ -331,35 +338,44 @@ class ProfileShiftAssignSerializer(serializers.ModelSerializer):
                 }
             )
 
-        # Validation 3: Prevent duplicate assignments for the same shift on the same day
-        if models.ProfileShiftAssign.objects.filter(
-            profile=profile, shift=attrs.get("shift"), date=attrs.get("date")
-        ).exists():
-            raise serializers.ValidationError(
-                {
-                    "error": "You cannot assign the same shift to the same person on the same day."
-                }
+        # Validation 3: Prevent assignments overlapping another shift of the same person,
+        # including overnight shifts running into the next day
+        shift = attrs.get("shift", getattr(self.instance, "shift", None))
+        day = attrs.get("date", getattr(self.instance, "date", None))
+        if shift and day:
+            start, end = rosters.shift_times(shift, day)
+            others = models.ProfileShiftAssign.objects.filter(
+                profile=profile or self.instance.profile
             )
+            if self.instance:
+                others = others.exclude(id=self.instance.id)
+            if rosters.overlapping(others, start, end).exists():
+                raise serializers.ValidationError(
+                    {
+                        "error": "You cannot assign a shift overlapping another shift of the same person."
+                    }
+                )
+            attrs["shift_start_time"], attrs["shift_end_time"] = start, end
 
         return attrs
 
     def create(self, validated_data):
-        shift_start_time = datetime.combine(
-            validated_data.get("date"), validated_data.get("shift").start_time
-        )
-        shift_end_time = datetime.combine(
-            validated_data.get("date"), validated_data.get("shift").end_time
-        )
-        print(f"shift_end_time: {shift_end_time}")
         created_by = self.context.get("created_by")
         department = created_by.department
-        return models.ProfileShiftAssign.objects.create(
-            department=department,
-            created_by=created_by,
-            shift_start_time=shift_start_time,
-            shift_end_time=shift_end_time,
-            **validated_data,
-        )
+        try:
+            with transaction.atomic():
+                return models.ProfileShiftAssign.objects.create(
+                    department=department,
+                    created_by=created_by,
+                    **validated_data,
+                )
+        except IntegrityError:
+            # a concurrent assignment took the slot since validation
+            raise serializers.ValidationError(
+                {
+                    "error": "You cannot assign a shift overlapping another shift of the same person."
+                }
+            )
 
     def update(self, instance, validated_data):
         modified_by = self.context.get("modified_by")
@@ -370,6 +386,107 @@ class ProfileShiftAssignSerializer(serializers.ModelSerializer):
         instance.save()
         return instance
 
+class RosterPatternSerializer(serializers.Serializer):
+    profiles = serializers.ListField(child=serializers.UUIDField(), allow_empty=False)
+    shift = serializers.CharField(max_length=255)
+    start_date = serializers.DateField()
+    end_date = serializers.DateField()
+    weekdays = serializers.ListField(
+        child=serializers.IntegerField(min_value=0, max_value=6), required=False
+    )
+
+    def validate(self, attrs):
+        if attrs["start_date"] > attrs["end_date"]:
+            raise serializers.ValidationError(
+                {"error": "start date cannot be later than end date"}
+            )
+        return attrs
+
+class RosterEntrySerializer(serializers.Serializer):
+    profile = serializers.UUIDField()
+    date = serializers.DateField()
+    shift = serializers.CharField(max_length=255)
+
+class ShiftRosterSerializer(serializers.Serializer):
+    """
+    A roster given as a pattern (staff x dates x shift), an explicit list of
+    assignments, or both. Shifts are named and read in one query.
+    """
+    pattern = RosterPatternSerializer(required=False)
+    assignments = RosterEntrySerializer(many=True, required=False)
+    status = CachedSlugRelatedField(
+        slug_field="name", queryset=models.ShiftStatus.objects.all(), required=False
+    )
+    skip_conflicts = serializers.BooleanField(default=False)
+
+    def validate(self, attrs):
+        pattern = attrs.get("pattern")
+        assignments = attrs.get("assignments", [])
+        if not pattern and not assignments:
+            raise serializers.ValidationError(
+                {"error": "a roster needs a pattern or a list of assignments"}
+            )
+        size = len(assignments)
+        if pattern:
+            size += rosters.pattern_size(
+                len(pattern["profiles"]),
+                pattern["start_date"],
+                pattern["end_date"],
+                pattern.get("weekdays"),
+            )
+        if size > rosters.MAX_ROSTER_ENTRIES:
+            raise serializers.ValidationError(
+                {"error": f"a roster can have at most {rosters.MAX_ROSTER_ENTRIES} assignments"}
+            )
+        shift_names = {entry["shift"] for entry in assignments}
+        if pattern:
+            shift_names.add(pattern["shift"])
+        shifts = {shift.name: shift for shift in models.Shift.objects.filter(name__in=shift_names)}
+        unknown = shift_names - set(shifts)
+        if unknown:
+            raise serializers.ValidationError(
+                {"error": f"unknown shifts: {', '.join(sorted(unknown))}"}
+            )
+        entries = []
+        if pattern:
+            entries += rosters.expand_pattern(
+                pattern["profiles"],
+                shifts[pattern["shift"]],
+                pattern["start_date"],
+                pattern["end_date"],
+                pattern.get("weekdays"),
+            )
+        entries += [
+            (entry["profile"], entry["date"], shifts[entry["shift"]]) for entry in assignments
+        ]
+        attrs["entries"] = entries
+        return attrs
+
+    def create(self, validated_data):
+        return rosters.generate_roster(
+            validated_data["entries"],
+            self.context.get("created_by"),
+            status=validated_data.get("status"),
+            skip_conflicts=validated_data["skip_conflicts"],
+        )
+
+    def to_representation(self, instance):
+        return {
+            "count": len(instance["created"]),
+            "assignments": [
+                {
+                    "id": assignment.id,
+                    "profile": assignment.profile_id,
+                    "date": assignment.date,
+                    "shift": assignment.shift.name,
+                    "shift_start_time": assignment.shift_start_time,
+                    "shift_end_time": assignment.shift_end_time,
+                }
+                for assignment in instance["created"]
+            ],
+            "skipped": instance["skipped"],
+        }
+
 class MyShiftSerializer(serializers.ModelSerializer):
     shift = serializers.SlugRelatedField(slug_field="name", read_only=True)
     start_time = serializers.SerializerMethodField(read_only=True)
@@ -459,7 +576,7 @@ class RoomKeepingAssignSerializer(serializers.ModelSerializer):
     shift = serializers.SlugRelatedField(
         slug_field="name", queryset=models.Shift.objects.all()
     )
-    priority = serializers.SlugRelatedField(
+    priority = CachedSlugRelatedField(
         slug_field="name",
         queryset=models.Priority.objects.all(),
         allow_null=True,
@@ -603,16 +720,16 @@ class CountrySerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "created_by", "date_created"]
   
 class GuestSerializer(serializers.ModelSerializer):
-    title = serializers.SlugRelatedField(
+    title = CachedSlugRelatedField(
         slug_field="name", queryset=models.NameTitle.objects.all()
     )
-    gender = serializers.SlugRelatedField(
+    gender = CachedSlugRelatedField(
         slug_field="name", queryset=models.Gender.objects.all()
     )
-    identification_type = serializers.SlugRelatedField(
+    identification_type = CachedSlugRelatedField(
         slug_field="name", queryset=models.IdentificationType.objects.all()
     )
-    country = serializers.SlugRelatedField(
+    country = CachedSlugRelatedField(
         slug_field="name", queryset=models.Country.objects.all()
     )
 
@@ -659,7 +776,7 @@ class GuestSerializer(serializers.ModelSerializer):
             return guest
 
 class BookingPaymentSerializer(serializers.ModelSerializer):
-    payment_type = serializers.SlugRelatedField(
+    payment_type = CachedSlugRelatedField(
         slug_field="name", queryset=models.PaymentType.objects.all()
     )
     amount = serializers.DecimalField(
@@ -697,10 +814,10 @@ class BookingSerializer(serializers.ModelSerializer):
     guest = GuestSerializer(write_only=True)
     # payment_status = serializers.SlugRelatedField(
     #     slug_field="name", read_only=True)
-    room_category = serializers.SlugRelatedField(
+    room_category = CachedSlugRelatedField(
         slug_field="name", queryset=models.RoomCategory.objects.all(), required=False
     )
-    room_type = serializers.SlugRelatedField(
+    room_type = CachedSlugRelatedField(
         slug_field="name", queryset=models.RoomType.objects.all()
     )
     # number_of_younger_guests = serializers.IntegerField(required=False)
@@ -776,6 +893,19 @@ class BookingSerializer(serializers.ModelSerializer):
         guest_data = validated_data.pop("guest", None)
         payments_data = validated_data.pop("booking_payments", None)
         with transaction.atomic():
+            # the same lock as stay modifications, so two bookings cannot
+            # both take the last room on a night
+            room_type = models.RoomType.objects.select_for_update().get(
+                id=validated_data["room_type"].id
+            )
+            sold_out = bookings.unavailable_nights(
+                room_type,
+                bookings.stay_nights(validated_data["check_in_date"], validated_data["check_out_date"]),
+            )
+            if sold_out:
+                raise serializers.ValidationError(
+                    {"error": f"{room_type.name} is not available on {', '.join(str(night) for night in sold_out)}"}
+                )
             guest: models.Guest = models.Guest.objects.create(
                 guest_id=generators.generate_guest_id(),
                 user=None,
@@ -791,7 +921,7 @@ class BookingSerializer(serializers.ModelSerializer):
                 booking_code=generators.generate_booking_code(),
                 **validated_data,
             )
-            booking_cost = helpers.calculate_booking_cost(booking=booking)
+            booking_cost = bookings.book_nights(booking)
             booking.booking_cost = booking_cost
             total_amount_paid = 0
             if payments_data:
@@ -807,6 +937,19 @@ class BookingSerializer(serializers.ModelSerializer):
             else:
                 booking.payment_status = "unpaid"
             booking.save()
+            models.OutboxEvent.objects.publish(
+                "booking.created",
+                booking,
+                {
+                    "booking_code": booking.booking_code,
+                    "guest": booking.guest_id,
+                    "email": booking.email,
+                    "room_type": booking.room_type_id,
+                    "check_in_date": booking.check_in_date,
+                    "check_out_date": booking.check_out_date,
+                    "booking_cost": booking.booking_cost,
+                },
+            )
         return booking
 
     def update(self, instance, validated_data):
@@ -830,6 +973,25 @@ class BookingSerializer(serializers.ModelSerializer):
                     models.BookingPayment.objects.create(**payment_data)
         return instance
         
+class StayModificationSerializer(serializers.Serializer):
+    check_in_date = serializers.DateTimeField(required=False)
+    check_out_date = serializers.DateTimeField(required=False)
+    room_type = CachedSlugRelatedField(
+        slug_field="name", queryset=models.RoomType.objects.all(), required=False
+    )
+
+    def validate(self, attrs):
+        if not attrs:
+            raise serializers.ValidationError(
+                {"error": "provide a new check-in date, check-out date or room type"}
+            )
+        return attrs
+
+class GroupCheckoutSerializer(serializers.Serializer):
+    booking_ids = serializers.ListField(
+        child=serializers.UUIDField(), allow_empty=False, max_length=500
+    )
+
 class IdentificationTypeSerializer(serializers.ModelSerializer):
     class Meta:
         model = models.IdentificationType
@@ -919,14 +1081,25 @@ class HotelViewSerializer(serializers.ModelSerializer):
         fields = ["id", "name", "description", "created_by", "date_created"]
         read_only_fields = ["id", "created_by", "date_created"]
 
+class RoomImageSerializer(serializers.ModelSerializer):
+    variants = serializers.SerializerMethodField()
+
+    class Meta:
+        model = models.RoomImage
+        fields = ["id", "room", "image", "variants", "caption", "date_created"]
+        read_only_fields = ["id", "date_created"]
+
+    def get_variants(self, obj):
+        return images.variant_urls(obj.image, obj.image_variants)
+
 class RoomSerializer(serializers.ModelSerializer):
-    room_type = serializers.SlugRelatedField(
+    room_type = CachedSlugRelatedField(
         slug_field="name", queryset=models.RoomType.objects.all()
     )
     floor = serializers.SlugRelatedField(
         slug_field="name", queryset=models.HotelFloor.objects.all(), required=False
     )
-    room_category = serializers.SlugRelatedField(
+    room_category = CachedSlugRelatedField(
         slug_field="name", queryset=models.RoomCategory.objects.all(), required=False
     )
     amenities = serializers.SlugRelatedField(
@@ -935,9 +1108,10 @@ class RoomSerializer(serializers.ModelSerializer):
         queryset=models.Amenity.objects.all(),
         required=False,
     )
-    bed_type = serializers.SlugRelatedField(
+    bed_type = CachedSlugRelatedField(
         slug_field="name", queryset=models.BedType.objects.all(), required=False
     )
+    images = RoomImageSerializer(source="room_images", many=True, read_only=True)
 
     class Meta:
         model = models.Room
@@ -957,6 +1131,7 @@ class RoomSerializer(serializers.ModelSerializer):
             "room_maintenance_status",
             "room_booking_status",
             "amenities",
+            "images",
             "current_guest",
             "current_price",
             "date_created",
@@ -972,25 +1147,19 @@ class RoomSerializer(serializers.ModelSerializer):
             room_area = getattr(room_category, "room_area", 0)
         max_occupancy = getattr(room_type, "max_occupancy", 1)
         amenities = validated_data.pop("amenities", None)
-        if amenities is None:
-            amenities = room_type.amenities.all()
-        today = timezone.now().date()
-        rate_obj = (
-            room_type.room_rates
-            .filter(
-                start_date__lte=today, end_date__gte=today
-            )
-            .order_by("-start_date")
-            .first()
-        )
-        current_price = getattr(rate_obj, "price", room_type.base_price)
+        current_price = pricing.effective_prices([room_type])[room_type.id]
         room = models.Room.objects.create(
             **validated_data,
             room_area=room_area,
             max_occupancy=max_occupancy,
             current_price=current_price,
         )
-        room.amenities.set(amenities)
+        if amenities is None:
+            room.amenities.set(
+                room_type.amenities.all(), through_defaults={"from_room_type": True}
+            )
+        else:
+            room.amenities.set(amenities)
         return room
 
 
@@ -1001,13 +1170,17 @@ class RoomSerializer(serializers.ModelSerializer):
             "room_number", instance.room_number
         )
         amenities = validated_data.pop("amenities", None)
+        if room_type and room_type.id != instance.room_type_id:
+            instance.current_price = pricing.effective_prices([room_type])[room_type.id]
         instance.room_type = room_type
         instance.max_occupancy = getattr(room_type, "max_occupancy", instance.max_occupancy)
         if room_category:
             instance.room_category = room_category
             instance.room_area = getattr(room_category, "room_area", instance.room_area)
         if amenities is None:
-            instance.amenities.set(room_type.amenities.all())
+            instance.amenities.set(
+                room_type.amenities.all(), through_defaults={"from_room_type": True}
+            )
         else:
             instance.amenities.set(amenities)
         instance.floor = validated_data.get("floor", instance.floor)
@@ -1016,6 +1189,127 @@ class RoomSerializer(serializers.ModelSerializer):
         instance.save()
         return instance
     
+class BulkRoomProvisionSerializer(serializers.Serializer):
+    floor = serializers.SlugRelatedField(
+        slug_field="name", queryset=models.HotelFloor.objects.all()
+    )
+    room_type = CachedSlugRelatedField(
+        slug_field="name", queryset=models.RoomType.objects.all()
+    )
+    room_category = CachedSlugRelatedField(
+        slug_field="name", queryset=models.RoomCategory.objects.all(), required=False
+    )
+    bed_type = CachedSlugRelatedField(
+        slug_field="name", queryset=models.BedType.objects.all(), required=False
+    )
+    room_view = serializers.PrimaryKeyRelatedField(
+        queryset=models.HotelView.objects.all(), required=False
+    )
+    amenities = serializers.SlugRelatedField(
+        slug_field="name", many=True, queryset=models.Amenity.objects.all(), required=False
+    )
+    # either an explicit list of room numbers or a numeric range, e.g.
+    # prefix "B", start 1, end 40 and width 3 gives B001 to B040
+    room_numbers = serializers.ListField(
+        child=serializers.CharField(max_length=255), required=False, allow_empty=False
+    )
+    prefix = serializers.CharField(max_length=20, required=False, default="", allow_blank=True)
+    start = serializers.IntegerField(min_value=0, required=False)
+    end = serializers.IntegerField(min_value=0, required=False)
+    width = serializers.IntegerField(min_value=0, max_value=10, required=False, default=0)
+
+    MAX_ROOMS = 500
+
+    def validate(self, attrs):
+        room_numbers = attrs.get("room_numbers")
+        start, end = attrs.get("start"), attrs.get("end")
+        if room_numbers is None:
+            if start is None or end is None:
+                raise serializers.ValidationError(
+                    {"error": "provide either room numbers or a start and end number"}
+                )
+            if end < start:
+                raise serializers.ValidationError(
+                    {"error": "end number must not be lower than start number"}
+                )
+            if end - start + 1 > self.MAX_ROOMS:
+                raise serializers.ValidationError(
+                    {"error": f"at most {self.MAX_ROOMS} rooms can be created at once"}
+                )
+            room_numbers = [
+                f"{attrs['prefix']}{number:0{attrs['width']}d}" for number in range(start, end + 1)
+            ]
+        if len(room_numbers) > self.MAX_ROOMS:
+            raise serializers.ValidationError(
+                {"error": f"at most {self.MAX_ROOMS} rooms can be created at once"}
+            )
+        if len(set(room_numbers)) != len(room_numbers):
+            raise serializers.ValidationError({"error": "room numbers must be unique"})
+        existing = list(
+            models.Room.objects.filter(room_number__in=room_numbers).values_list(
+                "room_number", flat=True
+            )
+        )
+        if existing:
+            raise serializers.ValidationError(
+                {"error": f"rooms already exist: {', '.join(sorted(existing))}"}
+            )
+        attrs["room_numbers"] = room_numbers
+        return attrs
+
+    def create(self, validated_data):
+        created_by = validated_data.get("created_by")
+        room_type: models.RoomType = validated_data["room_type"]
+        room_category = validated_data.get("room_category")
+        amenities = validated_data.get("amenities")
+        from_room_type = amenities is None
+        if from_room_type:
+            amenities = list(room_type.amenities.all())
+        current_price = pricing.effective_prices([room_type])[room_type.id]
+        amenity_mask = amenity_masks.mask_of(amenity.bit for amenity in amenities)
+        with transaction.atomic():
+            rooms = models.Room.objects.bulk_create(
+                [
+                    models.Room(
+                        room_number=room_number,
+                        floor=validated_data["floor"],
+                        room_type=room_type,
+                        room_category=room_category,
+                        bed_type=validated_data.get("bed_type"),
+                        room_view=validated_data.get("room_view"),
+                        room_area=getattr(room_category, "room_area", 0),
+                        max_occupancy=room_type.max_occupancy,
+                        current_price=current_price,
+                        amenity_mask=amenity_mask,
+                        created_by=created_by,
+                    )
+                    for room_number in validated_data["room_numbers"]
+                ],
+                batch_size=500,
+            )
+            models.RoomAmenity.objects.bulk_create(
+                [
+                    models.RoomAmenity(
+                        room=room,
+                        amenity=amenity,
+                        from_room_type=from_room_type,
+                        created_by=created_by,
+                    )
+                    for room in rooms
+                    for amenity in amenities
+                ],
+                batch_size=1000,
+            )
+            # bulk_create sends no signals
+            versions.bump(models.Room, models.RoomAmenity)
+        return rooms
+
+    def to_representation(self, instance):
+        return {
+            "count": len(instance),
+            "rooms": [{"id": room.id, "room_number": room.room_number} for room in instance],
+        }
+
 class AssignComplaintSerializer(serializers.ModelSerializer):
     assigned_to = serializers.PrimaryKeyRelatedField(
         queryset=models.Profile.objects.all(), allow_null=True
@@ -1024,7 +1318,7 @@ class AssignComplaintSerializer(serializers.ModelSerializer):
         slug_field="name", queryset=models.Department.objects.all(), allow_null=True
     )
     # complaint = serializers.PrimaryKeyRelatedField(queryset=models.Complaint.objects.all())
-    priority = serializers.SlugRelatedField(
+    priority = CachedSlugRelatedField(
         slug_field="name", queryset=models.Priority.objects.all(), allow_null=True
     )
     hashtags = serializers.SlugRelatedField(
@@ -1095,6 +1389,17 @@ class AssignComplaintSerializer(serializers.ModelSerializer):
             )
             complaint.complaint_status = complaint_status_assigned
             complaint.save()
+            models.OutboxEvent.objects.publish(
+                "complaint.assigned",
+                instance,
+                {
+                    "complaint": complaint.id,
+                    "assigned_to": instance.assigned_to_id,
+                    "assigned_to_department": instance.assigned_to_department_id,
+                    "priority": getattr(instance.priority, "name", None),
+                    "assigned_by": getattr(assigned_by, "id", None),
+                },
+            )
         return instance
 
     def update(self, instance, validated_data):
@@ -1107,7 +1412,7 @@ class AssignComplaintSerializer(serializers.ModelSerializer):
         return instance
 
 class ProcessComplaintSerializer(serializers.ModelSerializer):
-    complaint_status = serializers.SlugRelatedField(
+    complaint_status = CachedSlugRelatedField(
         slug_field="name", queryset=models.ComplaintStatus.objects.all()
     )
     complaint = serializers.PrimaryKeyRelatedField(
@@ -1151,6 +1456,8 @@ class ProcessComplaintSerializer(serializers.ModelSerializer):
                 complaint.updated_on = complaint_updated_on
                 complaint.updated_by = processed_by
                 complaint.save()
+                if complaint_sla.is_closed(complaint_status):
+                    complaint_sla.stop_clock(complaint.assigned_complaints.all())
 
             if assigned_complaint:
                 # check if the user is authorized to process the complaint
@@ -1167,9 +1474,21 @@ class ProcessComplaintSerializer(serializers.ModelSerializer):
                     raise serializers.ValidationError(
                         {"error": "you are not authorized to process this complaint"}
                     )
-                assigned_complaint.status = complaint_status
+                assigned_complaint.complaint_status = complaint_status
                 assigned_complaint.updated_on = complaint_updated_on
+                if complaint_sla.is_closed(complaint_status):
+                    assigned_complaint.due_at = None
                 assigned_complaint.save()
+            models.OutboxEvent.objects.publish(
+                "complaint.processed",
+                instance,
+                {
+                    "complaint": getattr(complaint, "id", None),
+                    "assigned_complaint": getattr(assigned_complaint, "id", None),
+                    "status": complaint_status.name,
+                    "processed_by": getattr(processed_by, "id", None),
+                },
+            )
         return instance
 
     def update(self, instance, validated_data):
@@ -1199,13 +1518,15 @@ class ComplaintSerializer(serializers.ModelSerializer):
         slug_field="room_number", queryset=models.Room.objects.all()
     )
     assigned_complaints = AssignComplaintSerializer(many=True, read_only=True)
-    process_complaints = ProcessComplaintSerializer(many=True, read_only=True)
+    process_complaints = ProcessComplaintSerializer(
+        source="processed_complaints", many=True, read_only=True
+    )
 
     class Meta:
         model = models.Complaint
         fields = [
             "id",
-            "client",
+            "guest",
             "room_number",
             "title",
             "message",
@@ -1234,8 +1555,117 @@ class ComplaintSerializer(serializers.ModelSerializer):
             "process_complaints",
         ]
 
+    def create(self, validated_data):
+        with transaction.atomic():
+            instance = super().create(validated_data)
+            complaint_routing.route_complaint(instance)
+        return instance
+
+class GuestComplaintSerializer(serializers.Serializer):
+    booking_code = serializers.CharField(max_length=255, write_only=True)
+    room_number = serializers.CharField(max_length=255, write_only=True)
+    title = serializers.CharField(max_length=255, required=False, allow_blank=True)
+    message = serializers.CharField()
+    complaint_items = serializers.SlugRelatedField(
+        slug_field="name", many=True, queryset=models.Amenity.objects.all(), required=False
+    )
+    id = serializers.UUIDField(read_only=True)
+    date_created = serializers.DateTimeField(read_only=True)
+
+    def validate(self, attrs):
+        # only guests staying in the room can complain about it; the same error
+        # for a wrong code or room keeps codes from being guessed one at a time
+        checkin = (
+            models.Checkin.objects.filter(
+                booking_code=attrs["booking_code"].strip(),
+                room_number=attrs["room_number"].strip(),
+                checked_out=False,
+            )
+            .select_related("room")
+            .first()
+        )
+        if checkin is None:
+            raise serializers.ValidationError(
+                {"error": "invalid booking code or room number"}
+            )
+        attrs["checkin"] = checkin
+        return attrs
+
+    def create(self, validated_data):
+        checkin = validated_data["checkin"]
+        with transaction.atomic():
+            complaint = models.Complaint.objects.create(
+                guest=checkin.guest_name,
+                room_number=checkin.room,
+                title=validated_data.get("title"),
+                message=validated_data["message"],
+            )
+            complaint.complaint_items.set(validated_data.get("complaint_items", []))
+            # routed by the outbox relay so a burst of guests never waits on it
+            models.OutboxEvent.objects.publish(
+                "complaint.submitted",
+                complaint,
+                {"booking_code": checkin.booking_code, "room_number": checkin.room_number},
+            )
+        return complaint
+
+class ComplaintRoutingRuleSerializer(serializers.ModelSerializer):
+    amenities = serializers.SlugRelatedField(
+        slug_field="name", many=True, queryset=models.Amenity.objects.all(), required=False
+    )
+    floors = serializers.SlugRelatedField(
+        slug_field="name", many=True, queryset=models.HotelFloor.objects.all(), required=False
+    )
+    department = serializers.SlugRelatedField(
+        slug_field="name", queryset=models.Department.objects.all(), allow_null=True
+    )
+    priority = CachedSlugRelatedField(
+        slug_field="name", queryset=models.Priority.objects.all(), allow_null=True, required=False
+    )
+    hashtags = serializers.SlugRelatedField(
+        slug_field="name", many=True, queryset=models.Hashtag.objects.all(), required=False
+    )
+
+    class Meta:
+        model = models.ComplaintRoutingRule
+        fields = [
+            "id",
+            "name",
+            "position",
+            "is_active",
+            "amenities",
+            "keywords",
+            "floors",
+            "active_from",
+            "active_to",
+            "department",
+            "priority",
+            "hashtags",
+            "date_created",
+        ]
+        read_only_fields = ["id", "date_created"]
+
 class PrioritySerializer(serializers.ModelSerializer):
+    escalate_to = CachedSlugRelatedField(
+        slug_field="name", queryset=models.Priority.objects.all(), allow_null=True, required=False
+    )
+
     class Meta:
         model = models.Priority
-        fields = ["id", "name"]
+        fields = ["id", "name", "sla_minutes", "escalate_to"]
         read_only_fields = ["id"]
+
+class NightAuditSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = models.NightAudit
+        fields = [
+            "id",
+            "business_date",
+            "no_shows",
+            "overstays",
+            "room_charges_posted",
+            "room_revenue_posted",
+            "started_at",
+            "finished_at",
+        ]
+        read_only_fields = fields
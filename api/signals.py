@@ -0,0 +1,196 @@
+from django.db.models.signals import pre_save, post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+from utils import versions, images, amenities, reference, complaint_search, reports
+from . import models
+
+# tables whose rows are rendered by conditional GET endpoints or held in
+# the process-local reference cache
+VERSIONED_MODELS = list(
+    dict.fromkeys(
+        [
+            models.Room,
+            models.RoomType,
+            models.RoomCategory,
+            models.HotelFloor,
+            models.BedType,
+            models.Amenity,
+            models.RoomAmenity,
+            models.RoomImage,
+            models.Shift,
+            models.HotelView,
+            models.Complaint,
+            models.AssignComplaint,
+            models.ProcessComplaint,
+            models.Profile,
+            models.ProfileShiftAssign,
+            models.RoomKeepingAssign,
+            *(getattr(models, name) for name in reference.REFERENCE_MODELS),
+        ]
+    )
+)
+
+
+def bump_table_version(sender, **kwargs):
+    versions.bump(sender)
+    if reference.is_reference_model(sender):
+        reference.mark_written(sender)
+
+
+# connected per model: a receiver listening to every sender would stop Django
+# from fast-deleting rows of unrelated tables
+for versioned_model in VERSIONED_MODELS:
+    post_save.connect(bump_table_version, sender=versioned_model)
+    post_delete.connect(bump_table_version, sender=versioned_model)
+
+
+@receiver(m2m_changed, sender=models.RoomType.amenities.through)
+def propagate_room_type_amenities(sender, instance, action, reverse, pk_set, **kwargs):
+    # reverse is True when the change is made from the amenity side,
+    # e.g. amenity.room_types.add(room_type)
+    if action == "pre_clear" and reverse:
+        instance._cleared_pks = set(instance.room_types.values_list("id", flat=True))
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if reverse:
+        room_type_ids = getattr(instance, "_cleared_pks", set()) if action == "post_clear" else pk_set
+    else:
+        room_type_ids = {instance.pk}
+    amenities.reconcile_room_type_amenities(room_type_ids)
+    amenities.refresh_room_type_masks(room_type_ids)
+    versions.bump(models.RoomType)
+
+
+@receiver(m2m_changed, sender=models.Complaint.hashtags.through)
+def bump_complaint_hashtags_version(sender, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        versions.bump(sender)
+
+
+@receiver(m2m_changed, sender=models.Room.amenities.through)
+def refresh_room_amenity_masks(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear" and reverse:
+        instance._cleared_pks = set(instance.rooms.values_list("id", flat=True))
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if reverse:
+        room_ids = getattr(instance, "_cleared_pks", set()) if action == "post_clear" else pk_set
+    else:
+        room_ids = {instance.pk}
+    amenities.refresh_room_masks(room_ids)
+    versions.bump(models.Room, models.RoomAmenity)
+
+
+# deletes go through room.amenities or the bulk propagation, which refresh
+# the masks themselves, so only single inserts are handled here
+@receiver(post_save, sender=models.RoomAmenity)
+def refresh_room_amenity_mask(sender, instance, **kwargs):
+    amenities.refresh_room_masks([instance.room_id])
+
+
+@receiver(pre_delete, sender=models.Amenity)
+def clear_deleted_amenity_bit(sender, instance, **kwargs):
+    if instance.bit is not None:
+        amenities.clear_amenity_bit(instance.bit)
+
+
+@receiver(post_save, sender=models.RoomRate)
+@receiver(post_delete, sender=models.RoomRate)
+def reprice_rooms_on_rate_change(sender, instance, **kwargs):
+    models.OutboxEvent.objects.publish(
+        "room_rate.changed", instance, {"room_type": instance.room_type_id}
+    )
+
+
+@receiver(post_save, sender=models.RoomType)
+def reprice_rooms_on_base_price_change(sender, instance, created, **kwargs):
+    if not created:
+        models.OutboxEvent.objects.publish(
+            "room_type.changed", instance, {"room_type": instance.id}
+        )
+
+
+@receiver(post_save, sender=models.RoomImage)
+@receiver(post_save, sender=models.Profile)
+def generate_variants_on_upload(sender, instance, **kwargs):
+    image_field, variants_field = images.VARIANT_FIELDS[sender._meta.model_name]
+    field_file = getattr(instance, image_field)
+    if field_file and getattr(instance, variants_field).get("source") != field_file.name:
+        models.OutboxEvent.objects.publish(
+            "image.uploaded", instance, {"model": sender._meta.model_name}
+        )
+
+
+@receiver(post_save, sender=models.ComplaintRoutingRule)
+@receiver(post_delete, sender=models.ComplaintRoutingRule)
+@receiver(m2m_changed, sender=models.ComplaintRoutingRule.amenities.through)
+@receiver(m2m_changed, sender=models.ComplaintRoutingRule.floors.through)
+@receiver(m2m_changed, sender=models.ComplaintRoutingRule.hashtags.through)
+def recompile_routing_rules(sender, **kwargs):
+    # every process recompiles its rule index on the next complaint
+    versions.bump(models.ComplaintRoutingRule)
+    reference.mark_written(models.ComplaintRoutingRule)
+
+
+@receiver(post_save, sender=models.Complaint)
+def index_complaint(sender, instance, **kwargs):
+    complaint_search.index_complaints([instance.id])
+
+
+@receiver(post_save, sender=models.AssignComplaint)
+@receiver(post_save, sender=models.ProcessComplaint)
+def index_complaint_notes(sender, instance, **kwargs):
+    if instance.complaint_id:
+        complaint_search.index_complaints([instance.complaint_id])
+
+
+@receiver(post_delete, sender=models.Complaint)
+def unindex_complaint(sender, instance, **kwargs):
+    complaint_search.remove_complaints([instance.id])
+
+
+@receiver(pre_save, sender=models.Booking)
+def invalidate_moved_stay(sender, instance, update_fields=None, **kwargs):
+    # the occupancy rollup only finds the new nights of a moved stay by itself
+    if instance._state.adding or (
+        update_fields and not {"check_in_date", "check_out_date"} & set(update_fields)
+    ):
+        return
+    previous = (
+        sender.objects.filter(pk=instance.pk)
+        .values_list("check_in_date", "check_out_date")
+        .first()
+    )
+    if previous and previous != (instance.check_in_date, instance.check_out_date):
+        reports.invalidate_stay(*previous)
+
+
+@receiver(post_delete, sender=models.Booking)
+def invalidate_deleted_stay(sender, instance, **kwargs):
+    reports.invalidate_stay(instance.check_in_date, instance.check_out_date)
+
+
+# the day column each labor rollup source is counted on
+LABOR_DATE_FIELDS = {
+    models.ProfileShiftAssign: "date",
+    models.RoomKeepingAssign: "assignment_date",
+}
+
+
+@receiver(pre_save, sender=models.ProfileShiftAssign)
+@receiver(pre_save, sender=models.RoomKeepingAssign)
+def invalidate_moved_labor_day(sender, instance, update_fields=None, **kwargs):
+    # the labor rollup only finds the new day of a moved shift or task by itself
+    field = LABOR_DATE_FIELDS[sender]
+    if instance._state.adding or (update_fields and field not in update_fields):
+        return
+    previous = sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+    if previous and previous != getattr(instance, field):
+        reports.invalidate_labor_day(previous)
+
+
+@receiver(post_delete, sender=models.ProfileShiftAssign)
+@receiver(post_delete, sender=models.RoomKeepingAssign)
+def invalidate_deleted_labor_day(sender, instance, **kwargs):
+    reports.invalidate_labor_day(getattr(instance, LABOR_DATE_FIELDS[sender]))
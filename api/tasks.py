@@ -1,40 +1,131 @@
 from celery.app import shared_task
 from django.utils import timezone
-from .models import ProfileShiftAssign, RoomKeepingAssign
-from django.db import transaction
 from celery.utils.log import get_task_logger
+from utils import reports, night_audit, outbox, pricing, images, versions, complaint_search, complaint_sla, shift_lifecycle
+from django.apps import apps
+from datetime import timedelta
 
 logger = get_task_logger(__name__)
 
 @shared_task
 def update_shift_status():
     """
-    Updates the status of shifts that have passed.
+    Starts and expires the shifts whose start or end time has passed, a batch at a time.
     """
-    logger.info("Task update_shift_status started")
-    print("in update_shift_status")
-    past_shifts = ProfileShiftAssign.objects.filter(
-        # shift_end_time__lte=timezone.now(),
-        date=timezone.now().date()
+    totals = {}
+    while True:
+        summary = shift_lifecycle.advance_shifts()
+        for key, value in summary.items():
+            totals[key] = totals.get(key, 0) + value
+        if summary["due"] < shift_lifecycle.LIFECYCLE_BATCH_SIZE:
+            break
+    if totals["started"] or totals["expired"]:
+        logger.info(f"Task update_shift_status advanced {totals}")
+    return totals
+
+@shared_task
+def refresh_daily_occupancy():
+    """
+    Incrementally rebuilds the daily occupancy and revenue facts.
+    """
+    summary = reports.refresh_daily_occupancy()
+    logger.info(f"Task refresh_daily_occupancy rebuilt {summary}")
+    return {key: str(value) for key, value in summary.items()}
+
+@shared_task
+def refresh_daily_labor():
+    """
+    Incrementally rebuilds the daily labor hours and productivity rollup.
+    """
+    summary = reports.refresh_daily_labor()
+    logger.info(f"Task refresh_daily_labor rebuilt {summary}")
+    return {key: str(value) for key, value in summary.items()}
+
+@shared_task
+def run_night_audit():
+    """
+    Closes the previous business day: no-shows, overstays and room charges.
+    """
+    business_date = timezone.localdate() - timedelta(days=1)
+    audit = night_audit.run_night_audit(business_date)
+    logger.info(
+        f"Night audit {business_date}: {audit.no_shows} no-shows, "
+        f"{audit.overstays} overstays, {audit.room_charges_posted} room charges"
     )
-    for shift in past_shifts:
-        with transaction.atomic():
-            if shift.status.change_after_expiry:
-                shift.change_status("Expired")
-                shift.save()
-            unfinished_assignments = []
-            for assignment in shift.room_keeping_assignments.all():
-                if assignment.current_status not in [
-                    "Ended",
-                    "Completed",
-                    "Confirmed",
-                    "Faulty",
-                    "Cancelled",
-                    "Unfinished",
-                ]:
-                    assignment.change_status("Unfinished")
-                    unfinished_assignments.append(assignment)
-            if unfinished_assignments:
-                RoomKeepingAssign.objects.bulk_update(
-                    unfinished_assignments, ["current_status"]
-                )
+    return str(audit.id)
+
+@shared_task
+def relay_outbox():
+    """
+    Delivers pending outbox events to their handlers until the outbox is drained.
+    """
+    processed = failed = 0
+    # failed events are pushed back by their retry delay, so this ends once
+    # every deliverable event has been handed over
+    while True:
+        summary = outbox.relay()
+        if not summary["processed"] and not summary["failed"]:
+            break
+        processed += summary["processed"]
+        failed += summary["failed"]
+    if processed or failed:
+        logger.info(f"Outbox relay delivered {processed} events, {failed} failed")
+    return {"processed": processed, "failed": failed}
+
+@shared_task
+def reprice_rooms():
+    """
+    Moves every room to the price valid today as rate periods start and end.
+    """
+    repriced = pricing.reprice_rooms()
+    logger.info(f"Task reprice_rooms repriced {repriced} rooms")
+    return repriced
+
+@shared_task
+def generate_image_variants(model_name, pk):
+    """
+    Generates the resized variants of an uploaded room image or profile photo.
+    """
+    image_field, variants_field = images.VARIANT_FIELDS[model_name]
+    model = apps.get_model("api", model_name)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return None
+    field_file = getattr(instance, image_field)
+    if not field_file or getattr(instance, variants_field).get("source") == field_file.name:
+        return None
+    variants = images.generate_variants(field_file)
+    # update() keeps the post_save signal that queued this task from firing again,
+    # and is skipped if the image was replaced while the variants were rendered
+    model.objects.filter(pk=pk, **{image_field: field_file.name}).update(
+        **{variants_field: variants}
+    )
+    versions.bump(model)
+    return variants
+
+
+@shared_task
+def reindex_complaints():
+    """
+    Rebuilds the complaint search index, e.g. after it is first created.
+    New writes are indexed as they happen.
+    """
+    indexed = complaint_search.reindex_all()
+    logger.info(f"indexed {indexed} complaints for search")
+    return indexed
+
+
+@shared_task
+def escalate_overdue_complaints():
+    """
+    Escalates complaint assignments whose SLA has run out, a batch at a time.
+    """
+    escalated = 0
+    while True:
+        batch = complaint_sla.escalate_overdue()
+        escalated += batch
+        if batch < complaint_sla.ESCALATION_BATCH_SIZE:
+            break
+    if escalated:
+        logger.info(f"escalated {escalated} overdue complaint assignments")
+    return escalated
@@ -0,0 +1,184 @@
+from .. import models as api_models
+from .. import serializers as api_serializers
+from django.apps import apps
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+from datetime import timedelta
+from decimal import Decimal
+from importlib import import_module
+from types import SimpleNamespace
+from rest_framework import serializers
+from utils import bookings, outbox
+
+
+class StayModificationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.deluxe = api_models.RoomType.objects.create(name="Deluxe", base_price=100)
+        cls.suite = api_models.RoomType.objects.create(name="Suite", base_price=300)
+        api_models.Room.objects.create(room_number="101", room_type=cls.deluxe)
+        api_models.Room.objects.create(room_number="201", room_type=cls.suite)
+        cls.check_in_date = timezone.now() + timedelta(days=10)
+
+    def create_booking(self, room_type, nights=2, offset=0):
+        check_in_date = self.check_in_date + timedelta(days=offset)
+        booking = api_models.Booking.objects.create(
+            room_type=room_type,
+            booking_status="confirmed",
+            check_in_date=check_in_date,
+            check_out_date=check_in_date + timedelta(days=nights),
+        )
+        booking.booking_cost = bookings.book_nights(booking)
+        booking.save()
+        return booking
+
+    def test_extend_prices_only_added_nights(self):
+        booking = self.create_booking(self.deluxe)
+        api_models.RoomRate.objects.create(
+            room_type=self.deluxe,
+            start_date=(self.check_in_date + timedelta(days=2)).date(),
+            end_date=(self.check_in_date + timedelta(days=2)).date(),
+            price=150,
+        )
+
+        result = bookings.modify_stay(
+            booking, check_out_date=booking.check_out_date + timedelta(days=1)
+        )
+
+        self.assertEqual(len(result["nights_added"]), 1)
+        self.assertEqual(result["nights_removed"], [])
+        self.assertEqual(result["booking"].booking_cost, Decimal("350.00"))
+        self.assertEqual(booking.nights.count(), 3)
+
+    def test_shorten_releases_nights(self):
+        booking = self.create_booking(self.deluxe, nights=3)
+
+        result = bookings.modify_stay(
+            booking, check_out_date=booking.check_out_date - timedelta(days=1)
+        )
+
+        self.assertEqual(result["cost_difference"], Decimal("-100.00"))
+        self.assertEqual(booking.nights.count(), 2)
+
+    def test_extend_into_sold_out_night_is_rejected(self):
+        booking = self.create_booking(self.deluxe)
+        self.create_booking(self.deluxe, nights=1, offset=2)
+
+        with self.assertRaises(serializers.ValidationError):
+            bookings.modify_stay(
+                booking, check_out_date=booking.check_out_date + timedelta(days=1)
+            )
+        booking.refresh_from_db()
+        self.assertEqual(booking.nights.count(), 2)
+
+    def test_backfilled_legacy_bookings_hold_inventory(self):
+        legacy = api_models.Booking.objects.create(
+            room_type=self.deluxe,
+            booking_status="confirmed",
+            check_in_date=self.check_in_date,
+            check_out_date=self.check_in_date + timedelta(days=2),
+            booking_cost=Decimal("180.00"),
+        )
+        nights = bookings.stay_nights(legacy.check_in_date, legacy.check_out_date)
+        self.assertEqual(bookings.unavailable_nights(self.deluxe, nights), [])
+
+        migration = import_module("api.migrations.0033_bookingnight")
+        migration.backfill_booking_nights(apps, SimpleNamespace(connection=connection))
+
+        self.assertEqual(legacy.nights.count(), 2)
+        self.assertEqual(set(legacy.nights.values_list("rate", flat=True)), {Decimal("90.00")})
+        self.assertEqual(bookings.unavailable_nights(self.deluxe, nights), nights)
+        migration.backfill_booking_nights(apps, SimpleNamespace(connection=connection))
+        self.assertEqual(legacy.nights.count(), 2)
+
+    def test_new_booking_on_a_sold_out_night_is_rejected(self):
+        self.create_booking(self.deluxe)
+        guest = {
+            "first_name": "Late",
+            "last_name": "Arrival",
+            "gender": api_models.Gender.objects.create(name="Female"),
+        }
+
+        with self.assertRaises(serializers.ValidationError):
+            api_serializers.BookingSerializer().create(
+                {
+                    "guest": guest,
+                    "room_type": self.deluxe,
+                    "check_in_date": self.check_in_date + timedelta(days=1),
+                    "check_out_date": self.check_in_date + timedelta(days=3),
+                    "created_by": None,
+                }
+            )
+        self.assertEqual(api_models.Booking.objects.count(), 1)
+
+    def test_change_room_type_reprices_stay(self):
+        booking = self.create_booking(self.deluxe)
+
+        result = bookings.modify_stay(booking, room_type=self.suite)
+
+        self.assertEqual(result["booking"].booking_cost, Decimal("600.00"))
+        self.assertEqual(
+            set(booking.nights.values_list("room_type", flat=True)), {self.suite.id}
+        )
+
+
+class GroupCheckoutTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.deluxe = api_models.RoomType.objects.create(name="Deluxe", base_price=100)
+        cls.rooms = [
+            api_models.Room.objects.create(
+                room_number=f"30{index}", room_type=cls.deluxe, is_occupied=True
+            )
+            for index in range(3)
+        ]
+
+    def setUp(self):
+        self.bookings = []
+        for index, room in enumerate(self.rooms):
+            guest = api_models.Guest.objects.create(
+                guest_id=f"G{index}", first_name="Tour", last_name=f"Member {index}"
+            )
+            booking = api_models.Booking.objects.create(
+                guest=guest,
+                room_type=self.deluxe,
+                booking_code=f"B{index}",
+                booking_status="checked-in",
+            )
+            api_models.Checkin.objects.create(
+                booking_code=booking.booking_code,
+                guest=guest,
+                guest_name=guest.full_name,
+                room=room,
+                room_number=room.room_number,
+            )
+            self.bookings.append(booking)
+
+    def test_group_checkout_queues_departure_cleans(self):
+        checkouts = bookings.checkout_bookings([booking.id for booking in self.bookings])
+        outbox.relay()
+
+        self.assertEqual(len(checkouts), 3)
+        self.assertEqual(
+            api_models.Booking.objects.filter(booking_status="checked-out").count(), 3
+        )
+        self.assertFalse(api_models.Checkin.objects.filter(checked_out=False).exists())
+        self.assertFalse(api_models.Room.objects.filter(is_occupied=True).exists())
+        self.assertEqual(
+            set(api_models.Room.objects.values_list("room_maintenance_status", flat=True)), {"used"}
+        )
+        cleans = api_models.RoomKeepingAssign.objects.filter(title="Departure clean")
+        self.assertEqual(cleans.count(), 3)
+        self.assertEqual(
+            api_models.ProcessRoomKeeping2.objects.filter(status__name="Pending").count(), 3
+        )
+
+    def test_group_checkout_is_all_or_nothing(self):
+        self.bookings[0].booking_status = "confirmed"
+        self.bookings[0].save()
+
+        with self.assertRaises(serializers.ValidationError):
+            bookings.checkout_bookings([booking.id for booking in self.bookings])
+
+        self.assertFalse(api_models.Checkout.objects.exists())
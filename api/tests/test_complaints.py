@@ -0,0 +1,443 @@
+from .. import models as api_models
+from ..throttles import GuestComplaintIPThrottle
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+from django.core import mail
+from django.core.cache import cache
+from django.utils import timezone
+from datetime import time, timedelta
+from utils import complaint_routing, complaint_sla, outbox
+
+
+class ComplaintListTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = api_models.CustomUser.objects.create_user(
+            username="frontdesk", first_name="Front", last_name="Desk", password="secret"
+        )
+        cls.frontdesk = api_models.Department.objects.create(name="Frontdesk")
+        cls.housekeeping = api_models.Department.objects.create(name="Housekeeping")
+        cls.profile = api_models.Profile.objects.create(
+            user=cls.user, full_name="Front Desk", department=cls.frontdesk
+        )
+        cls.room = api_models.Room.objects.create(
+            room_number="101",
+            room_type=api_models.RoomType.objects.create(name="Deluxe", base_price=100),
+        )
+        cls.high = api_models.Priority.objects.create(name="High")
+        cls.low = api_models.Priority.objects.create(name="Low")
+        cls.pending = api_models.ComplaintStatus.objects.create(name="Pending")
+        cls.resolved = api_models.ComplaintStatus.objects.create(name="Resolved")
+        cls.towels = api_models.Amenity.objects.create(name="Towels")
+        cls.cleaning = api_models.Hashtag.objects.create(name="#cleaning")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_complaints(self, count, **kwargs):
+        for number in range(count):
+            complaint = api_models.Complaint.objects.create(
+                guest=f"Guest {number}",
+                room_number=self.room,
+                message="No towels",
+                department=kwargs.get("department", self.housekeeping),
+                priority=kwargs.get("priority", self.high),
+                status=kwargs.get("status", self.pending),
+            )
+            complaint.complaint_items.add(self.towels)
+            complaint.hashtags.add(self.cleaning)
+            assigned = api_models.AssignComplaint.objects.create(
+                complaint=complaint,
+                guest=complaint.guest,
+                room_number="101",
+                message=complaint.message,
+                assigned_to=self.profile,
+                assigned_to_department=self.housekeeping,
+                assigned_by=self.profile,
+                priority=self.high,
+            )
+            assigned.hashtags.add(self.cleaning)
+            api_models.ProcessComplaint.objects.create(
+                complaint=complaint,
+                assigned_complaint=assigned,
+                processed_by=self.profile,
+                note="Delivered",
+                complaint_status=self.resolved,
+            )
+
+    def test_query_count_does_not_grow_with_page_size(self):
+        self.create_complaints(2)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(reverse("complaints"))
+        self.create_complaints(20)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(reverse("complaints"), {"page_size": 20})
+
+        self.assertEqual(len(response.data["results"]), 20)
+        complaint = response.data["results"][0]
+        self.assertEqual(complaint["room_number"], "101")
+        self.assertEqual(complaint["complaint_items"], ["Towels"])
+        self.assertEqual(complaint["assigned_complaints"][0]["assigned_to_department"], "Housekeeping")
+        self.assertEqual(complaint["process_complaints"][0]["complaint_status"], "Resolved")
+        # profile, complaints, items, hashtags, assignments, their hashtags, processing
+        self.assertEqual(len(many), 7)
+        self.assertEqual(len(many), len(few))
+
+    def test_cursor_pages_through_every_complaint(self):
+        self.create_complaints(3)
+
+        first = self.client.get(reverse("complaints"), {"page_size": 2})
+        second = self.client.get(first.data["next"])
+
+        self.assertEqual(len(first.data["results"]), 2)
+        self.assertEqual(len(second.data["results"]), 1)
+        self.assertIsNone(second.data["next"])
+
+    def test_filters(self):
+        self.create_complaints(2)
+        self.create_complaints(1, priority=self.low, department=self.frontdesk)
+
+        by_priority = self.client.get(reverse("complaints"), {"priority": "Low"})
+        by_department = self.client.get(
+            reverse("complaints"), {"department": "Housekeeping,Frontdesk"}
+        )
+        by_status = self.client.get(reverse("complaints"), {"status": "Resolved"})
+        by_date = self.client.get(reverse("complaints"), {"end_date": "2000-01-01"})
+        bad_date = self.client.get(reverse("complaints"), {"start_date": "yesterday"})
+
+        self.assertEqual(len(by_priority.data["results"]), 1)
+        self.assertEqual(len(by_department.data["results"]), 3)
+        self.assertEqual(len(by_status.data["results"]), 0)
+        self.assertEqual(len(by_date.data["results"]), 0)
+        self.assertEqual(bad_date.status_code, 400)
+
+
+class ComplaintRoutingTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = api_models.CustomUser.objects.create_user(
+            username="frontdesk", first_name="Front", last_name="Desk", password="secret"
+        )
+        cls.housekeeping = api_models.Department.objects.create(name="Housekeeping")
+        cls.maintenance = api_models.Department.objects.create(name="Maintenance")
+        cls.high = api_models.Priority.objects.create(name="High")
+        api_models.ComplaintStatus.objects.create(name="Assigned")
+        cls.towels = api_models.Amenity.objects.create(name="Towels")
+        cls.cleaning = api_models.Hashtag.objects.create(name="#cleaning")
+        cls.urgent = api_models.Hashtag.objects.create(name="#urgent")
+        cls.top_floor = api_models.HotelFloor.objects.create(name="Fifth")
+        cls.room = api_models.Room.objects.create(
+            room_number="501",
+            floor=cls.top_floor,
+            room_type=api_models.RoomType.objects.create(name="Deluxe", base_price=100),
+        )
+        towel_rule = api_models.ComplaintRoutingRule.objects.create(
+            name="Towels", position=1, department=cls.housekeeping
+        )
+        towel_rule.amenities.add(cls.towels)
+        towel_rule.hashtags.add(cls.cleaning)
+        leak_rule = api_models.ComplaintRoutingRule.objects.create(
+            name="Leaks",
+            position=2,
+            keywords="leak, flooding",
+            department=cls.maintenance,
+            priority=cls.high,
+        )
+        leak_rule.hashtags.add(cls.urgent)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_new_complaint_is_assigned_by_the_rules(self):
+        response = self.client.post(
+            reverse("add_complaint"),
+            {
+                "guest": "Ama Mensah",
+                "room_number": "501",
+                "title": "Bathroom",
+                "message": "There is a LEAK and no towels",
+                "complaint_items": ["Towels"],
+            },
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, 201)
+        complaint = api_models.Complaint.objects.get(id=response.data["id"])
+        self.assertEqual(complaint.department, self.housekeeping)
+        self.assertEqual(complaint.priority, self.high)
+        self.assertEqual(complaint.status.name, "Assigned")
+        self.assertEqual(set(complaint.hashtags.all()), {self.cleaning, self.urgent})
+        assignment = complaint.assigned_complaints.get()
+        self.assertEqual(assignment.assigned_to_department, self.housekeeping)
+        self.assertEqual(assignment.room_number, "501")
+
+    def test_rules_without_a_priority_still_start_the_sla_clock(self):
+        complaint = api_models.Complaint.objects.create(
+            guest="Ama Mensah", room_number=self.room, message="Fresh towels please"
+        )
+        complaint.complaint_items.add(self.towels)
+
+        assignment = complaint_routing.route_complaint(complaint)
+
+        self.assertEqual(assignment.priority.name, "Normal")
+        self.assertEqual(
+            assignment.due_at, assignment.date_assigned + timedelta(minutes=240)
+        )
+        self.assertEqual(list(assignment.complaint_items.all()), [self.towels])
+
+    def test_unmatched_complaint_is_left_for_a_supervisor(self):
+        complaint = api_models.Complaint.objects.create(
+            guest="Ama Mensah", room_number=self.room, message="The leaking tap is noisy"
+        )
+
+        self.assertIsNone(complaint_routing.route_complaint(complaint))
+        self.assertFalse(complaint.assigned_complaints.exists())
+
+    def test_floor_and_overnight_window_conditions(self):
+        night_rule = api_models.ComplaintRoutingRule.objects.create(
+            name="Night noise",
+            keywords="noise",
+            active_from=time(22, 0),
+            active_to=time(6, 0),
+            department=self.maintenance,
+        )
+        night_rule.floors.add(self.top_floor)
+        index = complaint_routing.rule_index()
+
+        def route(floor_id, at):
+            return index.route([], ["Noise from the corridor"], floor_id, at)["rules"]
+
+        self.assertEqual(route(self.top_floor.id, time(23, 30)), ["Night noise"])
+        self.assertEqual(route(self.top_floor.id, time(5, 0)), ["Night noise"])
+        self.assertEqual(route(self.top_floor.id, time(12, 0)), [])
+        self.assertEqual(route(None, time(23, 30)), [])
+
+    def test_rule_changes_are_picked_up(self):
+        self.assertEqual(
+            complaint_routing.rule_index().route([], ["flooding"])["rules"], ["Leaks"]
+        )
+
+        api_models.ComplaintRoutingRule.objects.filter(name="Leaks").get().delete()
+
+        self.assertEqual(complaint_routing.rule_index().route([], ["flooding"])["rules"], [])
+
+
+class ComplaintSearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = api_models.CustomUser.objects.create_user(
+            username="guestrelations", first_name="Guest", last_name="Relations", password="secret"
+        )
+        api_models.Profile.objects.create(user=cls.user, full_name="Guest Relations")
+        room_type = api_models.RoomType.objects.create(name="Deluxe", base_price=100)
+        cls.room_412 = api_models.Room.objects.create(room_number="412", room_type=room_type)
+        cls.room_215 = api_models.Room.objects.create(room_number="215", room_type=room_type)
+        cls.leak = api_models.Complaint.objects.create(
+            guest="Ama Mensah", room_number=cls.room_412, title="AC", message="Water is leaking"
+        )
+        cls.noise = api_models.Complaint.objects.create(
+            guest="Kofi Boateng", room_number=cls.room_215, title="Noise", message="Loud party next door"
+        )
+        cls.noted = api_models.Complaint.objects.create(
+            guest="Esi Owusu", room_number=cls.room_215, message="Cannot sleep"
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, query, **params):
+        response = self.client.get(reverse("search_complaints"), {"q": query, **params})
+        return [complaint["id"] for complaint in response.data["results"]]
+
+    def test_matches_stemmed_words_and_room_prefixes(self):
+        self.assertEqual(self.search("AC leaks room 4xx"), [str(self.leak.id)])
+        self.assertEqual(self.search("AC leaks room 2xx"), [])
+
+    def test_notes_are_indexed_as_they_are_written(self):
+        self.assertEqual(self.search("noise"), [str(self.noise.id)])
+
+        api_models.ProcessComplaint.objects.create(
+            complaint=self.noted, note="Guest moved away from the noise"
+        )
+
+        # the title match ranks above the match in a note
+        self.assertEqual(self.search("noise"), [str(self.noise.id), str(self.noted.id)])
+
+    def test_deleted_complaints_leave_the_index(self):
+        self.noise.delete()
+
+        self.assertEqual(self.search("noise"), [])
+
+    def test_query_is_required(self):
+        response = self.client.get(reverse("search_complaints"), {"q": " "})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class ComplaintEscalationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.urgent = api_models.Priority.objects.create(name="Urgent", sla_minutes=30)
+        cls.normal = api_models.Priority.objects.create(
+            name="Normal", sla_minutes=240, escalate_to=cls.urgent
+        )
+        cls.head = api_models.Profile.objects.create(
+            full_name="Head Keeper",
+            email="head@example.com",
+            user=api_models.CustomUser.objects.create_user(
+                username="head", first_name="Head", last_name="Keeper", password="secret"
+            ),
+        )
+        cls.housekeeping = api_models.Department.objects.create(name="Housekeeping", head=cls.head)
+        api_models.ComplaintStatus.objects.create(name="Escalated")
+
+    def assign(self, minutes_ago, priority=None):
+        complaint = api_models.Complaint.objects.create(
+            guest="Ama Mensah", message="No towels", priority=priority or self.normal
+        )
+        return api_models.AssignComplaint.objects.create(
+            complaint=complaint,
+            guest=complaint.guest,
+            room_number="101",
+            message=complaint.message,
+            assigned_to_department=self.housekeeping,
+            priority=priority or self.normal,
+            date_assigned=timezone.now() - timedelta(minutes=minutes_ago),
+        )
+
+    def test_due_time_follows_the_priority_sla(self):
+        assignment = self.assign(0)
+
+        self.assertEqual(assignment.due_at, assignment.date_assigned + timedelta(minutes=240))
+
+    def test_overdue_assignments_are_escalated_in_bulk(self):
+        overdue = [self.assign(300) for _ in range(3)]
+        on_time = self.assign(10)
+
+        # the same statements whatever the backlog, savepoints and reindexing
+        # included; SQLite syncs its FTS table with one more
+        with self.assertNumQueries(16 if connection.vendor == "sqlite" else 15):
+            escalated = complaint_sla.escalate_overdue()
+
+        self.assertEqual(escalated, 3)
+        assignment = api_models.AssignComplaint.objects.get(id=overdue[0].id)
+        self.assertEqual(assignment.priority, self.urgent)
+        self.assertEqual(assignment.assigned_to, self.head)
+        self.assertEqual(assignment.escalation_level, 1)
+        self.assertEqual(assignment.complaint_status.name, "Escalated")
+        self.assertGreater(assignment.due_at, timezone.now() + timedelta(minutes=29))
+        self.assertEqual(assignment.complaint.priority, self.urgent)
+        self.assertTrue(
+            api_models.ProcessComplaint.objects.filter(assigned_complaint=assignment).exists()
+        )
+        self.assertEqual(
+            api_models.OutboxEvent.objects.filter(event_type="complaint.escalated").count(), 3
+        )
+        on_time.refresh_from_db()
+        self.assertEqual(on_time.escalation_level, 0)
+        self.assertEqual(complaint_sla.escalate_overdue(), 0)
+
+    def test_the_top_of_the_chain_is_escalated_once(self):
+        assignment = self.assign(300, priority=self.urgent)
+
+        self.assertEqual(complaint_sla.escalate_overdue(), 1)
+
+        assignment.refresh_from_db()
+        self.assertEqual(assignment.priority, self.urgent)
+        self.assertEqual(assignment.assigned_to, self.head)
+        self.assertIsNone(assignment.due_at)
+        self.assertEqual(
+            complaint_sla.escalate_overdue(now=timezone.now() + timedelta(days=1)), 0
+        )
+
+    def test_heads_are_notified_once_per_relay(self):
+        self.assign(300)
+        self.assign(300)
+        complaint_sla.escalate_overdue()
+
+        outbox.relay()
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["head@example.com"])
+
+    def test_closing_a_complaint_stops_the_clock(self):
+        assignment = self.assign(300)
+
+        complaint_sla.stop_clock(api_models.AssignComplaint.objects.filter(id=assignment.id))
+
+        self.assertEqual(complaint_sla.escalate_overdue(), 0)
+
+
+class GuestComplaintTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.room = api_models.Room.objects.create(
+            room_number="305",
+            room_type=api_models.RoomType.objects.create(name="Deluxe", base_price=100),
+        )
+        api_models.Checkin.objects.create(
+            booking_code="BK-1001", guest_name="Ama Mensah", room=cls.room, room_number="305"
+        )
+        api_models.Checkin.objects.create(
+            booking_code="BK-0900",
+            guest_name="Kofi Boateng",
+            room=cls.room,
+            room_number="305",
+            checked_out=True,
+        )
+        cls.housekeeping = api_models.Department.objects.create(name="Housekeeping")
+        api_models.ComplaintStatus.objects.create(name="Assigned")
+        api_models.ComplaintRoutingRule.objects.create(
+            name="Towels", keywords="towels", department=cls.housekeeping
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def submit(self, booking_code="BK-1001", room_number="305", **extra):
+        return self.client.post(
+            reverse("guest_complaint"),
+            {"booking_code": booking_code, "room_number": room_number, "message": "No towels"},
+            REMOTE_ADDR=extra.get("ip", "10.0.0.1"),
+            format="json",
+        )
+
+    def test_in_house_guest_files_a_complaint_routed_later(self):
+        response = self.submit()
+
+        self.assertEqual(response.status_code, 201)
+        complaint = api_models.Complaint.objects.get(id=response.data["id"])
+        self.assertEqual(complaint.guest, "Ama Mensah")
+        self.assertEqual(complaint.room_number, self.room)
+        self.assertIsNone(complaint.department)
+
+        outbox.relay()
+
+        complaint.refresh_from_db()
+        self.assertEqual(complaint.department, self.housekeeping)
+
+    def test_wrong_room_or_departed_guest_is_rejected(self):
+        self.assertEqual(self.submit(room_number="306").status_code, 400)
+        self.assertEqual(self.submit(booking_code="BK-0900").status_code, 400)
+        self.assertFalse(api_models.Complaint.objects.exists())
+
+    def test_each_booking_code_has_its_own_bucket(self):
+        statuses = [self.submit(ip=f"10.0.0.{number}").status_code for number in range(6)]
+
+        self.assertEqual(statuses, [201] * 5 + [429])
+        self.assertEqual(self.submit(booking_code="BK-2000", ip="10.0.0.9").status_code, 400)
+
+    def test_each_address_has_its_own_bucket(self):
+        statuses = [
+            self.submit(booking_code=f"BK-{number}").status_code
+            for number in range(GuestComplaintIPThrottle.capacity + 1)
+        ]
+
+        self.assertEqual(statuses[-1], 429)
+        self.assertEqual(self.submit(ip="10.0.0.2").status_code, 201)
@@ -0,0 +1,53 @@
+from .. import models as api_models
+from django.test import TestCase
+from django.utils import timezone
+from datetime import timedelta
+from decimal import Decimal
+from utils import night_audit
+
+
+class NightAuditTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.deluxe = api_models.RoomType.objects.create(name="Deluxe", base_price=100)
+        cls.yesterday = timezone.now() - timedelta(days=1)
+
+    def create_booking(self, booking_status, check_in_date, nights=2):
+        return api_models.Booking.objects.create(
+            room_type=self.deluxe,
+            booking_status=booking_status,
+            check_in_date=check_in_date,
+            check_out_date=check_in_date + timedelta(days=nights),
+            booking_cost=Decimal("100.00") * nights,
+        )
+
+    def test_night_audit_transitions_and_charges(self):
+        no_show = self.create_booking("confirmed", self.yesterday)
+        future = self.create_booking("pending", self.yesterday + timedelta(days=3))
+        in_house = self.create_booking("checked-in", self.yesterday)
+        overstay = self.create_booking(
+            "checked-in", self.yesterday - timedelta(days=3), nights=2
+        )
+
+        audit = night_audit.run_night_audit(self.yesterday.date())
+
+        no_show.refresh_from_db()
+        future.refresh_from_db()
+        overstay.refresh_from_db()
+        self.assertEqual(no_show.booking_status, "no-show")
+        self.assertEqual(future.booking_status, "pending")
+        self.assertTrue(overstay.is_overstay)
+        self.assertEqual(audit.no_shows, 1)
+        self.assertEqual(audit.overstays, 1)
+        self.assertEqual(audit.room_charges_posted, 2)
+        self.assertEqual(audit.room_revenue_posted, Decimal("200.00"))
+        self.assertEqual(in_house.folio_charges.get().amount, Decimal("100.00"))
+
+    def test_night_audit_is_idempotent(self):
+        self.create_booking("checked-in", self.yesterday)
+        night_audit.run_night_audit(self.yesterday.date())
+
+        audit = night_audit.run_night_audit(self.yesterday.date())
+
+        self.assertEqual(audit.room_charges_posted, 1)
+        self.assertEqual(api_models.FolioCharge.objects.count(), 1)
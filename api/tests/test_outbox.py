@@ -0,0 +1,53 @@
+from .. import models as api_models
+from django.test import TestCase
+from django.utils import timezone
+from datetime import timedelta
+from utils import bookings, outbox
+
+
+class OutboxRelayTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.deluxe = api_models.RoomType.objects.create(name="Deluxe", base_price=100)
+        cls.booking = api_models.Booking.objects.create(
+            room_type=cls.deluxe,
+            booking_code="B1",
+            booking_status="confirmed",
+            check_in_date=timezone.now() + timedelta(days=1),
+            check_out_date=timezone.now() + timedelta(days=2),
+        )
+
+    def test_cancelling_a_booking_records_an_event(self):
+        bookings.cancel_booking(self.booking)
+
+        event = api_models.OutboxEvent.objects.get(event_type="booking.cancelled")
+        self.assertEqual(event.aggregate_id, str(self.booking.id))
+        self.assertEqual(event.payload["booking_code"], "B1")
+
+        summary = outbox.relay()
+
+        self.assertEqual(summary, {"processed": 1, "failed": 0})
+        self.assertFalse(api_models.OutboxEvent.objects.pending(1).exists())
+
+    def test_failing_handler_is_retried_later(self):
+        api_models.OutboxEvent.objects.publish("test.failing", self.booking)
+        api_models.OutboxEvent.objects.publish("test.working", self.booking)
+        delivered = []
+
+        def fail(events):
+            raise RuntimeError("downstream unavailable")
+
+        outbox.HANDLERS["test.failing"] = fail
+        outbox.HANDLERS["test.working"] = delivered.extend
+        self.addCleanup(outbox.HANDLERS.pop, "test.failing")
+        self.addCleanup(outbox.HANDLERS.pop, "test.working")
+
+        summary = outbox.relay()
+
+        self.assertEqual(summary, {"processed": 1, "failed": 1})
+        self.assertEqual(len(delivered), 1)
+        failed = api_models.OutboxEvent.objects.get(event_type="test.failing")
+        self.assertIsNone(failed.processed_at)
+        self.assertEqual(failed.attempts, 1)
+        self.assertIn("downstream unavailable", failed.last_error)
+        self.assertGreater(failed.available_at, timezone.now())
@@ -0,0 +1,122 @@
+from .. import models as api_models
+from .. import serializers as api_serializers
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+from utils import reference
+
+
+class ReferenceCacheTest(TransactionTestCase):
+    def setUp(self):
+        api_models.Gender.objects.create(name="Female")
+        api_models.NameTitle.objects.create(name="Dr")
+        api_models.IdentificationType.objects.create(name="Passport")
+        api_models.Country.objects.create(name="Ghana")
+        self.guest_data = {
+            "title": "Dr",
+            "first_name": "Ama",
+            "last_name": "Mensah",
+            "gender": "Female",
+            "identification_type": "Passport",
+            "identification_number": "G123",
+            "country": "Ghana",
+        }
+
+    def test_slug_fields_resolve_without_queries_once_loaded(self):
+        api_serializers.GuestSerializer(data=self.guest_data).is_valid(raise_exception=True)
+
+        with self.assertNumQueries(0):
+            serializer = api_serializers.GuestSerializer(data=self.guest_data)
+            serializer.is_valid(raise_exception=True)
+        self.assertEqual(serializer.validated_data["country"].name, "Ghana")
+
+    def test_saved_rows_are_picked_up(self):
+        self.assertIsNone(reference.get_by(api_models.Gender, "name", "Male"))
+
+        api_models.Gender.objects.create(name="Male")
+
+        self.assertIsNotNone(reference.get_by(api_models.Gender, "name", "Male"))
+
+    def test_tables_are_cached_again_once_the_writing_transaction_ends(self):
+        with transaction.atomic():
+            api_models.Gender.objects.create(name="Male")
+            self.assertIsNone(reference.table(api_models.Gender))
+        with transaction.atomic():
+            self.assertIsNotNone(reference.table(api_models.Gender))
+
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            api_models.Gender.objects.create(name="Other")
+            raise RuntimeError
+        with transaction.atomic():
+            self.assertIsNotNone(reference.table(api_models.Gender))
+
+    def test_writes_rolled_back_with_a_savepoint_are_forgotten(self):
+        with transaction.atomic():
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                api_models.Gender.objects.create(name="Other")
+                raise RuntimeError
+            self.assertIsNotNone(reference.table(api_models.Gender))
+
+            api_models.Gender.objects.create(name="Male")
+            self.assertIsNone(reference.table(api_models.Gender))
+
+    def test_lookups_hand_out_copies(self):
+        female = reference.get_by(api_models.Gender, "name", "Female")
+        female.name = "Changed"
+
+        self.assertEqual(reference.get(api_models.Gender, female.pk).name, "Female")
+
+
+class ReferenceCacheTransactionTest(TestCase):
+    def test_rows_written_in_an_open_transaction_are_not_cached(self):
+        api_models.Gender.objects.create(name="Female")
+
+        self.assertIsNone(reference.table(api_models.Gender))
+        self.assertEqual(
+            api_serializers.GuestSerializer().fields["gender"].to_internal_value("Female").name,
+            "Female",
+        )
+
+
+class BootstrapTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = api_models.CustomUser.objects.create_user(
+            username="frontdesk", first_name="Front", last_name="Desk", password="secret"
+        )
+        api_models.Gender.objects.create(name="Female")
+        api_models.Amenity.objects.create(name="Wifi")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_returns_every_collection_with_one_etag(self):
+        response = self.client.get(reverse("bootstrap"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            set(response.data),
+            {
+                "genders", "countries", "titles", "shifts", "shift_statuses",
+                "priorities", "room_types", "room_categories", "bed_types",
+                "floors", "views", "amenities",
+            },
+        )
+        self.assertEqual(response.data["genders"][0]["name"], "Female")
+        with self.assertNumQueries(0):
+            unchanged = self.client.get(
+                reverse("bootstrap"), HTTP_IF_NONE_MATCH=response["ETag"]
+            )
+        self.assertEqual(unchanged.status_code, 304)
+
+    def test_etag_changes_when_any_collection_changes(self):
+        etag = self.client.get(reverse("bootstrap"))["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            api_models.Shift.objects.create(name="Night")
+        changed = self.client.get(reverse("bootstrap"), HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(changed.status_code, 200)
+        self.assertEqual(changed.data["shifts"][0]["name"], "Night")
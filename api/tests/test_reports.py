@@ -0,0 +1,298 @@
+from .. import models as api_models
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from rest_framework import serializers
+from utils import bookings, helpers, reports
+
+
+class DailyOccupancyRollupTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.deluxe = api_models.RoomType.objects.create(name="Deluxe", base_price=100)
+        api_models.Room.objects.create(room_number="101", room_type=cls.deluxe)
+        api_models.Room.objects.create(room_number="102", room_type=cls.deluxe)
+        cls.today = timezone.now().replace(hour=12, minute=0, second=0, microsecond=0)
+
+    def create_booking(self, nights=2, **kwargs):
+        booking = api_models.Booking.objects.create(
+            room_type=self.deluxe,
+            check_in_date=self.today,
+            check_out_date=self.today + timedelta(days=nights),
+            **kwargs,
+        )
+        booking.booking_cost = bookings.book_nights(booking)
+        booking.save()
+        return booking
+
+    def test_rollup_spreads_bookings_over_nights(self):
+        self.create_booking(booking_status="confirmed", number_of_guests=2)
+        self.create_booking(booking_status="no-show")
+        self.create_booking(booking_status="cancelled")
+
+        summary = reports.refresh_daily_occupancy()
+
+        self.assertEqual(summary["rows"], 3)
+        first_night = api_models.DailyOccupancy.objects.get(
+            date=self.today.date(), rooms_sold=1
+        )
+        self.assertEqual(first_night.revenue, Decimal("100.00"))
+        self.assertEqual(first_night.guests, 2)
+        self.assertEqual(first_night.arrivals, 1)
+        departure = api_models.DailyOccupancy.objects.get(
+            date=(self.today + timedelta(days=2)).date()
+        )
+        self.assertEqual(departure.departures, 1)
+        self.assertEqual(departure.rooms_sold, 0)
+        self.assertEqual(
+            api_models.DailyOccupancy.objects.filter(no_shows=1).count(), 1
+        )
+
+    def test_refresh_only_reprocesses_changed_bookings(self):
+        self.create_booking(booking_status="confirmed")
+        reports.refresh_daily_occupancy()
+        # older than the overlap looked at again for late commits
+        api_models.Booking.objects.update(
+            date_modified=timezone.now() - 2 * reports.REPORT_WATERMARK_OVERLAP
+        )
+
+        summary = reports.refresh_daily_occupancy()
+
+        self.assertIsNone(summary["start_date"])
+        self.assertEqual(summary["rows"], 0)
+        self.assertEqual(api_models.DailyOccupancy.objects.count(), 3)
+
+    def test_moved_and_deleted_stays_release_their_old_nights(self):
+        moved = self.create_booking(booking_status="confirmed")
+        deleted = self.create_booking(booking_status="confirmed", nights=1)
+        reports.refresh_daily_occupancy()
+
+        bookings.modify_stay(
+            moved,
+            check_in_date=moved.check_in_date + timedelta(days=5),
+            check_out_date=moved.check_out_date + timedelta(days=5),
+        )
+        deleted.delete()
+        reports.refresh_daily_occupancy()
+
+        sold = api_models.DailyOccupancy.objects.filter(rooms_sold__gt=0)
+        self.assertEqual(
+            sorted(sold.values_list("date", flat=True)),
+            [(self.today + timedelta(days=offset)).date() for offset in (5, 6)],
+        )
+        self.assertFalse(api_models.ReportInvalidation.objects.exists())
+
+    def test_revenue_follows_the_nightly_rates(self):
+        booking = self.create_booking(booking_status="confirmed")
+        api_models.BookingNight.objects.filter(
+            booking=booking, night=self.today.date()
+        ).update(rate=Decimal("150.00"))
+
+        reports.refresh_daily_occupancy()
+
+        self.assertEqual(
+            api_models.DailyOccupancy.objects.get(date=self.today.date()).revenue,
+            Decimal("150.00"),
+        )
+
+    def test_occupancy_report(self):
+        self.create_booking(booking_status="confirmed")
+        reports.refresh_daily_occupancy()
+
+        report = reports.occupancy_report(
+            self.today.date(), self.today.date(), ["room_type"]
+        )
+
+        self.assertEqual(len(report), 1)
+        self.assertEqual(report[0]["room_type"], "Deluxe")
+        self.assertEqual(report[0]["occupancy"], 0.5)
+        self.assertEqual(report[0]["adr"], Decimal("100.00"))
+        self.assertEqual(report[0]["revpar"], Decimal("50.00"))
+
+
+class ReportDateRangeTest(SimpleTestCase):
+    def test_missing_bounds_default_around_today(self):
+        today = timezone.localdate()
+
+        self.assertEqual(
+            helpers.parse_date_range({}, days=30), (today - timedelta(days=29), today)
+        )
+        self.assertEqual(
+            helpers.parse_date_range({"start_date": "2025-03-01"}, days=7, forward=True),
+            (datetime(2025, 3, 1).date(), datetime(2025, 3, 7).date()),
+        )
+
+    def test_bad_dates_are_rejected(self):
+        for params in [{"end_date": "01/03/2025"}, {"start_date": "2025-03-02", "end_date": "2025-03-01"}]:
+            with self.assertRaises(serializers.ValidationError):
+                helpers.parse_date_range(params, days=30)
+
+
+class ComplaintDashboardTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.today = timezone.localdate()
+        housekeeping = api_models.Department.objects.create(name="Housekeeping")
+        high = api_models.Priority.objects.create(name="High")
+        resolved = api_models.ComplaintStatus.objects.create(name="Resolved")
+        cleaning = api_models.Hashtag.objects.create(name="#cleaning")
+        for number in range(3):
+            complaint = api_models.Complaint.objects.create(
+                guest=f"Guest {number}", message="No towels", department=housekeeping, priority=high
+            )
+            complaint.hashtags.add(cleaning)
+        cls.complaint = complaint
+        api_models.ProcessComplaint.objects.create(
+            complaint=complaint,
+            complaint_status=resolved,
+            note="Delivered",
+            process_complaint_date=complaint.date_created + timedelta(hours=2),
+        )
+
+    def test_grouped_counts_and_resolution_time(self):
+        dashboard = reports.complaint_dashboard(self.today, self.today)
+
+        self.assertEqual(dashboard["total"], 3)
+        self.assertEqual(dashboard["by_department"], {"Housekeeping": 3})
+        self.assertEqual(dashboard["by_priority"], {"High": 3})
+        self.assertEqual(dashboard["by_status"], {None: 3})
+        self.assertEqual(dashboard["by_hashtag"], {"#cleaning": 3})
+        self.assertEqual(dashboard["by_day"], [{"date": self.today, "count": 3}])
+        self.assertEqual(dashboard["resolved"], 1)
+        self.assertEqual(dashboard["mean_hours_to_resolution"], 2.0)
+
+    def test_cached_until_a_complaint_is_written(self):
+        reports.cached_complaint_dashboard(self.today, self.today)
+        with self.assertNumQueries(0):
+            reports.cached_complaint_dashboard(self.today, self.today)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            api_models.Complaint.objects.create(guest="Guest", message="Noise")
+
+        self.assertEqual(reports.cached_complaint_dashboard(self.today, self.today)["total"], 4)
+
+
+class DailyLaborRollupTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.housekeeping = api_models.Department.objects.create(name="Housekeeping")
+        cls.keeper = api_models.Profile.objects.create(
+            user=api_models.CustomUser.objects.create_user(
+                username="keeper", first_name="Room", last_name="Keeper", password="secret"
+            ),
+            full_name="Room Keeper",
+            department=cls.housekeeping,
+        )
+        cls.shift = api_models.Shift.objects.create(
+            name="Morning", start_time=time(6, 0), end_time=time(14, 0)
+        )
+        cls.day = timezone.localdate()
+        cls.start = timezone.make_aware(datetime.combine(cls.day, time(6, 0)))
+        api_models.ProfileShiftAssign.objects.create(
+            profile=cls.keeper,
+            date=cls.day,
+            shift=cls.shift,
+            shift_start_time=cls.start,
+            shift_end_time=cls.start + timedelta(hours=8),
+            time_started=cls.start,
+            time_ended=cls.start + timedelta(hours=10),
+        )
+        room_type = api_models.RoomType.objects.create(name="Standard")
+        for number, task_status in (("101", "Completed"), ("102", "Ended"), ("103", "Ongoing")):
+            api_models.RoomKeepingAssign.objects.create(
+                room=api_models.Room.objects.create(room_number=number, room_type=room_type),
+                assignment_date=cls.day,
+                assigned_to=cls.keeper,
+                current_status=task_status,
+            )
+
+    def test_rollup_of_hours_and_tasks(self):
+        reports.refresh_daily_labor()
+
+        labor = api_models.DailyLabor.objects.get(profile=self.keeper, date=self.day)
+        self.assertEqual(labor.department, self.housekeeping)
+        self.assertEqual((labor.shifts, labor.tasks_completed, labor.rooms_cleaned), (1, 2, 2))
+        self.assertEqual(labor.hours_worked, Decimal("10.00"))
+        self.assertEqual(labor.overtime_hours, Decimal("2.00"))
+
+    def test_a_missed_shift_does_not_offset_overtime(self):
+        api_models.ProfileShiftAssign.objects.create(
+            profile=self.keeper,
+            date=self.day,
+            shift=self.shift,
+            shift_start_time=self.start + timedelta(hours=10),
+            shift_end_time=self.start + timedelta(hours=18),
+        )
+
+        reports.refresh_daily_labor()
+
+        labor = api_models.DailyLabor.objects.get(profile=self.keeper, date=self.day)
+        self.assertEqual(labor.shifts, 1)
+        self.assertEqual(labor.scheduled_hours, Decimal("16.00"))
+        self.assertEqual(labor.hours_worked, Decimal("10.00"))
+        self.assertEqual(labor.overtime_hours, Decimal("2.00"))
+
+    def test_refresh_only_reprocesses_changed_days(self):
+        reports.refresh_daily_labor()
+        # older than the overlap looked at again for late commits
+        stamp = timezone.now() - 2 * reports.REPORT_WATERMARK_OVERLAP
+        api_models.ProfileShiftAssign.objects.update(date_modified=stamp)
+        api_models.RoomKeepingAssign.objects.update(date_modified=stamp)
+        summary = reports.refresh_daily_labor()
+
+        self.assertEqual(summary["rows"], 0)
+        self.assertEqual(api_models.DailyLabor.objects.count(), 1)
+
+    def test_department_report_is_one_query(self):
+        reports.refresh_daily_labor()
+
+        with self.assertNumQueries(1):
+            report = reports.labor_report(self.day, self.day, ["department"])
+
+        self.assertEqual(report[0]["department"], "Housekeeping")
+        self.assertEqual(report[0]["rooms_cleaned_per_hour"], Decimal("0.20"))
+
+    def test_moved_and_deleted_work_leaves_its_old_day(self):
+        reports.refresh_daily_labor()
+        yesterday = self.day - timedelta(days=1)
+        shift = api_models.ProfileShiftAssign.objects.get(profile=self.keeper)
+        shift.date = yesterday
+        shift.save()
+        api_models.RoomKeepingAssign.objects.filter(room__room_number="101").get().delete()
+        api_models.RoomKeepingAssign.objects.filter(room__room_number="102").get().delete()
+        # only the invalidations can tell the refresh about the old day
+        stamp = timezone.now() - 2 * reports.REPORT_WATERMARK_OVERLAP
+        api_models.ProfileShiftAssign.objects.update(date_modified=stamp)
+        api_models.RoomKeepingAssign.objects.update(date_modified=stamp)
+
+        reports.refresh_daily_labor()
+
+        self.assertFalse(api_models.DailyLabor.objects.filter(date=self.day).exists())
+        self.assertFalse(api_models.ReportInvalidation.objects.exists())
+
+    def test_staff_report_keeps_namesakes_apart(self):
+        namesake = api_models.Profile.objects.create(
+            user=api_models.CustomUser.objects.create_user(
+                username="keeper2", first_name="Room", last_name="Keeper", password="secret"
+            ),
+            full_name="Room Keeper",
+            department=self.housekeeping,
+        )
+        api_models.ProfileShiftAssign.objects.create(
+            profile=namesake,
+            date=self.day,
+            shift=self.shift,
+            shift_start_time=self.start,
+            shift_end_time=self.start + timedelta(hours=8),
+            time_started=self.start,
+            time_ended=self.start + timedelta(hours=8),
+        )
+        reports.refresh_daily_labor()
+
+        report = reports.labor_report(self.day, self.day, ["staff"])
+
+        self.assertEqual(
+            sorted((row["staff_id"], row["staff"], row["staff_count"]) for row in report),
+            sorted([(self.keeper.id, "Room Keeper", 1), (namesake.id, "Room Keeper", 1)]),
+        )
@@ -0,0 +1,434 @@
+from .. import models as api_models
+from .. import serializers as api_serializers
+from .. import tasks
+import shutil
+import tempfile
+from importlib import import_module
+from io import BytesIO
+from types import SimpleNamespace
+from unittest import mock
+from PIL import Image
+from django.apps import apps
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
+from decimal import Decimal
+from rest_framework import serializers
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from utils import amenities, bookings, outbox, pricing, versions
+
+
+class RoomCatalogTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = api_models.CustomUser.objects.create_user(
+            username="frontdesk", first_name="Front", last_name="Desk", password="secret"
+        )
+        cls.deluxe = api_models.RoomType.objects.create(name="Deluxe", base_price=100)
+        cls.floor = api_models.HotelFloor.objects.create(name="First")
+        cls.wifi = api_models.Amenity.objects.create(name="Wifi")
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_rooms(self, count, start=0):
+        for number in range(start, start + count):
+            room = api_models.Room.objects.create(
+                room_number=f"{100 + number}", room_type=self.deluxe, floor=self.floor
+            )
+            room.amenities.add(self.wifi)
+
+    def test_query_count_does_not_grow_with_rooms(self):
+        self.create_rooms(2)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(reverse("rooms"))
+        self.create_rooms(10, start=2)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get(reverse("rooms"))
+
+        self.assertEqual(response.data["count"], 12)
+        self.assertEqual(response.data["results"][0]["amenities"], ["Wifi"])
+        self.assertEqual(len(many), len(few))
+
+    def test_unchanged_catalog_returns_not_modified(self):
+        self.create_rooms(2)
+        response = self.client.get(reverse("rooms"))
+        etag = response["ETag"]
+
+        # a real bearer token, so the count includes JWT authentication's user lookup
+        token = RefreshToken.for_user(self.user).access_token
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        with self.assertNumQueries(1):
+            unchanged = client.get(reverse("rooms"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(unchanged.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            api_models.RoomType.objects.filter(id=self.deluxe.id).first().save()
+        changed = self.client.get(reverse("rooms"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed["ETag"], etag)
+
+
+class RoomRepricingTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.deluxe = api_models.RoomType.objects.create(name="Deluxe", base_price=100)
+        cls.single = api_models.RoomType.objects.create(name="Single", base_price=60)
+        cls.today = timezone.localdate()
+        for number, room_type in [("101", cls.deluxe), ("102", cls.deluxe), ("201", cls.single)]:
+            api_models.Room.objects.create(
+                room_number=number, room_type=room_type, current_price=room_type.base_price
+            )
+
+    def test_rooms_follow_the_rate_valid_today(self):
+        api_models.RoomRate.objects.create(
+            room_type=self.deluxe,
+            start_date=self.today - timedelta(days=1),
+            end_date=self.today + timedelta(days=1),
+            price=Decimal("150.00"),
+        )
+
+        self.assertEqual(pricing.reprice_rooms(), 2)
+        self.assertEqual(
+            set(api_models.Room.objects.values_list("room_type__name", "current_price")),
+            {("Deluxe", Decimal("150.00")), ("Single", Decimal("60.00"))},
+        )
+        # the rate ends: rooms go back to the base price
+        self.assertEqual(pricing.reprice_rooms(on_date=self.today + timedelta(days=2)), 2)
+        self.assertFalse(api_models.Room.objects.filter(current_price=150).exists())
+
+    def test_overlapping_rates_resolve_the_same_for_rooms_and_bookings(self):
+        for price in (Decimal("120.00"), Decimal("130.00")):
+            api_models.RoomRate.objects.create(
+                room_type=self.deluxe,
+                start_date=self.today,
+                end_date=self.today + timedelta(days=3),
+                price=price,
+            )
+
+        self.assertEqual(pricing.effective_prices([self.deluxe])[self.deluxe.id], Decimal("130.00"))
+        self.assertEqual(
+            bookings.nightly_rates(self.deluxe, [self.today]), {self.today: Decimal("130.00")}
+        )
+
+    def test_editing_a_rate_reprices_through_the_outbox(self):
+        api_models.RoomRate.objects.create(
+            room_type=self.single, start_date=self.today, end_date=self.today, price=80
+        )
+
+        outbox.relay()
+
+        self.assertEqual(
+            api_models.Room.objects.get(room_number="201").current_price, Decimal("80.00")
+        )
+
+
+class RoomImageVariantTest(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+        room_type = api_models.RoomType.objects.create(name="Deluxe", base_price=100)
+        self.room = api_models.Room.objects.create(room_number="101", room_type=room_type)
+
+    def test_variants_are_generated_after_upload(self):
+        buffer = BytesIO()
+        Image.new("RGB", (2400, 1600), "navy").save(buffer, format="PNG")
+        room_image = api_models.RoomImage.objects.create(
+            room=self.room, image=SimpleUploadedFile("view.png", buffer.getvalue())
+        )
+
+        # run the variant task in-process instead of sending it to the broker
+        with mock.patch.object(
+            tasks.generate_image_variants, "delay", side_effect=tasks.generate_image_variants
+        ) as delay:
+            outbox.relay()
+
+        delay.assert_called_once_with("roomimage", str(room_image.id))
+        room_image.refresh_from_db()
+        self.assertEqual(room_image.image_variants["source"], room_image.image.name)
+        with room_image.image.storage.open(room_image.image_variants["thumbnail"]) as thumbnail:
+            self.assertEqual(Image.open(thumbnail).size, (240, 160))
+        urls = api_serializers.RoomImageSerializer(room_image).data["variants"]
+        self.assertEqual(set(urls), {"thumbnail", "medium", "webp"})
+        self.assertTrue(urls["webp"].endswith(".webp"))
+
+
+class BulkRoomProvisionTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.deluxe = api_models.RoomType.objects.create(
+            name="Deluxe", base_price=100, max_occupancy=2
+        )
+        cls.deluxe.amenities.add(
+            api_models.Amenity.objects.create(name="Wifi"),
+            api_models.Amenity.objects.create(name="TV"),
+        )
+        api_models.HotelFloor.objects.create(name="Third")
+
+    def provision(self, **data):
+        serializer = api_serializers.BulkRoomProvisionSerializer(
+            data={"floor": "Third", "room_type": "Deluxe", **data}
+        )
+        serializer.is_valid(raise_exception=True)
+        return serializer.save()
+
+    def test_range_creates_rooms_and_amenities_in_bulk(self):
+        with self.assertNumQueries(10):
+            rooms = self.provision(prefix="3", start=1, end=40, width=2)
+
+        self.assertEqual(len(rooms), 40)
+        self.assertEqual(rooms[0].room_number, "301")
+        self.assertEqual(rooms[-1].room_number, "340")
+        self.assertEqual(api_models.RoomAmenity.objects.count(), 80)
+        self.assertEqual(
+            set(api_models.Room.objects.values_list("current_price", "max_occupancy")),
+            {(Decimal("100.00"), 2)},
+        )
+
+    def test_existing_room_numbers_are_rejected(self):
+        self.provision(room_numbers=["301"])
+
+        with self.assertRaises(serializers.ValidationError):
+            self.provision(room_numbers=["300", "301"])
+        self.assertEqual(api_models.Room.objects.count(), 1)
+
+
+class AmenityPropagationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.deluxe = api_models.RoomType.objects.create(name="Deluxe", base_price=100)
+        cls.wifi = api_models.Amenity.objects.create(name="Wifi")
+        cls.minibar = api_models.Amenity.objects.create(name="Minibar")
+        cls.balcony = api_models.Amenity.objects.create(name="Balcony")
+        cls.deluxe.amenities.add(cls.wifi)
+        cls.rooms = [
+            api_models.Room.objects.create(room_number=f"40{index}", room_type=cls.deluxe)
+            for index in range(3)
+        ]
+        for room in cls.rooms:
+            room.amenities.add(cls.wifi, through_defaults={"from_room_type": True})
+        # a room-level extra that is not part of the type
+        cls.rooms[0].amenities.add(cls.balcony)
+
+    def test_type_amenity_changes_reach_every_room(self):
+        serializer = api_serializers.RoomTypeSerializer(
+            self.deluxe, data={"amenities": ["Minibar"]}, partial=True
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+
+        self.assertFalse(api_models.RoomAmenity.objects.filter(amenity=self.wifi).exists())
+        self.assertEqual(
+            api_models.RoomAmenity.objects.filter(amenity=self.minibar).count(), 3
+        )
+        self.assertTrue(
+            api_models.RoomAmenity.objects.filter(
+                room=self.rooms[0], amenity=self.balcony
+            ).exists()
+        )
+
+    def test_adding_from_the_amenity_side_propagates(self):
+        self.minibar.room_types.add(self.deluxe)
+
+        self.assertEqual(self.rooms[1].amenities.count(), 2)
+
+    def test_removing_a_type_amenity_keeps_rooms_that_were_given_it(self):
+        self.deluxe.amenities.add(self.balcony)
+        self.deluxe.amenities.remove(self.balcony)
+
+        self.assertTrue(
+            api_models.RoomAmenity.objects.filter(
+                room=self.rooms[0], amenity=self.balcony
+            ).exists()
+        )
+        self.assertEqual(
+            api_models.RoomAmenity.objects.filter(amenity=self.balcony).count(), 1
+        )
+
+    def test_reconcile_repairs_rooms_that_drifted_from_their_type(self):
+        api_models.RoomAmenity.objects.filter(room=self.rooms[1]).delete()
+        api_models.RoomAmenity.objects.create(
+            room=self.rooms[2], amenity=self.minibar, from_room_type=True
+        )
+
+        result = amenities.reconcile_room_type_amenities([self.deluxe.id])
+
+        self.assertEqual(result, {"inserted": 1, "deleted": 1})
+        for room in self.rooms:
+            self.assertTrue(room.amenities.filter(id=self.wifi.id).exists())
+            self.assertFalse(room.amenities.filter(id=self.minibar.id).exists())
+        self.rooms[1].refresh_from_db()
+        self.assertEqual(self.rooms[1].amenity_mask, 1 << self.wifi.bit)
+
+
+class RoomSearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = api_models.CustomUser.objects.create_user(
+            username="reservations", first_name="Res", last_name="Desk", password="secret"
+        )
+        deluxe = api_models.RoomType.objects.create(name="Deluxe", base_price=250)
+        single = api_models.RoomType.objects.create(name="Single", base_price=80)
+        first = api_models.HotelFloor.objects.create(name="First")
+        second = api_models.HotelFloor.objects.create(name="Second")
+        wifi = api_models.Amenity.objects.create(name="Wifi")
+        minibar = api_models.Amenity.objects.create(name="Minibar")
+        for number, room_type, floor, price, room_amenities in [
+            ("101", single, first, 80, [wifi]),
+            ("102", single, first, 80, [wifi, minibar]),
+            ("201", deluxe, second, 250, [wifi, minibar]),
+            ("202", deluxe, second, 250, []),
+        ]:
+            room = api_models.Room.objects.create(
+                room_number=number, room_type=room_type, floor=floor, current_price=price
+            )
+            room.amenities.add(*room_amenities)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_filters_and_facet_counts(self):
+        response = self.client.get(
+            reverse("room_search"), {"floor": "First", "amenities": "Wifi,Minibar"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([room["room_number"] for room in response.data["results"]], ["102"])
+        facets = response.data["facets"]
+        # a dimension's own selection is ignored when counting its options
+        self.assertEqual(
+            facets["floor"],
+            [{"value": "First", "count": 1}, {"value": "Second", "count": 1}],
+        )
+        self.assertIn({"value": "0-100", "count": 1}, facets["price_band"])
+        self.assertEqual(
+            facets["amenities"],
+            [{"value": "Minibar", "count": 1}, {"value": "Wifi", "count": 1}],
+        )
+
+    def test_query_count_does_not_depend_on_selected_options(self):
+        with CaptureQueriesContext(connection) as one_option:
+            self.client.get(reverse("room_search"), {"room_type": "Deluxe", "amenities": "Wifi"})
+        with CaptureQueriesContext(connection) as many_options:
+            self.client.get(
+                reverse("room_search"),
+                {
+                    "room_type": "Deluxe,Single",
+                    "price_band": "0-100,200-500",
+                    "amenities": "Wifi,Minibar",
+                },
+            )
+
+        self.assertEqual(len(one_option), len(many_options))
+
+
+class AmenityMaskTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.deluxe = api_models.RoomType.objects.create(name="Deluxe", base_price=100)
+        cls.balcony, cls.bathtub, cls.minibar = [
+            api_models.Amenity.objects.create(name=name)
+            for name in ["Balcony", "Bathtub", "Minibar"]
+        ]
+        cls.room = api_models.Room.objects.create(room_number="501", room_type=cls.deluxe)
+        cls.other = api_models.Room.objects.create(room_number="502", room_type=cls.deluxe)
+
+    def test_mask_follows_room_amenity_writes(self):
+        self.room.amenities.add(self.balcony, self.bathtub)
+        self.room.refresh_from_db()
+        self.assertEqual(
+            self.room.amenity_mask, (1 << self.balcony.bit) | (1 << self.bathtub.bit)
+        )
+
+        self.room.amenities.remove(self.balcony)
+        self.room.refresh_from_db()
+        self.assertEqual(self.room.amenity_mask, 1 << self.bathtub.bit)
+
+        self.deluxe.amenities.add(self.minibar)
+        self.other.refresh_from_db()
+        self.deluxe.refresh_from_db()
+        self.assertEqual(self.other.amenity_mask, 1 << self.minibar.bit)
+        self.assertEqual(self.deluxe.amenity_mask, 1 << self.minibar.bit)
+
+    def test_filter_matches_every_requested_amenity(self):
+        self.room.amenities.add(self.balcony, self.bathtub, self.minibar)
+        self.other.amenities.add(self.balcony)
+
+        rooms = amenities.filter_by_amenities(
+            api_models.Room.objects.all(), ["Balcony", "Bathtub", "Minibar"]
+        )
+
+        self.assertEqual(list(rooms), [self.room])
+        self.assertFalse(
+            amenities.filter_by_amenities(api_models.Room.objects.all(), ["Sauna"]).exists()
+        )
+
+    def test_backfill_gives_legacy_amenities_a_bit_and_rooms_their_mask(self):
+        self.room.amenities.add(self.balcony, self.minibar)
+        self.deluxe.amenities.add(self.bathtub)
+        api_models.Amenity.objects.filter(id=self.minibar.id).update(bit=None)
+        api_models.Room.objects.update(amenity_mask=0)
+        api_models.RoomType.objects.update(amenity_mask=0)
+
+        migration = import_module("api.migrations.0038_amenity_masks")
+        migration.backfill_amenity_masks(apps, SimpleNamespace(connection=connection))
+
+        self.minibar.refresh_from_db()
+        self.room.refresh_from_db()
+        self.deluxe.refresh_from_db()
+        self.assertIsNotNone(self.minibar.bit)
+        self.assertEqual(
+            self.room.amenity_mask,
+            (1 << self.balcony.bit) | (1 << self.bathtub.bit) | (1 << self.minibar.bit),
+        )
+        self.assertEqual(self.deluxe.amenity_mask, 1 << self.bathtub.bit)
+        self.assertEqual(
+            list(amenities.filter_by_amenities(api_models.Room.objects.all(), ["Minibar"])),
+            [self.room],
+        )
+
+    def test_deleted_amenity_bit_is_cleared_from_the_rooms_that_had_it(self):
+        self.room.amenities.add(self.balcony, self.bathtub)
+        self.other.amenities.add(self.bathtub)
+        cached = versions.get_versions(api_models.Room)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.balcony.delete()
+
+        self.room.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual(self.room.amenity_mask, 1 << self.bathtub.bit)
+        self.assertEqual(self.other.amenity_mask, 1 << self.bathtub.bit)
+        self.assertNotEqual(versions.get_versions(api_models.Room), cached)
+
+    def test_a_taken_bit_is_retried_with_the_next_free_one(self):
+        exclude = api_models.Amenity.objects.exclude
+        rivals = []
+
+        def stale_read(*args, **kwargs):
+            # another request takes the first free bit right after it was read
+            if not rivals:
+                taken = set(exclude(*args, **kwargs).values_list("bit", flat=True))
+                free = min(set(range(api_models.AMENITY_MASK_BITS)) - taken)
+                rivals.extend(
+                    api_models.Amenity.objects.bulk_create(
+                        [api_models.Amenity(name="Jacuzzi", bit=free)]
+                    )
+                )
+                return exclude(*args, **kwargs).exclude(id=rivals[0].id)
+            return exclude(*args, **kwargs)
+
+        with mock.patch.object(api_models.Amenity.objects, "exclude", side_effect=stale_read):
+            sauna = api_models.Amenity.objects.create(name="Sauna")
+
+        self.assertIsNotNone(sauna.bit)
+        self.assertNotEqual(sauna.bit, rivals[0].bit)
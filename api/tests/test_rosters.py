@@ -0,0 +1,377 @@
+from .. import models as api_models
+from django.apps import apps
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from datetime import time, timedelta
+from importlib import import_module
+from types import SimpleNamespace
+from unittest import mock
+from rest_framework.test import APIClient
+from utils import rosters, shift_lifecycle
+
+
+class ShiftRosterTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.housekeeping = api_models.Department.objects.create(name="Housekeeping")
+        cls.frontdesk = api_models.Department.objects.create(name="Frontdesk")
+        user = api_models.CustomUser.objects.create_user(
+            username="supervisor", first_name="Head", last_name="Keeper", password="secret"
+        )
+        cls.supervisor = api_models.Profile.objects.create(
+            user=user, full_name="Head Keeper", department=cls.housekeeping
+        )
+        api_models.ProfileRole.objects.create(
+            profile=cls.supervisor, role=api_models.Role.objects.create(name="Supervisor")
+        )
+        cls.staff = [
+            api_models.Profile.objects.create(
+                user=api_models.CustomUser.objects.create_user(
+                    username=f"keeper{number}", first_name="Keeper", last_name=str(number), password="secret"
+                ),
+                full_name=f"Keeper {number}",
+                department=cls.housekeeping,
+            )
+            for number in range(3)
+        ]
+        cls.morning = api_models.Shift.objects.create(
+            name="Morning", start_time=time(6, 0), end_time=time(14, 0)
+        )
+        cls.early = api_models.Shift.objects.create(
+            name="Early", start_time=time(5, 0), end_time=time(9, 0)
+        )
+        cls.night = api_models.Shift.objects.create(
+            name="Night", start_time=time(22, 0), end_time=time(7, 0)
+        )
+        api_models.ShiftStatus.objects.create(name="Pending")
+        cls.start = timezone.localdate() + timedelta(days=1)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.supervisor.user)
+
+    def roster(self, data):
+        return self.client.post(reverse("shift_roster"), data, format="json")
+
+    def pattern(self, days=7, **extra):
+        return {
+            "profiles": [str(profile.id) for profile in self.staff],
+            "shift": "Morning",
+            "start_date": str(self.start),
+            "end_date": str(self.start + timedelta(days=days - 1)),
+            **extra,
+        }
+
+    def test_pattern_is_created_with_a_fixed_number_of_queries(self):
+        # SQLite's bound parameter limit splits the insert in two batches
+        with self.assertNumQueries(10 if connection.vendor == "sqlite" else 9):
+            response = self.roster({"pattern": self.pattern(days=30)})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["count"], 90)
+        assignment = api_models.ProfileShiftAssign.objects.filter(profile=self.staff[0]).earliest("date")
+        self.assertEqual(assignment.status.name, "Pending")
+        self.assertEqual(assignment.department, self.housekeeping)
+        self.assertEqual(timezone.localtime(assignment.shift_start_time).time(), time(6, 0))
+
+    def test_weekdays_limit_the_pattern(self):
+        response = self.roster({"pattern": self.pattern(days=14, weekdays=[5, 6])})
+
+        self.assertEqual(response.data["count"], 12)
+
+    def test_oversized_patterns_are_refused_before_they_are_expanded(self):
+        with mock.patch.object(rosters, "expand_pattern") as expand_pattern:
+            response = self.roster({"pattern": self.pattern(days=2000)})
+
+        self.assertEqual(response.status_code, 400)
+        expand_pattern.assert_not_called()
+        self.assertEqual(
+            rosters.pattern_size(3, self.start, self.start + timedelta(days=16), [0, 3]),
+            len(rosters.expand_pattern(
+                [1, 2, 3], self.morning, self.start, self.start + timedelta(days=16), [0, 3]
+            )),
+        )
+
+    def test_conflicts_reject_the_roster_unless_skipped(self):
+        self.roster({"pattern": self.pattern(days=1)})
+        entries = [
+            {"profile": str(self.staff[0].id), "date": str(self.start), "shift": "Morning"},
+            {"profile": str(self.staff[1].id), "date": str(self.start), "shift": "Early"},
+            {"profile": str(self.staff[2].id), "date": str(self.start + timedelta(days=1)), "shift": "Early"},
+        ]
+
+        rejected = self.roster({"assignments": entries})
+        skipped = self.roster({"assignments": entries, "skip_conflicts": True})
+
+        self.assertEqual(rejected.status_code, 400)
+        self.assertEqual(
+            [conflict["reason"] for conflict in rejected.data["conflicts"]], ["duplicate", "overlap"]
+        )
+        self.assertEqual(skipped.status_code, 201)
+        self.assertEqual(skipped.data["count"], 1)
+        self.assertEqual(len(skipped.data["skipped"]), 2)
+
+    def test_staff_outside_the_department_are_rejected(self):
+        outsider = api_models.Profile.objects.create(
+            user=api_models.CustomUser.objects.create_user(
+                username="clerk", first_name="Desk", last_name="Clerk", password="secret"
+            ),
+            full_name="Desk Clerk",
+            department=self.frontdesk,
+        )
+
+        response = self.roster({"pattern": {**self.pattern(), "profiles": [str(outsider.id)]}})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(api_models.ProfileShiftAssign.objects.exists())
+
+    def test_overnight_shifts_end_on_the_next_day(self):
+        response = self.roster(
+            {"assignments": [{"profile": str(self.staff[0].id), "date": str(self.start), "shift": "Night"}]}
+        )
+
+        self.assertEqual(response.status_code, 201)
+        assignment = api_models.ProfileShiftAssign.objects.get(profile=self.staff[0])
+        self.assertEqual(
+            timezone.localtime(assignment.shift_end_time).date(), self.start + timedelta(days=1)
+        )
+        self.assertEqual(assignment.shift_end_time - assignment.shift_start_time, timedelta(hours=9))
+
+    def test_overnight_shifts_overlap_the_next_morning(self):
+        self.roster(
+            {"assignments": [{"profile": str(self.staff[0].id), "date": str(self.start), "shift": "Night"}]}
+        )
+        next_day = str(self.start + timedelta(days=1))
+
+        rostered = self.roster(
+            {"assignments": [{"profile": str(self.staff[0].id), "date": next_day, "shift": "Morning"}]}
+        )
+        assigned = self.client.post(
+            reverse("assign_shift"),
+            {"profile": str(self.staff[0].id), "shift": str(self.morning.id), "date": next_day, "status": "Pending"},
+            format="json",
+        )
+        later = self.client.post(
+            reverse("assign_shift"),
+            {"profile": str(self.staff[0].id), "shift": str(self.night.id), "date": next_day, "status": "Pending"},
+            format="json",
+        )
+
+        self.assertEqual(rostered.status_code, 400)
+        self.assertEqual(rostered.data["conflicts"][0]["reason"], "overlap")
+        self.assertEqual(assigned.status_code, 400)
+        self.assertEqual(later.status_code, 201)
+        self.assertEqual(
+            timezone.localtime(
+                api_models.ProfileShiftAssign.objects.get(id=later.data["id"]).shift_end_time
+            ).time(),
+            time(7, 0),
+        )
+
+
+    def test_legacy_overnight_shifts_are_rolled_by_the_migration(self):
+        self.roster(
+            {"assignments": [{"profile": str(self.staff[0].id), "date": str(self.start), "shift": "Night"}]}
+        )
+        assignment = api_models.ProfileShiftAssign.objects.get(profile=self.staff[0])
+        legacy_end = assignment.shift_end_time - timedelta(days=1)
+        migration = import_module("api.migrations.0043_shift_overlaps")
+        if connection.vendor == "postgresql":
+            # legacy rows predate the overlap constraint, which refuses them; the
+            # table can be altered once the pending foreign key checks have run
+            with connection.cursor() as cursor:
+                cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+            with connection.schema_editor() as editor:
+                migration.remove_overlap_constraint(apps, editor)
+        api_models.ProfileShiftAssign.objects.filter(id=assignment.id).update(shift_end_time=legacy_end)
+
+        migration.roll_overnight_shifts(apps, SimpleNamespace(connection=connection))
+        if connection.vendor == "postgresql":
+            with connection.schema_editor() as editor:
+                migration.add_overlap_constraint(apps, editor)
+
+        assignment.refresh_from_db()
+        self.assertEqual(assignment.shift_end_time, legacy_end + timedelta(days=1))
+
+
+class RosterCalendarTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.housekeeping = api_models.Department.objects.create(name="Housekeeping")
+        user = api_models.CustomUser.objects.create_user(
+            username="supervisor", first_name="Head", last_name="Keeper", password="secret"
+        )
+        cls.supervisor = api_models.Profile.objects.create(
+            user=user, full_name="Head Keeper", department=cls.housekeeping
+        )
+        api_models.ProfileRole.objects.create(
+            profile=cls.supervisor, role=api_models.Role.objects.create(name="Supervisor")
+        )
+        cls.keeper = api_models.Profile.objects.create(
+            user=api_models.CustomUser.objects.create_user(
+                username="keeper", first_name="Room", last_name="Keeper", password="secret"
+            ),
+            full_name="Room Keeper",
+            department=cls.housekeeping,
+        )
+        cls.morning = api_models.Shift.objects.create(
+            name="Morning", start_time=time(6, 0), end_time=time(14, 0)
+        )
+        cls.pending = api_models.ShiftStatus.objects.create(name="Pending")
+        cls.start = timezone.localdate()
+        assignment = api_models.ProfileShiftAssign.objects.create(
+            department=cls.housekeeping,
+            profile=cls.keeper,
+            date=cls.start + timedelta(days=1),
+            shift=cls.morning,
+            status=cls.pending,
+        )
+        room_type = api_models.RoomType.objects.create(name="Standard")
+        for number in ("101", "102"):
+            api_models.RoomKeepingAssign.objects.create(
+                room=api_models.Room.objects.create(room_number=number, room_type=room_type),
+                member_shift=assignment,
+                assigned_to=cls.keeper,
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.supervisor.user)
+
+    def calendar(self):
+        return self.client.get(
+            reverse("roster_calendar"),
+            {"start_date": str(self.start), "end_date": str(self.start + timedelta(days=6))},
+        )
+
+    def test_staff_by_day_grid(self):
+        response = self.calendar()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["days"]), 7)
+        rows = {row["employee_name"]: row["shifts"] for row in response.data["staff"]}
+        self.assertEqual(rows["Head Keeper"], [[]] * 7)
+        cell = rows["Room Keeper"][1][0]
+        self.assertEqual((cell["shift"], cell["status"], cell["tasks"]), ("Morning", "Pending", 2))
+
+    def test_grid_is_built_with_one_query(self):
+        with self.assertNumQueries(1):
+            rosters.roster_calendar(self.housekeeping.id, self.start, self.start + timedelta(days=30))
+
+    def test_calendar_is_cached_until_shifts_change(self):
+        end = self.start + timedelta(days=6)
+        rosters.cached_roster_calendar(self.housekeeping.id, self.start, end)
+        with self.assertNumQueries(0):
+            rosters.cached_roster_calendar(self.housekeeping.id, self.start, end)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            api_models.ProfileShiftAssign.objects.create(
+                department=self.housekeeping,
+                profile=self.supervisor,
+                date=self.start,
+                shift=self.morning,
+                status=self.pending,
+            )
+        calendar = rosters.cached_roster_calendar(self.housekeeping.id, self.start, end)
+
+        rows = {row["employee_name"]: row["shifts"] for row in calendar["staff"]}
+        self.assertEqual(rows["Head Keeper"][0][0]["shift"], "Morning")
+
+
+class ShiftLifecycleTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        department = api_models.Department.objects.create(name="Housekeeping")
+        cls.keeper = api_models.Profile.objects.create(
+            user=api_models.CustomUser.objects.create_user(
+                username="keeper", first_name="Room", last_name="Keeper", password="secret"
+            ),
+            full_name="Room Keeper",
+            department=department,
+        )
+        cls.morning = api_models.Shift.objects.create(
+            name="Morning", start_time=time(6, 0), end_time=time(14, 0)
+        )
+        cls.pending = api_models.ShiftStatus.objects.create(name="Pending")
+        api_models.ShiftStatus.objects.create(name="Started", change_after_expiry=True)
+        api_models.ShiftStatus.objects.create(name="Expired")
+        api_models.HouseKeepingState.objects.create(name="Unfinished")
+        cls.day = timezone.localdate()
+
+    def assign(self, day):
+        start, end = rosters.shift_times(self.morning, day)
+        return api_models.ProfileShiftAssign.objects.create(
+            profile=self.keeper,
+            date=day,
+            shift=self.morning,
+            shift_start_time=start,
+            shift_end_time=end,
+            status=self.pending,
+        )
+
+    def test_shifts_start_and_expire_at_their_times(self):
+        assignment = self.assign(self.day)
+        task = api_models.RoomKeepingAssign.objects.create(
+            room=api_models.Room.objects.create(
+                room_number="101", room_type=api_models.RoomType.objects.create(name="Standard")
+            ),
+            member_shift=assignment,
+            assigned_to=self.keeper,
+            current_status="Ongoing",
+        )
+
+        before = shift_lifecycle.advance_shifts(assignment.shift_start_time - timedelta(minutes=1))
+        started = shift_lifecycle.advance_shifts(assignment.shift_start_time)
+        assignment.refresh_from_db()
+        self.assertEqual(assignment.status.name, "Started")
+        self.assertEqual(assignment.next_transition_at, assignment.shift_end_time)
+        expired = shift_lifecycle.advance_shifts(assignment.shift_end_time)
+        assignment.refresh_from_db()
+        task.refresh_from_db()
+
+        self.assertEqual(before["due"], 0)
+        self.assertEqual(started["started"], 1)
+        self.assertEqual(expired["expired"], 1)
+        self.assertEqual(assignment.status.name, "Expired")
+        self.assertIsNone(assignment.next_transition_at)
+        self.assertEqual(task.current_status, "Unfinished")
+        self.assertEqual(
+            api_models.OutboxEvent.objects.filter(event_type="shift.status_changed").count(), 2
+        )
+
+    def test_legacy_shifts_are_handed_to_the_scheduler(self):
+        upcoming = self.assign(self.day + timedelta(days=1))
+        running = self.assign(self.day - timedelta(days=1))
+        running.status = api_models.ShiftStatus.objects.get(name="Started")
+        running.save()
+        expired = self.assign(self.day - timedelta(days=2))
+        expired.status = api_models.ShiftStatus.objects.get(name="Expired")
+        expired.save()
+        api_models.ProfileShiftAssign.objects.update(next_transition_at=None)
+
+        migration = import_module("api.migrations.0044_shift_transitions")
+        with mock.patch("django.utils.timezone.now", return_value=running.shift_start_time):
+            migration.backfill_transitions(apps, SimpleNamespace(connection=connection))
+
+        for assignment in (upcoming, running, expired):
+            assignment.refresh_from_db()
+        self.assertEqual(upcoming.next_transition_at, upcoming.shift_start_time)
+        self.assertEqual(running.next_transition_at, running.shift_end_time)
+        self.assertIsNone(expired.next_transition_at)
+        self.assertEqual(
+            shift_lifecycle.advance_shifts(upcoming.shift_start_time)["due"], 2
+        )
+
+    def test_only_due_shifts_are_read(self):
+        due = self.assign(self.day)
+        for offset in range(1, 20):
+            self.assign(self.day + timedelta(days=offset))
+
+        with self.assertNumQueries(8):
+            summary = shift_lifecycle.advance_shifts(due.shift_start_time)
+
+        self.assertEqual((summary["due"], summary["started"]), (1, 1))
@@ -0,0 +1,58 @@
+import time
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+
+class TokenBucketThrottle(BaseThrottle):
+    '''
+    Lets a client burst up to `capacity` requests, then one request per
+    `refill_seconds`. Each bucket is two numbers in the shared cache, so a
+    check costs one read and one write however busy the client is.
+    Concurrent requests may spend the same token, so a burst can exceed the
+    capacity by the number of requests in flight.
+    '''
+
+    scope = None
+    capacity = 10
+    refill_seconds = 6.0
+    timer = time.time
+
+    def get_ident_key(self, request, view):
+        raise NotImplementedError(".get_ident_key() must be overridden")
+
+    def allow_request(self, request, view):
+        ident = self.get_ident_key(request, view)
+        if ident is None:
+            return True
+        key = f"throttle:{self.scope}:{ident}"
+        now = self.timer()
+        tokens, updated = cache.get(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated) / self.refill_seconds)
+        self.wait_seconds = 0 if tokens >= 1 else (1 - tokens) * self.refill_seconds
+        if tokens >= 1:
+            tokens -= 1
+        # an idle bucket refills completely, so it need not outlive that
+        cache.set(key, (tokens, now), int(self.capacity * self.refill_seconds) + 1)
+        return self.wait_seconds == 0
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class GuestComplaintIPThrottle(TokenBucketThrottle):
+    scope = "guest_complaint_ip"
+    capacity = 20
+    refill_seconds = 6.0
+
+    def get_ident_key(self, request, view):
+        return self.get_ident(request)
+
+
+class GuestComplaintCodeThrottle(TokenBucketThrottle):
+    scope = "guest_complaint_code"
+    capacity = 5
+    refill_seconds = 60.0
+
+    def get_ident_key(self, request, view):
+        booking_code = request.data.get("booking_code")
+        return str(booking_code).strip().casefold() if booking_code else None
@@ -64,6 +64,16 @@ urlpatterns = [
         views.ProfileShiftAssignCreateView.as_view(),
         name="assign_shift",
     ),
+    path(
+        "shift-management/roster/",
+        views.ShiftRosterCreateView.as_view(),
+        name="shift_roster",
+    ),
+    path(
+        "shift-management/calendar/",
+        views.RosterCalendarView.as_view(),
+        name="roster_calendar",
+    ),
     path("shift-statuses/", views.ShiftStatusList.as_view(), name="shift_statuses"),
     path(
         "shift-management/<uuid:pk>/",
@@ -135,7 +145,9 @@ urlpatterns = [
     ),
     # urls for room management
     path("rooms/", views.RoomListView.as_view(), name="rooms"),
+    path("rooms/search/", views.RoomSearchView.as_view(), name="room_search"),
     path("rooms/add/", views.RoomCreateView.as_view(), name="add_room"),
+    path("rooms/add/bulk/", views.RoomBulkCreateView.as_view(), name="add_rooms_bulk"),
     path("rooms/<uuid:pk>/", views.RoomRetrieveView.as_view(), name="room_details"),
     path("rooms/<uuid:pk>/edit/", views.RoomUpdateDeleteView.as_view(), name="edit_room"),
     path("room-amenities/", views.RoomAmenityList.as_view(), name="room_amenities"),
@@ -143,11 +155,23 @@ urlpatterns = [
     # urls for complaint management
     path("complaints/", views.ComplaintList.as_view(), name="complaints"),
     path("complaints/add/", views.ComplaintCreate.as_view(), name="add_complaint"),
+    path("complaints/search/", views.ComplaintSearchView.as_view(), name="search_complaints"),
+    path("complaints/guest/", views.GuestComplaintCreate.as_view(), name="guest_complaint"),
     path(
         "complaints/<uuid:pk>/",
         views.ComplaintDetail.as_view(),
         name="complaint_details",
     ),
+    path(
+        "complaints/routing-rules/",
+        views.ComplaintRoutingRuleList.as_view(),
+        name="complaint_routing_rules",
+    ),
+    path(
+        "complaints/routing-rules/<uuid:pk>/",
+        views.ComplaintRoutingRuleDetail.as_view(),
+        name="complaint_routing_rule_details",
+    ),
     # urls for assign complaint management
     path(
         "complaints/assign/",
@@ -205,9 +229,20 @@ urlpatterns = [
     path("bookings/<uuid:pk>/edit/", views.BookingUpdateDeleteView.as_view(), name="edit_booking"),
     path("bookings/<uuid:pk>/", views.BookingRetrieveView.as_view(), name="booking_details"),
     path("bookings/extend/", views.BookingExtend.as_view(), name="extend_booking"),
+    path("bookings/<uuid:pk>/modify/", views.BookingModifyStay.as_view(), name="modify_booking"),
+    path("bookings/<uuid:pk>/cancel/", views.BookingCancel.as_view(), name="cancel_booking"),
     path("bookings/<uuid:pk>/", views.BookingDetail.as_view(), name="booking_details"),
     path(
         "bookings/checkout/", views.BookingCheckout.as_view(), name="checkout_booking"
     ),
+    path(
+        "bookings/checkout/group/", views.BookingGroupCheckout.as_view(), name="group_checkout"
+    ),
+    path("bootstrap/", views.BootstrapView.as_view(), name="bootstrap"),
+    # urls for management reports
+    path("reports/occupancy/", views.OccupancyReportView.as_view(), name="occupancy_report"),
+    path("reports/labor/", views.LaborReportView.as_view(), name="labor_report"),
+    path("reports/night-audits/", views.NightAuditList.as_view(), name="night_audits"),
+    path("reports/complaints/", views.ComplaintDashboardView.as_view(), name="complaint_dashboard"),
 ]
 urlpatterns = format_suffix_patterns(urlpatterns)
@@ -5,21 +5,26 @@ from rest_framework import generics, status
 from rest_framework import exceptions, serializers
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
 from . import serializers as api_serializers
 from . import models
 from django.db.models import Q
 from django.db import transaction
-from utils import helpers
+from utils import helpers, reports, bookings, versions, room_search, complaint_search, rosters
 from rest_framework.decorators import api_view
-from datetime import datetime
+from datetime import datetime, timedelta
 from django.utils import timezone
 from rest_framework_simplejwt.views import TokenBlacklistView
 from rest_framework.mixins import UpdateModelMixin, DestroyModelMixin
 from . import custom_permissions
 from .mixins import CreatedByMixin
+from .throttles import GuestComplaintIPThrottle, GuestComplaintCodeThrottle
+from .pagination import StandardResultsPagination, NewestFirstCursorPagination
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from django.core.cache import cache
 
 # Create your views here.
 
@@ -491,6 +496,57 @@ class ProfileShiftAssignCreateView(generics.ListCreateAPIView):
         except models.Profile.DoesNotExist:
             raise serializers.ValidationError({"error": "user account has no profile"})
 
+class ShiftRosterCreateView(generics.CreateAPIView):
+    """
+    Assign shifts to many staff over a period in one request, e.g. a monthly roster.
+    """
+    serializer_class = api_serializers.ShiftRosterSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        try:
+            context["created_by"] = models.Profile.objects.get(user=self.request.user)
+            return context
+        except models.Profile.DoesNotExist:
+            raise serializers.ValidationError({"error": "user account has no profile"})
+
+class RosterCalendarView(APIView):
+    permission_classes = [IsAuthenticated, custom_permissions.IsAdmin | custom_permissions.IsDepartmentExec]
+
+    def get(self, request):
+        """
+        Who works which shift in a department, as a staff x day grid with each
+        shift's status and room-keeping task count.
+        Query Parameters:
+            start_date (str, optional): first day, defaults to today.
+            end_date (str, optional): last day, defaults to 6 days after start_date.
+            department (str, optional): department name, admins only; defaults
+                to the requester's department.
+        """
+        start_date, end_date = helpers.parse_date_range(request.GET, days=7, forward=True)
+        if (end_date - start_date).days >= rosters.MAX_CALENDAR_DAYS:
+            return Response(
+                {"error": f"the calendar can show at most {rosters.MAX_CALENDAR_DAYS} days"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        profile = request.user.profile
+        department_name = request.GET.get("department")
+        if department_name and profile.has_role("Admin"):
+            department = get_object_or_404(models.Department, name=department_name)
+        elif profile.department_id:
+            department = profile.department
+        else:
+            return Response(
+                {"error": "user account has no department"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        calendar = rosters.cached_roster_calendar(department.id, start_date, end_date)
+        return Response(
+            {"department": department.name, "start_date": start_date, "end_date": end_date, **calendar},
+            status=status.HTTP_200_OK,
+        )
+
 class ProfileShiftAssignUpdateView(generics.RetrieveUpdateDestroyAPIView):
     queryset = models.ProfileShiftAssign.objects.all()
     serializer_class = api_serializers.ProfileShiftAssignSerializer
@@ -530,8 +586,9 @@ def update_assigned_shift_status(request, pk):
             {"error": "you are not authorized to update this shift status"},
             status=status.HTTP_401_UNAUTHORIZED,
         )
-    assigned_shift.status = shift_status
-    assigned_shift.save()
+    with transaction.atomic():
+        assigned_shift.change_status(shift_status, request.user.profile)
+        assigned_shift.save()
     return Response(
         {"detail": "assigned shift status updated"}, status=status.HTTP_200_OK
     )
@@ -574,13 +631,14 @@ class UpdateAssignedShiftStatus(APIView):
                 {"error": "this shift has already ended"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        assigned_shift.status = shift_status
-        assigned_shift.last_modified_by = request.user.profile
-        if process_status == "Started":
-            assigned_shift.time_started = datetime.now()
-        elif process_status == "Ended":
-            assigned_shift.time_ended = datetime.now()
-        assigned_shift.save()
+        with transaction.atomic():
+            assigned_shift.change_status(shift_status, request.user.profile)
+            assigned_shift.last_modified_by = request.user.profile
+            if process_status == "Started":
+                assigned_shift.time_started = datetime.now()
+            elif process_status == "Ended":
+                assigned_shift.time_ended = datetime.now()
+            assigned_shift.save()
         return Response(
             {"detail": "assigned shift status updated"}, status=status.HTTP_200_OK
         )
@@ -699,15 +757,17 @@ class UpdateRoomKeepingStatus(APIView):
                 {"error": "this room keeping task is already in this status"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        member_shift = room_keeping_assign.member_shift
+        # the lifecycle scheduler expires shifts within a minute of their end
         if (
-            room_keeping_assign.shift_period_ended
-            or room_keeping_assign.member_shift.status.name == "Ended"
+            member_shift.status.name in models.ProfileShiftAssign.FINAL_STATUSES
+            or room_keeping_assign.shift_period_ended
         ):
             return Response(
                 {"error": "the shift period has expired or shift is ended"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        if room_keeping_assign.member_shift.status.name == "Started":
+        if member_shift.status.name == models.ProfileShiftAssign.SCHEDULED_STATUS:
             return Response(
                 {"error": "the shift has not started yet"},
                 status=status.HTTP_400_BAD_REQUEST,
@@ -762,9 +822,10 @@ class UpdateRoomKeepingStatus(APIView):
                     {"error": "This task has not been started yet"},
                     status=status.HTTP_400_BAD_REQUEST,
                 )
-        room_keeping_assign.change_status(process_status, request.user.profile)
-        room_keeping_assign.last_modified_by = request.user.profile
-        room_keeping_assign.save()
+        with transaction.atomic():
+            room_keeping_assign.change_status(process_status, request.user.profile)
+            room_keeping_assign.last_modified_by = request.user.profile
+            room_keeping_assign.save()
 
         serializer = api_serializers.RoomKeepingAssignSerializer(room_keeping_assign)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -880,6 +941,13 @@ class BookingExtend(APIView):
                 {"error": "booking id is required"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
+        try:
+            num_days = int(num_days)
+        except (TypeError, ValueError):
+            return Response(
+                {"error": "number of days must be a whole number"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
         try:
             booking = models.Booking.objects.get(id=booking_id)
         except models.Booking.DoesNotExist:
@@ -887,11 +955,43 @@ class BookingExtend(APIView):
                 {"error": "booking not found"}, status=status.HTTP_400_BAD_REQUEST
             )
         booking.extend_booking(num_days=num_days)
-        booking.save()
+        bookings.modify_stay(booking, check_out_date=booking.check_out_date)
         return Response(
             {"detail": "booking extended successfully"}, status=status.HTTP_200_OK
         )
 
+class BookingModifyStay(APIView):
+    permission_classes = [custom_permissions.IsFrontDeskStaff | custom_permissions.IsAdmin]
+
+    def post(self, request, pk):
+        """
+        Extend, shorten, shift or change the room type of a booking.
+        Only the nights that change are checked for availability and re-priced.
+        """
+        booking = get_object_or_404(models.Booking, id=pk)
+        serializer = api_serializers.StayModificationSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        modification = bookings.modify_stay(booking, **serializer.validated_data)
+        return Response(
+            {
+                "booking": api_serializers.BookingSerializer(modification["booking"]).data,
+                "nights_added": modification["nights_added"],
+                "nights_removed": modification["nights_removed"],
+                "cost_difference": modification["cost_difference"],
+            },
+            status=status.HTTP_200_OK,
+        )
+
+class BookingCancel(APIView):
+    permission_classes = [custom_permissions.IsFrontDeskStaff | custom_permissions.IsAdmin]
+
+    def post(self, request, pk):
+        booking = get_object_or_404(models.Booking, id=pk)
+        booking = bookings.cancel_booking(booking, request.user.profile)
+        return Response(
+            api_serializers.BookingSerializer(booking).data, status=status.HTTP_200_OK
+        )
+
 class BookingDetail(generics.RetrieveUpdateDestroyAPIView):
     queryset = models.Booking.objects.all()
     serializer_class = api_serializers.BookingSerializer
@@ -941,6 +1041,27 @@ class BookingCheckout(APIView):
             status=status.HTTP_400_BAD_REQUEST,
         )
 
+class BookingGroupCheckout(APIView):
+    permission_classes = [custom_permissions.IsFrontDeskStaff | custom_permissions.IsAdmin]
+
+    def post(self, request):
+        """
+        Check out a group of bookings at once. Departure cleans for the
+        released rooms are created in the background.
+        """
+        serializer = api_serializers.GroupCheckoutSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        checkouts = bookings.checkout_bookings(
+            serializer.validated_data["booking_ids"], request.user.profile
+        )
+        return Response(
+            {
+                "detail": f"{len(checkouts)} bookings checked out successfully",
+                "room_numbers": [checkout.room_number for checkout in checkouts],
+            },
+            status=status.HTTP_200_OK,
+        )
+
 class RoomCategoryCreateView(CreatedByMixin, generics.CreateAPIView):
     queryset = models.RoomCategory.objects.all()
     serializer_class = api_serializers.RoomCategorySerializer
@@ -1032,16 +1153,96 @@ class RoomTypeUpdateDeleteView(UpdateDeleteView):
     lookup_url_kwarg = "pk"
     permission_classes = [custom_permissions.IsHouseKeepingStaff | custom_permissions.IsAdmin, custom_permissions.IsDepartmentExec]
 
+ROOM_CATALOG_TABLES = [
+    models.Room,
+    models.RoomType,
+    models.RoomCategory,
+    models.HotelFloor,
+    models.BedType,
+    models.Amenity,
+    models.RoomAmenity,
+    models.RoomImage,
+]
+
+def room_catalog_etag(request, *args, **kwargs):
+    return versions.etag(ROOM_CATALOG_TABLES, request.get_full_path())
+
 class RoomListView(generics.ListAPIView):
-    queryset = models.Room.objects.all()
+    queryset = (
+        models.Room.objects.select_related(
+            "room_type", "floor", "room_category", "bed_type"
+        )
+        .prefetch_related("amenities", "room_images")
+        .order_by("room_number")
+    )
+    serializer_class = api_serializers.RoomSerializer
+    permission_classes = [IsAuthenticated]
+    pagination_class = StandardResultsPagination
+
+    @method_decorator(condition(etag_func=room_catalog_etag))
+    def get(self, request, *args, **kwargs):
+        """
+        List rooms. Clients polling with If-None-Match get a 304 without the
+        rooms being read while none of the tables the list renders has changed.
+        """
+        return super().get(request, *args, **kwargs)
+
+class RoomSearchView(generics.ListAPIView):
     serializer_class = api_serializers.RoomSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = StandardResultsPagination
+    filter_params = [*room_search.ROOM_FACETS, "price_band", "amenities"]
+
+    def get_filters(self):
+        filters = {}
+        for param in self.filter_params:
+            values = [
+                value.strip()
+                for value in self.request.query_params.get(param, "").split(",")
+                if value.strip()
+            ]
+            if values:
+                filters[param] = values
+        unknown_bands = set(filters.get("price_band", [])) - set(room_search.PRICE_BANDS)
+        if unknown_bands:
+            raise serializers.ValidationError(
+                {"error": f"unknown price bands: {', '.join(sorted(unknown_bands))}"}
+            )
+        if any(not value.isdigit() for value in filters.get("occupancy", [])):
+            raise serializers.ValidationError({"error": "occupancy must be a whole number"})
+        return filters
+
+    def get_queryset(self):
+        rooms, self.facets = room_search.search_rooms(self.get_filters())
+        return (
+            rooms.select_related("room_type", "floor", "room_category", "bed_type")
+            .prefetch_related("amenities", "room_images")
+            .order_by("room_number")
+        )
+
+    def list(self, request, *args, **kwargs):
+        """
+        Search rooms by floor, view, bed type, category, type, occupancy,
+        price band and amenities (comma separated values), with a count next
+        to every option of every filter.
+        """
+        response = super().list(request, *args, **kwargs)
+        response.data["facets"] = self.facets
+        return response
 
 class RoomCreateView(CreatedByMixin, generics.CreateAPIView):
     queryset = models.Room.objects.all()
     serializer_class = api_serializers.RoomSerializer
     permission_classes = [custom_permissions.IsHouseKeepingStaff | custom_permissions.IsAdmin, custom_permissions.IsDepartmentExec]
 
+class RoomBulkCreateView(CreatedByMixin, generics.CreateAPIView):
+    """
+    Provision many rooms of one type on a floor, e.g. a new wing.
+    """
+    queryset = models.Room.objects.all()
+    serializer_class = api_serializers.BulkRoomProvisionSerializer
+    permission_classes = [custom_permissions.IsHouseKeepingStaff | custom_permissions.IsAdmin, custom_permissions.IsDepartmentExec]
+
 class RoomRetrieveView(generics.RetrieveAPIView):
     queryset = models.Room.objects.all()
     serializer_class = api_serializers.RoomSerializer
@@ -1062,26 +1263,75 @@ class ComplaintCreate(generics.ListCreateAPIView):
     serializer_class = api_serializers.ComplaintSerializer
 
 class ComplaintList(generics.ListAPIView):
-    # queryset = models.Complaint.objects.all()
     serializer_class = api_serializers.ComplaintSerializer
+    pagination_class = NewestFirstCursorPagination
+    # query parameter -> lookup, values are comma separated names
+    filter_params = {
+        "status": "status__name__in",
+        "department": "department__name__in",
+        "priority": "priority__name__in",
+    }
+
+    def get_filters(self):
+        filters = {}
+        for param, lookup in self.filter_params.items():
+            values = [
+                value.strip()
+                for value in self.request.query_params.get(param, "").split(",")
+                if value.strip()
+            ]
+            if values:
+                filters[lookup] = values
+        try:
+            if self.request.query_params.get("start_date"):
+                filters["date_created__date__gte"] = datetime.strptime(
+                    self.request.query_params["start_date"], "%Y-%m-%d"
+                ).date()
+            if self.request.query_params.get("end_date"):
+                filters["date_created__date__lte"] = datetime.strptime(
+                    self.request.query_params["end_date"], "%Y-%m-%d"
+                ).date()
+        except ValueError:
+            raise serializers.ValidationError(
+                {"error": "dates must be in the format YYYY-MM-DD"}
+            )
+        return filters
 
     def get_queryset(self):
-        queryset = models.Complaint.objects.prefetch_related(
-            Prefetch(
-                "assigned_complaints",
-                queryset=models.AssignComplaint.objects.select_related(
-                    "assigned_to", "complaint_status", "priority", "assigned_by"
-                ).prefetch_related("complaint_items", "hashtags"),
-            ),
-            Prefetch(
-                "processed_complaints",
-                queryset=models.ProcessComplaint.objects.select_related(
-                    "processed_by", "complaint_status"
+        # everything the serializer renders is loaded here, so a page costs
+        # the same number of queries whatever its size
+        queryset = (
+            models.Complaint.objects.filter(**self.get_filters())
+            .select_related("room_number")
+            .prefetch_related(
+                "complaint_items",
+                "hashtags",
+                Prefetch(
+                    "assigned_complaints",
+                    queryset=models.AssignComplaint.objects.select_related(
+                        "assigned_to_department", "priority"
+                    ).prefetch_related("hashtags"),
+                ),
+                Prefetch(
+                    "processed_complaints",
+                    queryset=models.ProcessComplaint.objects.select_related(
+                        "complaint_status"
+                    ),
                 ),
-            ),
+            )
         )
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        """
+        List complaints, newest first, one cursor page at a time.
+        Query Parameters:
+            status, department, priority (str, optional): comma separated names.
+            start_date, end_date (str, optional): YYYY-MM-DD bounds on the day
+                the complaint was made.
+        """
+        return super().list(request, *args, **kwargs)
+
     def get_serializer_context(self):
         try:
             profile = models.Profile.objects.get(user=self.request.user)
@@ -1099,6 +1349,48 @@ class ComplaintDetail(generics.RetrieveUpdateDestroyAPIView):
     serializer_class = api_serializers.ComplaintSerializer
     lookup_url_kwarg = "pk"
 
+class GuestComplaintCreate(generics.CreateAPIView):
+    """
+    Lets in-house guests file a complaint with their booking code and room
+    number instead of an account.
+    """
+    serializer_class = api_serializers.GuestComplaintSerializer
+    authentication_classes = []
+    permission_classes = [AllowAny]
+    throttle_classes = [GuestComplaintIPThrottle, GuestComplaintCodeThrottle]
+
+class ComplaintSearchView(ComplaintList):
+    pagination_class = StandardResultsPagination
+
+    def get_queryset(self):
+        query = self.request.query_params.get("q", "").strip()
+        if not query:
+            raise serializers.ValidationError({"error": "a search query is required"})
+        return complaint_search.search(super().get_queryset(), query)
+
+    def list(self, request, *args, **kwargs):
+        """
+        Full-text search over complaint titles and messages, assignment
+        messages and processing notes, best matches first.
+        Query Parameters:
+            q (str): the words to look for; "4xx" matches rooms 400 to 499.
+            status, department, priority, start_date, end_date: as for the complaint list.
+        """
+        return super().list(request, *args, **kwargs)
+
+class ComplaintRoutingRuleList(generics.ListCreateAPIView):
+    queryset = models.ComplaintRoutingRule.objects.select_related(
+        "department", "priority"
+    ).prefetch_related("amenities", "floors", "hashtags")
+    serializer_class = api_serializers.ComplaintRoutingRuleSerializer
+    permission_classes = [custom_permissions.IsAdmin | custom_permissions.IsDepartmentExec]
+
+class ComplaintRoutingRuleDetail(generics.RetrieveUpdateDestroyAPIView):
+    queryset = models.ComplaintRoutingRule.objects.all()
+    serializer_class = api_serializers.ComplaintRoutingRuleSerializer
+    lookup_url_kwarg = "pk"
+    permission_classes = [custom_permissions.IsAdmin | custom_permissions.IsDepartmentExec]
+
 class AssignComplaintList(generics.ListCreateAPIView):
     queryset = models.AssignComplaint.objects.all()
     serializer_class = api_serializers.AssignComplaintSerializer
@@ -1252,3 +1544,140 @@ class NameTitleRetrieveView(generics.RetrieveAPIView):
     serializer_class = api_serializers.NameTitleSerializer
     lookup_url_kwarg = "pk"
     permission_classes = [IsAuthenticated]
+
+class ComplaintDashboardView(APIView):
+    permission_classes = [IsAuthenticated, custom_permissions.IsAdmin | custom_permissions.IsDepartmentExec]
+
+    def get(self, request):
+        """
+        Complaint counts by status, department, priority, hashtag and day and
+        the mean time to resolution, for any range up to years in one request.
+        Query Parameters:
+            start_date (str, optional): first day, defaults to 29 days before end_date.
+            end_date (str, optional): last day, defaults to today.
+        """
+        start_date, end_date = helpers.parse_date_range(request.GET, days=30)
+        dashboard = reports.cached_complaint_dashboard(start_date, end_date)
+        return Response(
+            {"start_date": start_date, "end_date": end_date, **dashboard},
+            status=status.HTTP_200_OK,
+        )
+
+class OccupancyReportView(APIView):
+    permission_classes = [IsAuthenticated, custom_permissions.IsAdmin | custom_permissions.IsDepartmentExec]
+
+    def get(self, request):
+        """
+        Occupancy, ADR and RevPAR read from the nightly DailyOccupancy rollup.
+        Query Parameters:
+            start_date (str, optional): first day of the report, defaults to a year before end_date.
+            end_date (str, optional): last day of the report, defaults to today.
+            group_by (str, optional): comma separated list of date, room_type, booking_source
+                and sponsor_type. Defaults to date.
+        """
+        start_date, end_date = helpers.parse_date_range(request.GET, days=365)
+        group_by = [
+            key.strip() for key in request.GET.get("group_by", "date").split(",") if key.strip()
+        ]
+        if not group_by or any(
+            key not in reports.OCCUPANCY_REPORT_DIMENSIONS for key in group_by
+        ):
+            return Response(
+                {
+                    "error": f"group_by must be one or more of {', '.join(reports.OCCUPANCY_REPORT_DIMENSIONS)}"
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        report = reports.occupancy_report(start_date, end_date, group_by)
+        return Response(
+            {"start_date": start_date, "end_date": end_date, "results": report},
+            status=status.HTTP_200_OK,
+        )
+
+class LaborReportView(APIView):
+    permission_classes = [IsAuthenticated, custom_permissions.IsAdmin | custom_permissions.IsDepartmentExec]
+
+    def get(self, request):
+        """
+        Hours worked, overtime, tasks completed and rooms cleaned per hour read
+        from the DailyLabor rollup. Department executives see their own department.
+        Query Parameters:
+            start_date (str, optional): first day of the report, defaults to 29 days before end_date.
+            end_date (str, optional): last day of the report, defaults to today.
+            group_by (str, optional): comma separated list of department, date and staff.
+                Defaults to department.
+        """
+        start_date, end_date = helpers.parse_date_range(request.GET, days=30)
+        group_by = [
+            key.strip() for key in request.GET.get("group_by", "department").split(",") if key.strip()
+        ]
+        if not group_by or any(
+            key not in reports.LABOR_REPORT_DIMENSIONS for key in group_by
+        ):
+            return Response(
+                {
+                    "error": f"group_by must be one or more of {', '.join(reports.LABOR_REPORT_DIMENSIONS)}"
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        profile = request.user.profile
+        department_id = None if profile.has_role("Admin") else profile.department_id
+        if not department_id and not profile.has_role("Admin"):
+            return Response(
+                {"error": "user account has no department"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        report = reports.labor_report(start_date, end_date, group_by, department_id)
+        return Response(
+            {"start_date": start_date, "end_date": end_date, "results": report},
+            status=status.HTTP_200_OK,
+        )
+
+class NightAuditList(generics.ListAPIView):
+    queryset = models.NightAudit.objects.all()
+    serializer_class = api_serializers.NightAuditSerializer
+    permission_classes = [IsAuthenticated, custom_permissions.IsAdmin | custom_permissions.IsDepartmentExec]
+
+def bootstrap_collections():
+    return {
+        "genders": (models.Gender.objects.all(), api_serializers.GenderSerializer),
+        "countries": (models.Country.objects.all(), api_serializers.CountrySerializer),
+        "titles": (models.NameTitle.objects.all(), api_serializers.NameTitleSerializer),
+        "shifts": (models.Shift.objects.all(), api_serializers.ShiftSerializer),
+        "shift_statuses": (models.ShiftStatus.objects.all(), api_serializers.ShiftStatusSerializer),
+        "priorities": (models.Priority.objects.all(), api_serializers.PrioritySerializer),
+        "room_types": (
+            models.RoomType.objects.prefetch_related("amenities"),
+            api_serializers.RoomTypeSerializer,
+        ),
+        "room_categories": (models.RoomCategory.objects.all(), api_serializers.RoomCategorySerializer),
+        "bed_types": (models.BedType.objects.all(), api_serializers.BedTypeSerializer),
+        "floors": (models.HotelFloor.objects.all(), api_serializers.FloorSerializer),
+        "views": (models.HotelView.objects.all(), api_serializers.HotelViewSerializer),
+        "amenities": (models.Amenity.objects.all(), api_serializers.AmenitySerializer),
+    }
+
+def bootstrap_etag(request, *args, **kwargs):
+    return versions.etag(
+        [queryset.model for queryset, _ in bootstrap_collections().values()]
+    )
+
+class BootstrapView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @method_decorator(condition(etag_func=bootstrap_etag))
+    def get(self, request):
+        """
+        All reference collections the front end needs on startup, in one
+        payload. The ETag combines the versions of every table, so one
+        conditional request revalidates everything.
+        """
+        cache_key = f"bootstrap:{bootstrap_etag(request)}"
+        payload = cache.get(cache_key)
+        if payload is None:
+            payload = {
+                name: serializer_class(queryset, many=True).data
+                for name, (queryset, serializer_class) in bootstrap_collections().items()
+            }
+            cache.set(cache_key, payload, 60 * 60 * 24)
+        return Response(payload, status=status.HTTP_200_OK)
@@ -14,6 +14,8 @@ from pathlib import Path
 from decouple import config, Csv
 import os
 from datetime import timedelta
+from celery.schedules import crontab
+from corsheaders.defaults import default_headers
 
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -38,6 +40,9 @@ CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",
 ]
 
+CORS_ALLOW_HEADERS = (*default_headers, "if-none-match")
+CORS_EXPOSE_HEADERS = ["ETag"]
+
 
 SIMPLE_JWT = {
     "TOKEN_OBTAIN_SERIALIZER": "my_app.serializers.MyTokenObtainPairSerializer",
@@ -175,3 +180,41 @@ CELERY_RESULT_BACKEND = "redis://localhost:6379/0"
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": config("CACHE_URL", default="redis://localhost:6379/1"),
+    }
+}
+
+CELERY_BEAT_SCHEDULE = {
+    "refresh-daily-occupancy": {
+        "task": "api.tasks.refresh_daily_occupancy",
+        "schedule": crontab(hour=2, minute=0),
+    },
+    "refresh-daily-labor": {
+        "task": "api.tasks.refresh_daily_labor",
+        "schedule": crontab(minute=30),
+    },
+    "run-night-audit": {
+        "task": "api.tasks.run_night_audit",
+        "schedule": crontab(hour=1, minute=0),
+    },
+    "reprice-rooms": {
+        "task": "api.tasks.reprice_rooms",
+        "schedule": crontab(hour=0, minute=1),
+    },
+    "relay-outbox": {
+        "task": "api.tasks.relay_outbox",
+        "schedule": 10.0,
+    },
+    "escalate-overdue-complaints": {
+        "task": "api.tasks.escalate_overdue_complaints",
+        "schedule": 60.0,
+    },
+    "update-shift-status": {
+        "task": "api.tasks.update_shift_status",
+        "schedule": 60.0,
+    },
+}
@@ -0,0 +1,157 @@
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import F, Count
+from api import models
+from utils import versions
+
+
+def mask_of(bits) -> int:
+    mask = 0
+    for bit in bits:
+        if bit is not None:
+            mask |= 1 << bit
+    return mask
+
+
+def refresh_room_masks(room_ids) -> int:
+    '''
+    Recomputes Room.amenity_mask from the RoomAmenity rows of the given rooms,
+    with one read and one UPDATE per distinct mask.
+    '''
+    room_ids = list(room_ids)
+    masks = {room_id: 0 for room_id in room_ids}
+    for room_id, bit in models.RoomAmenity.objects.filter(
+        room_id__in=room_ids, amenity__bit__isnull=False
+    ).values_list("room_id", "amenity__bit"):
+        masks[room_id] |= 1 << bit
+    rooms_by_mask = defaultdict(list)
+    for room_id, mask in masks.items():
+        rooms_by_mask[mask].append(room_id)
+    updated = 0
+    for mask, ids in rooms_by_mask.items():
+        updated += (
+            models.Room.objects.filter(id__in=ids)
+            .exclude(amenity_mask=mask)
+            .update(amenity_mask=mask)
+        )
+    return updated
+
+
+def refresh_room_type_masks(room_type_ids) -> int:
+    room_type_ids = list(room_type_ids)
+    masks = {room_type_id: 0 for room_type_id in room_type_ids}
+    for room_type_id, bit in models.RoomType.amenities.through.objects.filter(
+        roomtype_id__in=room_type_ids, amenity__bit__isnull=False
+    ).values_list("roomtype_id", "amenity__bit"):
+        masks[room_type_id] |= 1 << bit
+    updated = 0
+    for room_type_id, mask in masks.items():
+        updated += models.RoomType.objects.filter(id=room_type_id).update(amenity_mask=mask)
+    return updated
+
+
+def clear_amenity_bit(bit: int):
+    '''Removes a deleted amenity's bit from every mask before the bit is reused.'''
+    for model in (models.Room, models.RoomType):
+        model.objects.annotate(has_bit=F("amenity_mask").bitand(1 << bit)).exclude(
+            has_bit=0
+        ).update(amenity_mask=F("amenity_mask").bitand(~(1 << bit)))
+    versions.bump(models.Room, models.RoomType)
+
+
+def resolve_amenities(names) -> dict:
+    '''
+    Turns amenity names into the mask to test and the names that have no bit.
+    Returns None when one of the names is not a known amenity.
+    '''
+    names = set(names)
+    amenities = list(models.Amenity.objects.filter(name__in=names).values_list("name", "bit"))
+    if len(amenities) != len(names):
+        return None
+    return {
+        "mask": mask_of(bit for _, bit in amenities),
+        "without_bit": [name for name, bit in amenities if bit is None],
+    }
+
+
+def apply_amenity_filter(rooms, resolved: dict):
+    '''
+    Keeps the rooms that have every resolved amenity. Amenities with a bit are
+    matched with one bitwise test on amenity_mask, whatever their number; the
+    rare amenity without a bit falls back to the RoomAmenity table.
+    '''
+    if resolved is None:
+        return rooms.none()
+    if resolved["mask"]:
+        rooms = rooms.annotate(
+            required_amenities=F("amenity_mask").bitand(resolved["mask"])
+        ).filter(required_amenities=resolved["mask"])
+    if resolved["without_bit"]:
+        rooms = rooms.filter(
+            id__in=models.RoomAmenity.objects.filter(amenity__name__in=resolved["without_bit"])
+            .values("room_id")
+            .annotate(matched=Count("amenity_id", distinct=True))
+            .filter(matched=len(resolved["without_bit"]))
+            .values("room_id")
+        )
+    return rooms
+
+
+def filter_by_amenities(rooms, names: list):
+    if not names:
+        return rooms
+    return apply_amenity_filter(rooms, resolve_amenities(names))
+
+
+def reconcile_room_type_amenities(room_type_ids) -> dict:
+    '''
+    Brings the RoomAmenity rows of every room of the given types in line with
+    the full amenity set of its type: missing amenities are inserted and rows
+    the type handed down for amenities it no longer has are deleted, with one
+    INSERT and one DELETE instead of re-saving the rooms one by one.
+    Amenities a room was given on its own are left alone.
+    Args:
+        room_type_ids: the room types to reconcile.
+    Returns:
+        dict: the number of RoomAmenity rows inserted and deleted.
+    '''
+    room_type_ids = list(room_type_ids)
+    type_amenities = defaultdict(set)
+    for room_type_id, amenity_id in models.RoomType.amenities.through.objects.filter(
+        roomtype_id__in=room_type_ids
+    ).values_list("roomtype_id", "amenity_id"):
+        type_amenities[room_type_id].add(amenity_id)
+    with transaction.atomic():
+        room_types = dict(
+            models.Room.objects.filter(room_type_id__in=room_type_ids).values_list(
+                "id", "room_type_id"
+            )
+        )
+        room_amenities = defaultdict(set)
+        stale = []
+        for row_id, room_id, amenity_id, from_room_type in models.RoomAmenity.objects.filter(
+            room_id__in=room_types
+        ).values_list("id", "room_id", "amenity_id", "from_room_type"):
+            if from_room_type and amenity_id not in type_amenities[room_types[room_id]]:
+                stale.append(row_id)
+            else:
+                room_amenities[room_id].add(amenity_id)
+        deleted = 0
+        if stale:
+            deleted, _ = models.RoomAmenity.objects.filter(id__in=stale).delete()
+        inserted = len(
+            models.RoomAmenity.objects.bulk_create(
+                [
+                    models.RoomAmenity(
+                        room_id=room_id, amenity_id=amenity_id, from_room_type=True
+                    )
+                    for room_id, room_type_id in room_types.items()
+                    for amenity_id in type_amenities[room_type_id] - room_amenities[room_id]
+                ],
+                batch_size=1000,
+            )
+        )
+        if inserted or deleted:
+            refresh_room_masks(room_types)
+            versions.bump(models.Room, models.RoomAmenity)
+    return {"inserted": inserted, "deleted": deleted}
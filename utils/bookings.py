@@ -0,0 +1,335 @@
+from collections import Counter
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+from rest_framework import serializers
+from api import models
+from utils import pricing, versions
+
+# bookings in these states hold their nights against the room type inventory
+INVENTORY_HOLDING_STATUSES = ["pending", "confirmed", "checked-in"]
+
+
+def _local_date(value) -> date:
+    if isinstance(value, datetime):
+        return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    return value
+
+
+def stay_nights(check_in_date, check_out_date) -> list:
+    '''
+    Returns the nights of a stay, i.e. every date from check-in up to but
+    excluding check-out.
+    '''
+    first_night = _local_date(check_in_date)
+    last_night = _local_date(check_out_date) - timedelta(days=1)
+    return [
+        first_night + timedelta(days=offset)
+        for offset in range((last_night - first_night).days + 1)
+    ]
+
+
+def nightly_rates(room_type: models.RoomType, nights: list) -> dict:
+    '''
+    Prices each night from the RoomRate valid on that night, falling back to
+    the room type base price. The rates overlapping the nights are read once.
+    Args:
+        room_type (models.RoomType): the room type being priced.
+        nights (list): the dates to price.
+    Returns:
+        dict: {night: rate}
+    '''
+    if not nights:
+        return {}
+    rates = list(
+        room_type.room_rates.filter(
+            start_date__lte=max(nights), end_date__gte=min(nights)
+        )
+        .order_by(*pricing.RATE_PRECEDENCE)
+        .values_list("start_date", "end_date", "price")
+    )
+    priced = {}
+    for night in nights:
+        priced[night] = next(
+            (price for start_date, end_date, price in rates if start_date <= night <= end_date),
+            room_type.base_price,
+        )
+    return priced
+
+
+def unavailable_nights(room_type: models.RoomType, nights: list, exclude_booking=None) -> list:
+    '''
+    Checks the room type inventory for the given nights only.
+    Args:
+        room_type (models.RoomType): the room type to check.
+        nights (list): the dates to check.
+        exclude_booking: a booking whose own nights should not be counted.
+    Returns:
+        list: the nights on which every room of the type is already held.
+    '''
+    if not nights:
+        return []
+    total_rooms = room_type.rooms.count()
+    held_nights = models.BookingNight.objects.filter(
+        room_type=room_type,
+        night__in=nights,
+        booking__booking_status__in=INVENTORY_HOLDING_STATUSES,
+    )
+    if exclude_booking is not None:
+        held_nights = held_nights.exclude(booking=exclude_booking)
+    held = Counter(held_nights.values_list("night", flat=True))
+    return [night for night in nights if held[night] >= total_rooms]
+
+
+def book_nights(booking: models.Booking) -> Decimal:
+    '''
+    Creates the BookingNight rows of a new booking and returns their total cost.
+    '''
+    rates = nightly_rates(
+        booking.room_type, stay_nights(booking.check_in_date, booking.check_out_date)
+    )
+    models.BookingNight.objects.bulk_create(
+        [
+            models.BookingNight(
+                booking=booking, night=night, room_type=booking.room_type, rate=rate
+            )
+            for night, rate in rates.items()
+        ]
+    )
+    return sum(rates.values(), Decimal("0.00"))
+
+
+def update_payment_status(booking: models.Booking):
+    total_amount_paid = booking.payments.aggregate(total=Sum("amount_paid"))["total"] or 0
+    if total_amount_paid > 0 and total_amount_paid < booking.booking_cost:
+        booking.payment_status = "partially-paid"
+    elif total_amount_paid > 0 and total_amount_paid >= booking.booking_cost:
+        booking.payment_status = "paid"
+    else:
+        booking.payment_status = "unpaid"
+
+
+def modify_stay(
+    booking: models.Booking,
+    check_in_date=None,
+    check_out_date=None,
+    room_type: models.RoomType = None,
+):
+    '''
+    Extends, shortens, shifts or changes the room type of a stay.
+    Only the nights that change are checked against the inventory and priced;
+    nights that are kept keep the rate they were booked at.
+    Args:
+        booking (models.Booking): the booking to modify.
+        check_in_date (datetime): the new check-in date, defaults to the current one.
+        check_out_date (datetime): the new check-out date, defaults to the current one.
+        room_type (models.RoomType): the new room type, defaults to the current one.
+    Returns:
+        dict: the nights added and removed and the cost difference.
+    Raises:
+        ValidationError: if the new stay is invalid or a new night is not available.
+    '''
+    with transaction.atomic():
+        booking = models.Booking.objects.select_for_update().get(id=booking.id)
+        check_in_date = check_in_date or booking.check_in_date
+        check_out_date = check_out_date or booking.check_out_date
+        room_type = room_type or booking.room_type
+        if booking.booking_status not in INVENTORY_HOLDING_STATUSES:
+            raise serializers.ValidationError(
+                {"error": f"a {booking.booking_status} booking cannot be modified"}
+            )
+        if _local_date(check_in_date) >= _local_date(check_out_date):
+            raise serializers.ValidationError(
+                {"error": "Check-out date must be later than check-in date"}
+            )
+        if booking.booking_status == "checked-in" and _local_date(
+            check_in_date
+        ) != _local_date(booking.check_in_date):
+            raise serializers.ValidationError(
+                {"error": "the check-in date of an in-house stay cannot be changed"}
+            )
+        # serialize modifications of the same room type so two requests
+        # cannot both take the last room on a night
+        room_type = models.RoomType.objects.select_for_update().get(id=room_type.id)
+
+        booked = {night.night: night for night in booking.nights.all()}
+        new_nights = set(stay_nights(check_in_date, check_out_date))
+        if room_type.id != booking.room_type_id:
+            # nights already slept stay on the old room type
+            kept = {
+                night for night in new_nights & set(booked) if night < timezone.localdate()
+            }
+        else:
+            kept = new_nights & set(booked)
+        removed = sorted(set(booked) - kept)
+        added = sorted(new_nights - kept)
+
+        charged = set(
+            booking.folio_charges.filter(
+                charge_type="room", charge_date__in=removed
+            ).values_list("charge_date", flat=True)
+        )
+        if charged:
+            raise serializers.ValidationError(
+                {"error": f"nights already charged cannot be changed: {sorted(charged)}"}
+            )
+        sold_out = unavailable_nights(room_type, added, exclude_booking=booking)
+        if sold_out:
+            raise serializers.ValidationError(
+                {"error": f"{room_type.name} is not available on {', '.join(str(night) for night in sold_out)}"}
+            )
+        rates = nightly_rates(room_type, added)
+        removed_cost = sum((booked[night].rate for night in removed), Decimal("0.00"))
+        added_cost = sum(rates.values(), Decimal("0.00"))
+
+        models.BookingNight.objects.filter(booking=booking, night__in=removed).delete()
+        models.BookingNight.objects.bulk_create(
+            [
+                models.BookingNight(booking=booking, night=night, room_type=room_type, rate=rate)
+                for night, rate in rates.items()
+            ]
+        )
+        booking.check_in_date = check_in_date
+        booking.check_out_date = check_out_date
+        booking.room_type = room_type
+        booking.booking_cost = Decimal(booking.booking_cost or 0) - removed_cost + added_cost
+        booking.is_overstay = booking.is_overstay and (
+            _local_date(check_out_date) <= timezone.localdate()
+        )
+        update_payment_status(booking)
+        booking.save()
+    return {
+        "booking": booking,
+        "nights_added": added,
+        "nights_removed": removed,
+        "cost_difference": added_cost - removed_cost,
+    }
+
+
+def checkout_bookings(booking_ids: list, checked_out_by=None) -> list:
+    '''
+    Checks out many in-house bookings in one transaction: the bookings, their
+    check-ins and rooms are updated with one statement each and the Checkout
+    rows are inserted in one batch. A booking.checked_out event is recorded per
+    booking; the outbox relay queues the departure cleans.
+    Args:
+        booking_ids (list): ids of the bookings to check out.
+        checked_out_by: the profile checking the guests out.
+    Returns:
+        list: the Checkout records created.
+    Raises:
+        ValidationError: if any booking is missing or not checked in. Nothing
+            is checked out in that case.
+    '''
+    now = timezone.now()
+    with transaction.atomic():
+        in_house = list(
+            models.Booking.objects.select_for_update(of=("self",))
+            .select_related("guest")
+            .filter(id__in=booking_ids)
+        )
+        found = {str(booking.id) for booking in in_house}
+        missing = [str(booking_id) for booking_id in booking_ids if str(booking_id) not in found]
+        if missing:
+            raise serializers.ValidationError(
+                {"error": f"bookings not found: {', '.join(missing)}"}
+            )
+        not_in_house = [
+            str(booking.id) for booking in in_house if booking.booking_status != "checked-in"
+        ]
+        if not_in_house:
+            raise serializers.ValidationError(
+                {"error": f"bookings not checked in: {', '.join(not_in_house)}"}
+            )
+        checkins = {
+            checkin.booking_code: checkin
+            for checkin in models.Checkin.objects.filter(
+                booking_code__in=[booking.booking_code for booking in in_house],
+                checked_out=False,
+            )
+        }
+        room_ids = [
+            checkins[booking.booking_code].room_id
+            for booking in in_house
+            if booking.booking_code in checkins and checkins[booking.booking_code].room_id
+        ]
+
+        models.Booking.objects.filter(id__in=[booking.id for booking in in_house]).update(
+            booking_status="checked-out", is_overstay=False, date_modified=now
+        )
+        models.Checkin.objects.filter(
+            id__in=[checkin.id for checkin in checkins.values()]
+        ).update(checked_out=True, check_out_date=now)
+        models.Room.objects.filter(id__in=room_ids).update(
+            room_booking_status="empty",
+            room_maintenance_status="used",
+            is_occupied=False,
+            is_cleaned=False,
+            current_guest=None,
+        )
+        versions.bump(models.Room)
+        checkouts = models.Checkout.objects.bulk_create(
+            [
+                models.Checkout(
+                    booking=booking,
+                    guest=booking.guest,
+                    room_number=getattr(checkins.get(booking.booking_code), "room_number", None),
+                    first_name=getattr(booking.guest, "first_name", booking.guest_name or ""),
+                    last_name=getattr(booking.guest, "last_name", ""),
+                    gender_id=getattr(booking.guest, "gender_id", None),
+                    date_checked_in=getattr(
+                        checkins.get(booking.booking_code), "check_in_date", booking.check_in_date
+                    ),
+                    date_checked_out=now,
+                    checked_out_by=checked_out_by,
+                    checked_in_by=booking.created_by,
+                )
+                for booking in in_house
+            ]
+        )
+        models.OutboxEvent.objects.publish_many(
+            "booking.checked_out",
+            [
+                (
+                    booking,
+                    {
+                        "booking_code": booking.booking_code,
+                        "guest": booking.guest_id,
+                        "room": getattr(checkins.get(booking.booking_code), "room_id", None),
+                        "checked_out_by": getattr(checked_out_by, "id", None),
+                    },
+                )
+                for booking in in_house
+            ],
+        )
+    return checkouts
+
+
+def cancel_booking(booking: models.Booking, cancelled_by=None) -> models.Booking:
+    '''
+    Cancels a booking that has not been checked in yet. Its nights stop holding
+    the room type inventory as soon as the status changes.
+    Raises:
+        ValidationError: if the guest is already in house or the booking is closed.
+    '''
+    with transaction.atomic():
+        booking = models.Booking.objects.select_for_update().get(id=booking.id)
+        if booking.booking_status not in ["pending", "confirmed"]:
+            raise serializers.ValidationError(
+                {"error": f"a {booking.booking_status} booking cannot be cancelled"}
+            )
+        booking.booking_status = "cancelled"
+        booking.save()
+        models.OutboxEvent.objects.publish(
+            "booking.cancelled",
+            booking,
+            {
+                "booking_code": booking.booking_code,
+                "guest": booking.guest_id,
+                "email": booking.email,
+                "cancelled_by": getattr(cancelled_by, "id", None),
+            },
+        )
+    return booking
@@ -56,4 +56,10 @@ PAYMENT_STATUS_CHOICES = [
     ("unpaid", "Unpaid"),
     ("partially-paid", "Partially Paid"),
     ("refunded", "Refunded"),
-]
\ No newline at end of file
+]
+
+FOLIO_CHARGE_TYPE_CHOICES = [
+    ("room", "Room"),
+    ("extra", "Extra"),
+    ("adjustment", "Adjustment"),
+]
@@ -0,0 +1,195 @@
+import re
+import threading
+from collections import defaultdict
+from django.db import transaction
+from django.utils import timezone
+from api import models
+from utils import defaults, reference, versions
+
+_index = None
+_lock = threading.Lock()
+
+
+class CompiledRule:
+    def __init__(self, rule: models.ComplaintRoutingRule):
+        self.id = rule.id
+        self.name = rule.name
+        self.amenity_ids = frozenset(amenity.id for amenity in rule.amenities.all())
+        self.keywords = frozenset(
+            keyword.strip().casefold() for keyword in rule.keywords.split(",") if keyword.strip()
+        )
+        self.floor_ids = frozenset(floor.id for floor in rule.floors.all())
+        self.active_from = rule.active_from
+        self.active_to = rule.active_to
+        self.department_id = rule.department_id
+        self.priority_id = rule.priority_id
+        self.hashtag_ids = tuple(hashtag.id for hashtag in rule.hashtags.all())
+
+    def is_active_at(self, time) -> bool:
+        if self.active_from is None or self.active_to is None:
+            return True
+        if self.active_from <= self.active_to:
+            return self.active_from <= time <= self.active_to
+        return time >= self.active_from or time <= self.active_to
+
+    def matches(self, amenity_ids, keywords, floor_id, time) -> bool:
+        return (
+            (not self.amenity_ids or not self.amenity_ids.isdisjoint(amenity_ids))
+            and (not self.keywords or not self.keywords.isdisjoint(keywords))
+            and (not self.floor_ids or floor_id in self.floor_ids)
+            and self.is_active_at(time)
+        )
+
+
+class RuleIndex:
+    '''
+    The active rules in evaluation order, indexed so only rules that can
+    match a complaint are checked: rules with amenity conditions are found
+    through the complaint items, rules with keyword conditions through one
+    regular expression holding every keyword.
+    '''
+
+    def __init__(self, version, rules):
+        self.version = version
+        self.rules = [CompiledRule(rule) for rule in rules]
+        self.by_amenity = defaultdict(set)
+        self.by_keyword = defaultdict(set)
+        self.unindexed = set()
+        for position, rule in enumerate(self.rules):
+            for amenity_id in rule.amenity_ids:
+                self.by_amenity[amenity_id].add(position)
+            # a rule is only listed under one condition; matches() checks the rest
+            if not rule.amenity_ids:
+                for keyword in rule.keywords:
+                    self.by_keyword[keyword].add(position)
+            if not rule.amenity_ids and not rule.keywords:
+                self.unindexed.add(position)
+        # every keyword is looked for, including those of rules indexed by amenity
+        keywords = sorted(
+            {keyword for rule in self.rules for keyword in rule.keywords}, key=len, reverse=True
+        )
+        self.keyword_pattern = (
+            re.compile(r"\b(?:" + "|".join(map(re.escape, keywords)) + r")\b")
+            if keywords
+            else None
+        )
+
+    def find_keywords(self, *texts) -> set:
+        if self.keyword_pattern is None:
+            return set()
+        return {
+            keyword
+            for text in texts
+            if text
+            for keyword in self.keyword_pattern.findall(text.casefold())
+        }
+
+    def route(self, amenity_ids, texts, floor_id=None, time=None) -> dict:
+        '''
+        Returns the department and priority of the first matching rule that
+        sets them and the hashtags of every matching rule.
+        '''
+        time = time or timezone.localtime().time()
+        amenity_ids = set(amenity_ids)
+        keywords = self.find_keywords(*texts)
+        candidates = set(self.unindexed)
+        for amenity_id in amenity_ids:
+            candidates |= self.by_amenity.get(amenity_id, set())
+        for keyword in keywords:
+            candidates |= self.by_keyword.get(keyword, set())
+        routing = {"department": None, "priority": None, "hashtags": [], "rules": []}
+        for position in sorted(candidates):
+            rule = self.rules[position]
+            if not rule.matches(amenity_ids, keywords, floor_id, time):
+                continue
+            routing["rules"].append(rule.name)
+            routing["department"] = routing["department"] or rule.department_id
+            routing["priority"] = routing["priority"] or rule.priority_id
+            routing["hashtags"].extend(
+                hashtag_id for hashtag_id in rule.hashtag_ids if hashtag_id not in routing["hashtags"]
+            )
+        return routing
+
+
+def _load(version) -> RuleIndex:
+    return RuleIndex(
+        version,
+        models.ComplaintRoutingRule.objects.filter(is_active=True).prefetch_related(
+            "amenities", "floors", "hashtags"
+        ),
+    )
+
+
+def rule_index() -> RuleIndex:
+    '''
+    Returns the compiled rules held in this process, recompiled with a few
+    queries once the rules' version in the shared cache has moved on.
+    While the current transaction has changed the rules they are compiled
+    for that caller only, so uncommitted rules are never shared.
+    '''
+    global _index
+    if reference.written_in_transaction(models.ComplaintRoutingRule):
+        return _load(None)
+    version = next(iter(versions.get_versions(models.ComplaintRoutingRule).values()))
+    cached = _index
+    if cached is not None and cached.version == version:
+        return cached
+    with _lock:
+        if _index is None or _index.version != version:
+            _index = _load(version)
+        return _index
+
+
+def route_complaint(complaint: models.Complaint, time=None):
+    '''
+    Assigns a new complaint to the department the routing rules pick and
+    sets its priority and hashtags. When no rule sets a priority the
+    complaint keeps its own, or gets the default one, so the assignment
+    always starts an SLA clock. Complaints no rule sends to a department
+    are left for a supervisor to assign.
+    Returns:
+        AssignComplaint: the assignment created, or None.
+    '''
+    amenity_ids = [amenity.id for amenity in complaint.complaint_items.all()]
+    routing = rule_index().route(
+        amenity_ids,
+        [complaint.title, complaint.message],
+        floor_id=getattr(complaint.room_number, "floor_id", None),
+        time=time,
+    )
+    if routing["department"] is None:
+        return None
+    priority_id = (
+        routing["priority"] or complaint.priority_id or defaults.get_priority_default().id
+    )
+    with transaction.atomic():
+        complaint.department_id = routing["department"]
+        complaint.priority_id = priority_id
+        complaint.status = defaults.get_complaint_status("assigned")
+        complaint.save()
+        complaint.hashtags.set(routing["hashtags"])
+        assignment = models.AssignComplaint.objects.create(
+            complaint=complaint,
+            guest=complaint.guest,
+            room_number=getattr(complaint.room_number, "room_number", ""),
+            title=complaint.title,
+            message=complaint.message,
+            assigned_to_department_id=routing["department"],
+            priority_id=priority_id,
+            complaint_status=complaint.status,
+        )
+        assignment.complaint_items.set(amenity_ids)
+        assignment.hashtags.set(routing["hashtags"])
+        models.OutboxEvent.objects.publish(
+            "complaint.assigned",
+            assignment,
+            {
+                "complaint": complaint.id,
+                "assigned_to": None,
+                "assigned_to_department": routing["department"],
+                "priority": getattr(assignment.priority, "name", None),
+                "assigned_by": None,
+                "rules": routing["rules"],
+            },
+        )
+    return assignment
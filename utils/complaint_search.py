@@ -0,0 +1,160 @@
+import re
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connection
+from django.db.models import F, Q
+from django.db.models.expressions import RawSQL
+from api import models
+
+SEARCH_CONFIG = "english"
+FTS_TABLE = "complaint_fts"
+INDEX_BATCH_SIZE = 500
+# "4xx" searches every room number starting with 4
+ROOM_PATTERN = re.compile(r"^(\d+)x+$")
+
+
+def _documents(complaint_ids) -> dict:
+    documents = {
+        complaint.id: {
+            "title": complaint.title or "",
+            "body": [
+                complaint.message,
+                f"Room {complaint.room_number.room_number}" if complaint.room_number else "",
+            ],
+        }
+        for complaint in models.Complaint.objects.filter(id__in=complaint_ids).select_related(
+            "room_number"
+        )
+    }
+    for complaint_id, message in models.AssignComplaint.objects.filter(
+        complaint_id__in=documents
+    ).values_list("complaint_id", "message"):
+        documents[complaint_id]["body"].append(message)
+    for complaint_id, note in models.ProcessComplaint.objects.filter(
+        complaint_id__in=documents
+    ).values_list("complaint_id", "note"):
+        documents[complaint_id]["body"].append(note)
+    return {
+        complaint_id: (document["title"], "\n".join(filter(None, document["body"])))
+        for complaint_id, document in documents.items()
+    }
+
+
+def index_complaints(complaint_ids):
+    '''
+    Rebuilds the search documents of the given complaints only, with a fixed
+    number of statements however many are passed.
+    '''
+    complaint_ids = set(complaint_ids)
+    documents = _documents(complaint_ids)
+    models.ComplaintSearchDocument.objects.bulk_create(
+        [
+            models.ComplaintSearchDocument(complaint_id=complaint_id, title=title, body=body)
+            for complaint_id, (title, body) in documents.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["complaint"],
+        update_fields=["title", "body", "date_modified"],
+    )
+    if connection.vendor == "postgresql":
+        models.ComplaintSearchDocument.objects.filter(complaint_id__in=documents).update(
+            search_vector=SearchVector("title", weight="A", config=SEARCH_CONFIG)
+            + SearchVector("body", weight="B", config=SEARCH_CONFIG)
+        )
+    elif connection.vendor == "sqlite":
+        _sync_fts(complaint_ids, documents)
+
+
+def _sync_fts(complaint_ids, documents):
+    # uuids are stored as 32 hex digits on SQLite
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"DELETE FROM {FTS_TABLE} WHERE complaint_id = %s",
+            [(complaint_id.hex,) for complaint_id in complaint_ids],
+        )
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (complaint_id, title, body) VALUES (%s, %s, %s)",
+            [
+                (complaint_id.hex, title, body)
+                for complaint_id, (title, body) in documents.items()
+            ],
+        )
+
+
+def remove_complaints(complaint_ids):
+    if connection.vendor == "sqlite":
+        _sync_fts(set(complaint_ids), {})
+
+
+def reindex_all(batch_size: int = INDEX_BATCH_SIZE) -> int:
+    '''
+    Indexes every complaint, e.g. after the index is first created.
+    '''
+    indexed = 0
+    complaint_ids = models.Complaint.objects.order_by("id").values_list("id", flat=True)
+    last_id = None
+    while True:
+        batch = complaint_ids.filter(id__gt=last_id) if last_id else complaint_ids
+        batch = list(batch[:batch_size])
+        if not batch:
+            return indexed
+        index_complaints(batch)
+        indexed += len(batch)
+        last_id = batch[-1]
+
+
+def search_terms(query: str) -> list:
+    '''
+    Splits a query into (term, is_prefix) pairs; anything but letters and
+    digits is dropped so user input can never break the query syntax.
+    '''
+    terms = []
+    for word in re.findall(r"\w+", query.casefold()):
+        room = ROOM_PATTERN.match(word)
+        terms.append((room.group(1), True) if room else (word, False))
+    return terms
+
+
+def search(complaints, query: str):
+    '''
+    Narrows a complaint queryset to those matching every term of the query,
+    best matches first. Title matches rank above matches in the message,
+    assignment messages and processing notes.
+    '''
+    terms = search_terms(query)
+    if not terms:
+        return complaints.none()
+    if connection.vendor == "postgresql":
+        tsquery = SearchQuery(
+            " & ".join(f"{term}:*" if prefix else term for term, prefix in terms),
+            search_type="raw",
+            config=SEARCH_CONFIG,
+        )
+        return (
+            complaints.filter(search_document__search_vector=tsquery)
+            .annotate(rank=SearchRank(F("search_document__search_vector"), tsquery))
+            .order_by("-rank", "-date_created")
+        )
+    if connection.vendor == "sqlite":
+        match = " ".join(f'"{term}"*' if prefix else f'"{term}"' for term, prefix in terms)
+        # bm25 is lower for better matches; titles weigh ten times the body
+        return (
+            complaints.filter(
+                id__in=RawSQL(
+                    f"SELECT complaint_id FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", (match,)
+                )
+            )
+            .annotate(
+                rank=RawSQL(
+                    f"SELECT bm25({FTS_TABLE}, 0, 10.0, 1.0) FROM {FTS_TABLE} "
+                    f"WHERE {FTS_TABLE} MATCH %s AND {FTS_TABLE}.complaint_id = complaint.id",
+                    (match,),
+                )
+            )
+            .order_by("rank", "-date_created")
+        )
+    # other databases scan the stored documents
+    for term, _ in terms:
+        complaints = complaints.filter(
+            Q(search_document__title__icontains=term) | Q(search_document__body__icontains=term)
+        )
+    return complaints.order_by("-date_created")
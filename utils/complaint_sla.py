@@ -0,0 +1,151 @@
+from django.db import transaction
+from django.db.models import Case, F, OuterRef, Subquery, UUIDField, DateTimeField, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from api import models
+from utils import complaint_search, defaults, versions
+
+# a complaint processed into one of these states stops its SLA clock
+CLOSED_COMPLAINT_STATUSES = ["resolved", "closed"]
+ESCALATION_BATCH_SIZE = 1000
+
+
+def is_closed(complaint_status) -> bool:
+    return complaint_status is not None and (
+        complaint_status.name.casefold() in CLOSED_COMPLAINT_STATUSES
+    )
+
+
+def stop_clock(assignments):
+    '''
+    Clears the due time of assignments whose complaint has been closed.
+    '''
+    assignments.filter(due_at__isnull=False).update(due_at=None)
+    versions.bump(models.AssignComplaint)
+
+
+def escalate_overdue(now=None, batch_size: int = ESCALATION_BATCH_SIZE) -> int:
+    '''
+    Escalates one batch of open assignments past their due time with a fixed
+    number of statements: each is raised to its priority's escalation
+    priority, handed to the head of its department and given a new due time
+    from the new priority's SLA, and a ProcessComplaint entry records it.
+    Assignments whose priority escalates no further lose their due time.
+    The heads are notified through the outbox.
+    Returns:
+        int: the number of assignments escalated.
+    '''
+    now = now or timezone.now()
+    with transaction.atomic():
+        # skip_locked lets an overlapping run take the next batch instead of waiting
+        overdue = list(
+            models.AssignComplaint.objects.filter(due_at__lte=now)
+            .select_for_update(skip_locked=True)
+            .order_by("due_at")
+            .values("id", "complaint_id", "priority_id", "due_at")[:batch_size]
+        )
+        if not overdue:
+            return 0
+        ids = [row["id"] for row in overdue]
+        priorities = {
+            priority.id: priority
+            for priority in models.Priority.objects.filter(
+                id__in={row["priority_id"] for row in overdue if row["priority_id"]}
+            ).select_related("escalate_to")
+        }
+        # an assignment already at the top of its chain is handed to the head
+        # once more and its clock stopped, instead of escalating every run
+        raised = {
+            priority_id: priority.escalate_to
+            for priority_id, priority in priorities.items()
+            if priority.escalate_to
+        }
+        escalated_status = defaults.get_complaint_status("escalated")
+
+        models.AssignComplaint.objects.filter(id__in=ids).update(
+            priority_id=Case(
+                *[
+                    When(priority_id=priority_id, then=Value(new.id, output_field=UUIDField()))
+                    for priority_id, new in raised.items()
+                ],
+                default=F("priority_id"),
+            ),
+            due_at=Case(
+                *[
+                    When(
+                        priority_id=priority_id,
+                        then=Value(new.due_at(now), output_field=DateTimeField()),
+                    )
+                    for priority_id, new in raised.items()
+                ],
+                default=Value(None, output_field=DateTimeField()),
+            ),
+            assigned_to_id=Coalesce(
+                Subquery(
+                    models.Department.objects.filter(
+                        id=OuterRef("assigned_to_department_id")
+                    ).values("head_id")[:1]
+                ),
+                F("assigned_to_id"),
+            ),
+            complaint_status=escalated_status,
+            escalation_level=F("escalation_level") + 1,
+            updated_on=now,
+        )
+        complaint_ids = {row["complaint_id"] for row in overdue}
+        models.Complaint.objects.filter(id__in=complaint_ids).update(
+            priority_id=Subquery(
+                models.AssignComplaint.objects.filter(complaint_id=OuterRef("pk"), id__in=ids)
+                .order_by("-escalation_level")
+                .values("priority_id")[:1]
+            ),
+            status=escalated_status,
+            updated_on=now,
+        )
+        escalated = list(
+            models.AssignComplaint.objects.filter(id__in=ids).values(
+                "id",
+                "complaint_id",
+                "assigned_to_id",
+                "assigned_to_department_id",
+                "priority__name",
+                "escalation_level",
+            )
+        )
+        due_at = {row["id"]: row["due_at"] for row in overdue}
+        models.ProcessComplaint.objects.bulk_create(
+            [
+                models.ProcessComplaint(
+                    complaint_id=row["complaint_id"],
+                    assigned_complaint_id=row["id"],
+                    process_complaint_date=now,
+                    note=(
+                        f"Escalated to {row['priority__name'] or 'the department head'}: "
+                        f"unresolved since its SLA ran out at {due_at[row['id']]:%Y-%m-%d %H:%M}"
+                    ),
+                    complaint_status=escalated_status,
+                )
+                for row in escalated
+            ]
+        )
+        # bulk writes send no signals, so the search documents are rebuilt
+        # and the table versions moved on here
+        complaint_search.index_complaints(complaint_ids)
+        versions.bump(models.Complaint, models.AssignComplaint, models.ProcessComplaint)
+        models.OutboxEvent.objects.publish_many(
+            "complaint.escalated",
+            [
+                (
+                    models.AssignComplaint(id=row["id"]),
+                    {
+                        "complaint": row["complaint_id"],
+                        "assigned_to": row["assigned_to_id"],
+                        "assigned_to_department": row["assigned_to_department_id"],
+                        "priority": row["priority__name"],
+                        "escalation_level": row["escalation_level"],
+                    },
+                )
+                for row in escalated
+            ],
+        )
+    return len(escalated)
@@ -1,24 +1,47 @@
+import copy
 from django.apps import apps
+from utils import reference
+
+def get_reference_default(model_name: str, name: str):
+    # served from the reference cache; only the very first call creates the row
+    default = reference.get_by(model_name, 'name', name)
+    if default is None:
+        default, _ = apps.get_model('api', model_name).objects.get_or_create(name=name)
+    return default
 
 def get_room_status_default():
-    RoomStatus = apps.get_model('api', 'RoomStatus')
-    default_room_status, _ = RoomStatus.objects.get_or_create(name='Default Room Status')
-    return default_room_status
+    return get_reference_default('RoomStatus', 'Default Room Status')
 
 def get_sponsor_type_default():
-    SponsorType = apps.get_model('api', 'SponsorType')
-    default_sponsor_type, _ = SponsorType.objects.get_or_create(name='Default Sponsor Type')
-    return default_sponsor_type
+    return get_reference_default('SponsorType', 'Default Sponsor Type')
 
 def get_sponsor_default():
     Sponsor = apps.get_model('api', 'Sponsor')
     default_sponsor, _ = Sponsor.objects.get_or_create(name='Self')
     return default_sponsor
 
+def get_priority_default():
+    # routed complaints need an SLA clock even when no rule sets a priority
+    default = reference.get_by('Priority', 'name', 'Normal')
+    if default is None:
+        default, _ = apps.get_model('api', 'Priority').objects.get_or_create(
+            name='Normal', defaults={'sla_minutes': 240}
+        )
+    return default
+
+def get_complaint_status(name: str):
+    # the statuses complaints are moved to are seeded by migrations, so a missing
+    # one is reported instead of being created under another spelling
+    ComplaintStatus = apps.get_model('api', 'ComplaintStatus')
+    statuses = reference.table(ComplaintStatus)
+    rows = statuses.rows if statuses is not None else ComplaintStatus.objects.all()
+    status = next((row for row in rows if row.name.casefold() == name.casefold()), None)
+    if status is None:
+        raise ComplaintStatus.DoesNotExist(f"the '{name}' complaint status is missing, run the migrations")
+    return copy.copy(status)
+
 def get_payment_type_default():
-    PaymentType = apps.get_model('api', 'PaymentType')
-    default_payment_type, _ = PaymentType.objects.get_or_create(name='Self')
-    return default_payment_type
+    return get_reference_default('PaymentType', 'Self')
 
 def get_table_default(table:str):
     match table.casefold():
@@ -1,8 +1,9 @@
 from api import models
 from rest_framework import serializers
 from django.contrib.auth.models import Group
-from django.apps import apps
-from django.db import transaction
+from django.utils import timezone
+from datetime import datetime, timedelta
+from utils import bookings
 
 def is_valid_password(password: str) -> bool:
     """
@@ -14,6 +15,37 @@ def is_valid_password(password: str) -> bool:
     """
     return True
 
+def parse_date_range(params, days: int, forward: bool = False) -> tuple:
+    '''
+    Reads the start_date and end_date query parameters of a report.
+    Args:
+        params: the request's query parameters.
+        days (int): the number of days covered when a bound is missing.
+        forward (bool): count the missing end forward from the start, which
+            defaults to today, instead of the missing start back from the end.
+    Returns:
+        tuple: the first and last day as dates.
+    Raises:
+        ValidationError: If a date is not YYYY-MM-DD or the start is after the end.
+    '''
+    try:
+        if forward:
+            start_date = _parse_date(params.get("start_date")) or timezone.localdate()
+            end_date = _parse_date(params.get("end_date")) or start_date + timedelta(days=days - 1)
+        else:
+            end_date = _parse_date(params.get("end_date")) or timezone.localdate()
+            start_date = _parse_date(params.get("start_date")) or end_date - timedelta(days=days - 1)
+    except ValueError:
+        raise serializers.ValidationError({"error": "dates must be in the format YYYY-MM-DD"})
+    if start_date > end_date:
+        raise serializers.ValidationError({"error": "start date cannot be later than end date"})
+    return start_date, end_date
+
+
+def _parse_date(value):
+    return datetime.strptime(value, "%Y-%m-%d").date() if value else None
+
+
 def check_profile_department(profile, department_name: str):
     try:
         deparment = models.Department.objects.get(name__iexact=department_name)
@@ -116,31 +148,8 @@ def checkout_booking(booking, checked_out_by):
     Raises:
         ValidationError: If any error occurs during the operation.
     '''
-    try:
-        with transaction.atomic():
-            booking.checked_out = True
-            room = booking.room
-            room.room_booking_status = "empty"
-            room.room_maintenance_status = "used"
-            room.save()
-            booking.checked_out = True
-            booking.save()
-            Checkout = apps.get_model('api', 'Checkout')
-            Checkout.objects.create(
-                booking=booking,
-                room_number=room.room_number,
-                client=booking.client,
-                first_name=booking.first_name,
-                last_name=booking.last_name,
-                gender=booking.gender,
-                date_checked_in=booking.check_in,
-                date_checked_out=booking.check_out,
-                checked_out_by=checked_out_by,
-                checked_in_by=booking.created_by,
-            )
-        return "success"
-    except Exception as e:
-        raise serializers.ValidationError({'error': f'an unexpected error occured: {str(e)}'})
+    bookings.checkout_bookings([booking.id], checked_out_by)
+    return "success"
     
 def get_room_type_current_price(room_type: models.RoomType) -> float:
     """
@@ -0,0 +1,71 @@
+from django.db import transaction
+from django.utils import timezone
+from api import models
+from utils import defaults
+
+DEPARTURE_CLEAN_TITLE = "Departure clean"
+
+
+def create_departure_cleaning_tasks(room_ids: list, created_by=None) -> list:
+    '''
+    Creates one unassigned departure-clean RoomKeepingAssign per room, with its
+    "Pending" status entry, in two bulk inserts. Rooms that already have a
+    departure clean for today are skipped so the task is safe to retry.
+    Args:
+        room_ids (list): ids of the rooms released by a checkout.
+        created_by: the profile the tasks are created for, None for the system.
+    Returns:
+        list: the RoomKeepingAssign records created.
+    '''
+    today = timezone.localdate()
+    pending = defaults.get_reference_default("HouseKeepingState", "Pending")
+    with transaction.atomic():
+        already_queued = set(
+            models.RoomKeepingAssign.objects.filter(
+                room_id__in=room_ids,
+                assignment_date=today,
+                title=DEPARTURE_CLEAN_TITLE,
+            ).values_list("room_id", flat=True)
+        )
+        rooms = models.Room.objects.filter(id__in=room_ids).exclude(id__in=already_queued)
+        assignments = models.RoomKeepingAssign.objects.bulk_create(
+            [
+                models.RoomKeepingAssign(
+                    room=room,
+                    assignment_date=today,
+                    title=DEPARTURE_CLEAN_TITLE,
+                    description=f"Clean room {room.room_number} after guest departure",
+                    current_status=pending.name,
+                    created_by=created_by,
+                )
+                for room in rooms
+            ]
+        )
+        models.ProcessRoomKeeping2.objects.bulk_create(
+            [
+                models.ProcessRoomKeeping2(
+                    room_keeping_assign=assignment,
+                    room_number=assignment.room.room_number,
+                    status=pending,
+                    created_by=created_by,
+                )
+                for assignment in assignments
+            ]
+        )
+        models.OutboxEvent.objects.publish_many(
+            "room_keeping.status_changed",
+            [
+                (
+                    assignment,
+                    {
+                        "room": assignment.room_id,
+                        "room_number": assignment.room.room_number,
+                        "previous_status": None,
+                        "status": pending.name,
+                        "changed_by": getattr(created_by, "id", None),
+                    },
+                )
+                for assignment in assignments
+            ],
+        )
+    return assignments
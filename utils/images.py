@@ -0,0 +1,68 @@
+import hashlib
+import os
+from io import BytesIO
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+# name: (bounding box, Pillow format, file extension, quality)
+IMAGE_VARIANTS = {
+    "thumbnail": ((240, 240), "JPEG", "jpg", 80),
+    "medium": ((960, 960), "JPEG", "jpg", 82),
+    "webp": ((1600, 1600), "WEBP", "webp", 80),
+}
+
+# model name: (image field, field holding its variants)
+VARIANT_FIELDS = {
+    "roomimage": ("image", "image_variants"),
+    "profile": ("photo", "photo_variants"),
+}
+
+
+def render_variant(original: Image.Image, size: tuple, image_format: str, quality: int) -> bytes:
+    variant = original.copy()
+    variant.thumbnail(size, Image.Resampling.LANCZOS)
+    buffer = BytesIO()
+    variant.save(buffer, format=image_format, quality=quality, optimize=True)
+    return buffer.getvalue()
+
+
+def generate_variants(field_file) -> dict:
+    '''
+    Writes a resized, recompressed copy of an uploaded image for every entry
+    of IMAGE_VARIANTS next to the original. Files are named after a hash of
+    their content, so regenerating an unchanged image reuses the stored files.
+    Args:
+        field_file: the FieldFile of an ImageField.
+    Returns:
+        dict: the stored name of each variant, plus the original under "source".
+    '''
+    storage = field_file.storage
+    directory, filename = os.path.split(field_file.name)
+    stem = os.path.splitext(filename)[0]
+    with field_file.open("rb") as source:
+        original = ImageOps.exif_transpose(Image.open(source))
+        # JPEG and WebP variants have no use for transparency or palettes
+        original = original.convert("RGB")
+    variants = {"source": field_file.name}
+    for name, (size, image_format, extension, quality) in IMAGE_VARIANTS.items():
+        content = render_variant(original, size, image_format, quality)
+        digest = hashlib.sha256(content).hexdigest()[:16]
+        variant_name = os.path.join(directory, f"{stem}.{name}.{digest}.{extension}")
+        if not storage.exists(variant_name):
+            variant_name = storage.save(variant_name, ContentFile(content))
+        variants[name] = variant_name
+    return variants
+
+
+def variant_urls(field_file, variants: dict) -> dict:
+    '''
+    Returns the URL of each variant of the file currently stored in the field.
+    Variants generated for a previous upload are not returned.
+    '''
+    if not field_file or not variants or variants.get("source") != field_file.name:
+        return {}
+    return {
+        name: field_file.storage.url(variants[name])
+        for name in IMAGE_VARIANTS
+        if name in variants
+    }
@@ -0,0 +1,94 @@
+from datetime import date
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Count, Sum, Subquery, OuterRef
+from django.utils import timezone
+from api import models
+
+PENDING_ARRIVAL_STATUSES = ["pending", "confirmed"]
+
+
+def run_night_audit(business_date: date = None, posted_by=None) -> models.NightAudit:
+    '''
+    Closes a business day with a fixed number of set-based statements:
+    - pending/confirmed bookings whose check-in day has passed become no-shows,
+    - checked-in bookings past their check-out day are flagged as overstays,
+    - one room charge per in-house stay is posted to the folio.
+    Running the audit again for the same day is safe; charges already posted
+    are skipped by the folio's unique constraint.
+    Args:
+        business_date (date): the day being closed. Defaults to today.
+        posted_by: the profile posting the charges, None for the scheduler.
+    Returns:
+        NightAudit: the summary of what changed.
+    '''
+    business_date = business_date or timezone.localdate()
+    now = timezone.now()
+    with transaction.atomic():
+        no_shows = models.Booking.objects.filter(
+            booking_status__in=PENDING_ARRIVAL_STATUSES,
+            check_in_date__date__lte=business_date,
+        ).update(booking_status="no-show", date_modified=now)
+
+        overstays = models.Booking.objects.filter(
+            booking_status="checked-in",
+            check_out_date__date__lte=business_date,
+            is_overstay=False,
+        ).update(is_overstay=True, date_modified=now)
+
+        in_house = (
+            models.Booking.objects.filter(
+                booking_status="checked-in",
+                check_in_date__date__lte=business_date,
+            )
+            .annotate(
+                night_rate=Subquery(
+                    models.BookingNight.objects.filter(
+                        booking=OuterRef("pk"), night=business_date
+                    ).values("rate")[:1]
+                )
+            )
+            .values_list(
+                "id", "night_rate", "booking_cost", "check_in_date", "check_out_date"
+            )
+        )
+        charges = []
+        for booking_id, night_rate, booking_cost, check_in_date, check_out_date in in_house:
+            if night_rate is None:
+                # overstayed nights and older bookings are charged the average rate
+                nights = max(
+                    (
+                        timezone.localtime(check_out_date).date()
+                        - timezone.localtime(check_in_date).date()
+                    ).days,
+                    1,
+                )
+                night_rate = Decimal(booking_cost or 0) / nights
+            charges.append(
+                models.FolioCharge(
+                    booking_id=booking_id,
+                    charge_date=business_date,
+                    charge_type="room",
+                    description=f"Room charge for {business_date}",
+                    amount=Decimal(night_rate).quantize(Decimal("0.01")),
+                    posted_by=posted_by,
+                )
+            )
+        models.FolioCharge.objects.bulk_create(
+            charges, batch_size=1000, ignore_conflicts=True
+        )
+        # ignore_conflicts leaves primary keys unset, so read the totals back
+        posted = models.FolioCharge.objects.filter(
+            charge_date=business_date, charge_type="room"
+        ).aggregate(count=Count("id"), total=Sum("amount"))
+        audit, _ = models.NightAudit.objects.select_for_update().get_or_create(
+            business_date=business_date, defaults={"started_at": now}
+        )
+        # a re-run adds whatever it changed to the first run's counts
+        audit.no_shows += no_shows
+        audit.overstays += overstays
+        audit.room_charges_posted = posted["count"]
+        audit.room_revenue_posted = posted["total"] or Decimal("0.00")
+        audit.finished_at = timezone.now()
+        audit.save()
+    return audit
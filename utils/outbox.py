@@ -0,0 +1,143 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
+from api import models
+from utils import housekeeping, pricing, notifications, complaint_routing
+
+logger = logging.getLogger(__name__)
+
+RELAY_BATCH_SIZE = 200
+# events failing this many times are left in the table for an admin to inspect
+MAX_DELIVERY_ATTEMPTS = 10
+
+HANDLERS = {}
+
+
+def handles(*event_types):
+    '''
+    Registers a handler for one or more event types. A handler receives every
+    pending event of its type in the batch as a list. Delivery is at least
+    once, so handlers must tolerate seeing an event again.
+    '''
+    def register(handler):
+        for event_type in event_types:
+            HANDLERS[event_type] = handler
+        return handler
+
+    return register
+
+
+def retry_delay(attempts: int) -> timedelta:
+    return timedelta(seconds=min(30 * 2 ** attempts, 3600))
+
+
+def relay(batch_size: int = RELAY_BATCH_SIZE) -> dict:
+    '''
+    Delivers one batch of pending events to their handlers, oldest first.
+    Events of a type whose handler raises are retried later with a backoff,
+    the rest of the batch is marked processed.
+    Returns:
+        dict: the number of events processed and failed.
+    '''
+    summary = {"processed": 0, "failed": 0}
+    with transaction.atomic():
+        # skip_locked lets several relay workers drain the table side by side
+        events = list(
+            models.OutboxEvent.objects.pending(MAX_DELIVERY_ATTEMPTS)
+            .select_for_update(skip_locked=True)
+            .order_by("date_created")[:batch_size]
+        )
+        by_type = defaultdict(list)
+        for event in events:
+            by_type[event.event_type].append(event)
+        now = timezone.now()
+        for event_type, batch in by_type.items():
+            handler = HANDLERS.get(event_type, log_events)
+            try:
+                # a savepoint so a failing handler leaves no partial writes behind
+                with transaction.atomic():
+                    handler(batch)
+            except Exception as error:
+                logger.exception(f"outbox handler for {event_type} failed")
+                for event in batch:
+                    event.attempts += 1
+                    event.last_error = f"{type(error).__name__}: {error}"
+                    event.available_at = now + retry_delay(event.attempts)
+                summary["failed"] += len(batch)
+            else:
+                for event in batch:
+                    event.attempts += 1
+                    event.processed_at = now
+                summary["processed"] += len(batch)
+        models.OutboxEvent.objects.bulk_update(
+            events, ["attempts", "last_error", "available_at", "processed_at"]
+        )
+    return summary
+
+
+def log_events(events: list):
+    for event in events:
+        logger.info(f"outbox event {event.event_type} for {event.aggregate_type} {event.aggregate_id}")
+
+
+@handles("booking.checked_out")
+def queue_departure_cleans(events: list):
+    room_ids_by_profile = defaultdict(list)
+    for event in events:
+        if event.payload.get("room"):
+            room_ids_by_profile[event.payload.get("checked_out_by")].append(
+                event.payload["room"]
+            )
+    profiles = {
+        str(profile.id): profile
+        for profile in models.Profile.objects.filter(
+            id__in=[profile_id for profile_id in room_ids_by_profile if profile_id]
+        )
+    }
+    for profile_id, room_ids in room_ids_by_profile.items():
+        housekeeping.create_departure_cleaning_tasks(room_ids, profiles.get(profile_id))
+
+
+@handles("room_rate.changed", "room_type.changed")
+def reprice_rooms(events: list):
+    pricing.reprice_rooms({event.payload["room_type"] for event in events})
+
+
+@handles("image.uploaded")
+def queue_image_variants(events: list):
+    # resizing is slow, so each image gets its own task instead of holding the batch
+    from api import tasks
+
+    for event in events:
+        tasks.generate_image_variants.delay(event.payload["model"], event.aggregate_id)
+
+
+@handles("complaint.submitted")
+def route_guest_complaints(events: list):
+    complaints = models.Complaint.objects.filter(
+        id__in=[event.aggregate_id for event in events], department__isnull=True
+    ).select_related("room_number").prefetch_related("complaint_items")
+    for complaint in complaints:
+        complaint_routing.route_complaint(complaint)
+
+
+@handles("complaint.escalated")
+def notify_escalations(events: list):
+    complaints_by_profile = defaultdict(list)
+    for event in events:
+        if event.payload.get("assigned_to"):
+            complaints_by_profile[event.payload["assigned_to"]].append(event.payload)
+    for profile in models.Profile.objects.filter(
+        id__in=list(complaints_by_profile), email__isnull=False
+    ).exclude(email=""):
+        escalations = complaints_by_profile[str(profile.id)]
+        notifications.send_email(
+            subject=f"{len(escalations)} complaint(s) escalated to you",
+            body="\n".join(
+                f"Complaint {escalation['complaint']} is overdue and now {escalation['priority'] or 'unprioritised'}"
+                for escalation in escalations
+            ),
+            to_email=[profile.email],
+        )
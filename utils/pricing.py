@@ -0,0 +1,60 @@
+from datetime import date
+from django.db import transaction
+from django.utils import timezone
+from api import models
+from utils import versions
+
+# when rates overlap, the one with the latest start date applies, and of rates
+# starting on the same day the one created last
+RATE_PRECEDENCE = ("-start_date", "-date_created")
+
+
+def effective_prices(room_types=None, on_date: date = None) -> dict:
+    '''
+    Works out the price of each room type on a day: the RoomRate valid that
+    day that takes precedence, or the base price when no rate applies.
+    The rates are read in one query for all room types.
+    Args:
+        room_types: RoomType records or ids to price, defaults to every room type.
+        on_date (date): the day to price, defaults to today.
+    Returns:
+        dict: {room_type_id: price}
+    '''
+    on_date = on_date or timezone.localdate()
+    types = models.RoomType.objects.all()
+    if room_types is not None:
+        types = types.filter(id__in=[getattr(room_type, "id", room_type) for room_type in room_types])
+    prices = dict(types.values_list("id", "base_price"))
+    rates = (
+        models.RoomRate.objects.filter(
+            room_type_id__in=prices, start_date__lte=on_date, end_date__gte=on_date
+        )
+        .order_by("room_type_id", *RATE_PRECEDENCE)
+        .values_list("room_type_id", "price")
+    )
+    rated = set()
+    for room_type_id, price in rates:
+        if room_type_id not in rated:
+            prices[room_type_id] = price
+            rated.add(room_type_id)
+    return prices
+
+
+def reprice_rooms(room_types=None, on_date: date = None) -> int:
+    '''
+    Sets Room.current_price to the effective price of its room type, with one
+    UPDATE per room type that only touches rooms whose price is stale.
+    Returns:
+        int: the number of rooms repriced.
+    '''
+    repriced = 0
+    with transaction.atomic():
+        for room_type_id, price in effective_prices(room_types, on_date).items():
+            repriced += (
+                models.Room.objects.filter(room_type_id=room_type_id)
+                .exclude(current_price=price)
+                .update(current_price=price)
+            )
+        if repriced:
+            versions.bump(models.Room)
+    return repriced
@@ -0,0 +1,136 @@
+import copy
+import threading
+import weakref
+from django.apps import apps
+from django.db import transaction
+from utils import versions
+
+# small lookup tables that are read on nearly every write and rarely change
+REFERENCE_MODELS = [
+    "Gender",
+    "Country",
+    "NameTitle",
+    "IdentificationType",
+    "Priority",
+    "ShiftStatus",
+    "HouseKeepingState",
+    "ComplaintStatus",
+    "PaymentType",
+    "RoomType",
+    "RoomCategory",
+    "BedType",
+    "RoomStatus",
+    "SponsorType",
+]
+
+_tables = {}
+_lock = threading.Lock()
+
+
+class ReferenceTable:
+    def __init__(self, version, rows):
+        self.version = version
+        self.rows = rows
+        self.by_id = {row.pk: row for row in rows}
+        self._by_field = {}
+
+    def index(self, field: str) -> dict:
+        if field not in self._by_field:
+            self._by_field[field] = {getattr(row, field): row for row in self.rows}
+        return self._by_field[field]
+
+
+def _model(model):
+    return apps.get_model("api", model) if isinstance(model, str) else model
+
+
+def is_reference_model(model) -> bool:
+    return _model(model).__name__ in REFERENCE_MODELS
+
+
+class _Written:
+    '''
+    The models written in a connection's current transaction. Registered with
+    on_commit, it forgets them once the transaction commits; when the
+    transaction, or the savepoint it was registered in, rolls back Django
+    discards it and they are forgotten with it.
+    '''
+
+    def __init__(self):
+        self.models = set()
+
+    def __call__(self):
+        self.models.clear()
+
+
+# {connection alias: weak reference to the _Written of its transaction}, per thread
+_written = threading.local()
+
+
+def _pending_writes(alias):
+    ref = getattr(_written, alias, None)
+    return ref() if ref is not None else None
+
+
+def written_in_transaction(model) -> bool:
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        return False
+    written = _pending_writes(connection.alias)
+    return written is not None and _model(model) in written.models
+
+
+def mark_written(model):
+    '''
+    Called when a reference row, or a row of another table compiled per
+    process, is saved or deleted. Until the transaction ends this process
+    reads the table from the database, so rows that may still be rolled back
+    never make it into the cache.
+    '''
+    model = _model(model)
+    _tables.pop(model, None)
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        return
+    written = _pending_writes(connection.alias)
+    if written is None:
+        written = _Written()
+        transaction.on_commit(written, using=connection.alias)
+        setattr(_written, connection.alias, weakref.ref(written))
+    written.models.add(model)
+
+
+def table(model) -> ReferenceTable:
+    '''
+    Returns the rows of a reference table held in this process. The rows are
+    reloaded with one query when the table's version in the shared cache has
+    moved on, i.e. after a save or delete anywhere. The instances are shared
+    between requests and must be treated as read-only; get and get_by hand
+    out copies.
+    Returns None while the current transaction has written to the table;
+    callers then read the database as usual.
+    '''
+    model = _model(model)
+    if written_in_transaction(model):
+        return None
+    version = next(iter(versions.get_versions(model).values()))
+    cached = _tables.get(model)
+    if cached is not None and cached.version == version:
+        return cached
+    with _lock:
+        cached = _tables.get(model)
+        if cached is None or cached.version != version:
+            cached = _tables[model] = ReferenceTable(version, list(model.objects.all()))
+    return cached
+
+
+def get(model, pk):
+    rows = table(model)
+    row = rows.by_id.get(pk) if rows else None
+    return copy.copy(row) if row else None
+
+
+def get_by(model, field: str, value):
+    rows = table(model)
+    row = rows.index(field).get(value) if rows else None
+    return copy.copy(row) if row else None
@@ -0,0 +1,515 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q, Min, Max, Sum, Count, Avg, F, OuterRef, Subquery, DurationField, ExpressionWrapper, Case, When
+from django.db.models.functions import Coalesce, Greatest, Least, TruncDate
+from django.utils import timezone
+from api import models
+from utils import versions, complaint_sla
+
+DAILY_OCCUPANCY_WATERMARK = "daily_occupancy"
+DAILY_LABOR_WATERMARK = "daily_labor"
+# how far before the watermark a refresh looks again for late-committed rows
+REPORT_WATERMARK_OVERLAP = timedelta(minutes=15)
+
+# bookings in these states hold a room for the nights between check-in and check-out
+SOLD_BOOKING_STATUSES = ["confirmed", "checked-in", "checked-out"]
+
+
+def _local_date(value) -> date:
+    return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+
+
+def invalidate(name: str, start_date: date, end_date: date):
+    '''
+    Makes the next refresh of a rollup rebuild [start_date, end_date], for
+    days left without any changed source row, e.g. the old nights of a
+    moved or deleted booking.
+    '''
+    models.ReportInvalidation.objects.create(name=name, start_date=start_date, end_date=end_date)
+
+
+def invalidate_stay(check_in_date, check_out_date):
+    invalidate(DAILY_OCCUPANCY_WATERMARK, _local_date(check_in_date), _local_date(check_out_date))
+
+
+def invalidate_labor_day(day):
+    invalidate(DAILY_LABOR_WATERMARK, day, day)
+
+
+def _refresh_window(name: str, changed_windows: list) -> tuple:
+    '''
+    Merges the windows of changed source rows with the pending invalidations
+    of a rollup into one window.
+    Returns:
+        tuple: the first and last day, None if nothing changed, and the ids of
+            the invalidations covered.
+    '''
+    invalidations = list(
+        models.ReportInvalidation.objects.filter(name=name).values_list(
+            "id", "start_date", "end_date"
+        )
+    )
+    windows = [window for window in changed_windows if window[0] and window[1]]
+    windows += [(start, end) for _, start, end in invalidations]
+    if not windows:
+        return None, None, []
+    return (
+        min(start for start, _ in windows),
+        max(end for _, end in windows),
+        [invalidation_id for invalidation_id, _, _ in invalidations],
+    )
+
+
+def rebuild_daily_occupancy(start_date: date, end_date: date) -> int:
+    '''
+    Recomputes the DailyOccupancy rows for every day in [start_date, end_date]
+    with grouped queries: rooms sold, revenue and guests from the booked
+    nights at the rate each was sold for, and arrivals, departures and
+    no-shows from the bookings. Nights after an early checkout are released.
+    Args:
+        start_date (date): first day to rebuild.
+        end_date (date): last day to rebuild.
+    Returns:
+        int: the number of fact rows written.
+    '''
+    facts = defaultdict(lambda: defaultdict(int))
+    nights = (
+        models.BookingNight.objects.filter(
+            night__range=(start_date, end_date),
+            booking__booking_status__in=SOLD_BOOKING_STATUSES,
+        )
+        .filter(
+            Q(booking__checkout__date_checked_out__isnull=True)
+            | Q(night__lt=TruncDate("booking__checkout__date_checked_out"))
+        )
+        .values_list("night", "room_type_id", "booking__booking_source", "booking__sponsor_type_id")
+        .annotate(
+            rooms_sold=Count("id"),
+            revenue=Sum("rate"),
+            guests=Sum(
+                Coalesce("booking__number_of_guests", 0)
+                + Coalesce("booking__number_of_children_guests", 0)
+            ),
+        )
+        .order_by()
+    )
+    for day, room_type_id, booking_source, sponsor_type_id, rooms_sold, revenue, guests in nights:
+        row = facts[(day, room_type_id, booking_source, sponsor_type_id)]
+        row.update(rooms_sold=rooms_sold, revenue=revenue or 0, guests=guests or 0)
+
+    dimensions = ("room_type_id", "booking_source", "sponsor_type_id")
+    arrival = TruncDate("check_in_date")
+    # an early checkout moves the departure forward, never before the arrival
+    departure = Case(
+        When(checkout__date_checked_out__isnull=True, then=TruncDate("check_out_date")),
+        default=Least(
+            TruncDate("check_out_date"),
+            Greatest(TruncDate("checkout__date_checked_out"), arrival),
+        ),
+    )
+    counts = (
+        ("arrivals", arrival, Q(booking_status__in=SOLD_BOOKING_STATUSES)),
+        ("departures", departure, Q(booking_status__in=SOLD_BOOKING_STATUSES)),
+        ("no_shows", arrival, Q(booking_status="no-show")),
+    )
+    for fact, day, condition in counts:
+        grouped = (
+            models.Booking.objects.filter(condition)
+            .annotate(day=day)
+            .filter(day__range=(start_date, end_date))
+            .values_list("day", *dimensions)
+            .annotate(total=Count("id"))
+            .order_by()
+        )
+        for day_value, room_type_id, booking_source, sponsor_type_id, total in grouped:
+            facts[(day_value, room_type_id, booking_source, sponsor_type_id)][fact] += total
+
+    rows = [
+        models.DailyOccupancy(
+            date=day,
+            room_type_id=room_type_id,
+            booking_source=booking_source,
+            sponsor_type_id=sponsor_type_id,
+            rooms_sold=values["rooms_sold"],
+            revenue=Decimal(values["revenue"]).quantize(Decimal("0.01")),
+            guests=values["guests"],
+            arrivals=values["arrivals"],
+            departures=values["departures"],
+            no_shows=values["no_shows"],
+        )
+        for (day, room_type_id, booking_source, sponsor_type_id), values in facts.items()
+    ]
+    with transaction.atomic():
+        models.DailyOccupancy.objects.filter(date__range=(start_date, end_date)).delete()
+        models.DailyOccupancy.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def refresh_daily_occupancy() -> dict:
+    '''
+    Rebuilds only the days touched by bookings or checkouts changed since the
+    last run and the days invalidated since, then advances the watermark.
+    Returns:
+        dict: the rebuilt window and the number of fact rows written.
+    '''
+    watermark, _ = models.ReportWatermark.objects.get_or_create(
+        name=DAILY_OCCUPANCY_WATERMARK
+    )
+    high_water_mark = timezone.now()
+    changed_bookings = models.Booking.objects.all()
+    if watermark.last_processed:
+        # rows are stamped when saved, not when committed, so the overlap
+        # picks up transactions that were still open at the last run
+        since = watermark.last_processed - REPORT_WATERMARK_OVERLAP
+        changed_bookings = changed_bookings.filter(
+            Q(date_modified__gt=since) | Q(checkout__date_created__gt=since)
+        )
+    window = changed_bookings.aggregate(
+        start=Min("check_in_date"), end=Max("check_out_date")
+    )
+    start_date, end_date, invalidations = _refresh_window(
+        DAILY_OCCUPANCY_WATERMARK,
+        [
+            (
+                window["start"] and _local_date(window["start"]),
+                window["end"] and _local_date(window["end"]),
+            )
+        ],
+    )
+    summary = {"start_date": start_date, "end_date": end_date, "rows": 0}
+    with transaction.atomic():
+        if start_date:
+            summary["rows"] = rebuild_daily_occupancy(start_date, end_date)
+        models.ReportInvalidation.objects.filter(id__in=invalidations).delete()
+        watermark.last_processed = high_water_mark
+        watermark.save()
+    return summary
+
+
+OCCUPANCY_REPORT_DIMENSIONS = {
+    "date": "date",
+    "room_type": "room_type__name",
+    "booking_source": "booking_source",
+    "sponsor_type": "sponsor_type__name",
+}
+
+
+def occupancy_report(start_date: date, end_date: date, group_by: list) -> list:
+    '''
+    Reads occupancy, ADR and RevPAR from the DailyOccupancy facts.
+    Args:
+        start_date (date): first day of the report.
+        end_date (date): last day of the report.
+        group_by (list): keys of OCCUPANCY_REPORT_DIMENSIONS to group the rows by.
+    Returns:
+        list: one dict per group with the summed facts and derived ratios.
+    '''
+    fields = [OCCUPANCY_REPORT_DIMENSIONS[key] for key in group_by]
+    rows = (
+        models.DailyOccupancy.objects.filter(date__range=(start_date, end_date))
+        .values(*fields)
+        .annotate(
+            rooms_sold=Sum("rooms_sold"),
+            revenue=Sum("revenue"),
+            guests=Sum("guests"),
+            arrivals=Sum("arrivals"),
+            departures=Sum("departures"),
+            no_shows=Sum("no_shows"),
+        )
+        .order_by(*fields)
+    )
+    # room inventory is tiny next to the facts, so it is counted separately
+    rooms_per_type = dict(
+        models.Room.objects.values_list("room_type__name").annotate(total=Count("id"))
+    )
+    total_rooms = sum(rooms_per_type.values())
+    days_in_range = (end_date - start_date).days + 1
+    report = []
+    for row in rows:
+        rooms = (
+            rooms_per_type.get(row["room_type__name"], 0)
+            if "room_type" in group_by
+            else total_rooms
+        )
+        room_nights = rooms * (1 if "date" in group_by else days_in_range)
+        revenue = row["revenue"] or Decimal("0.00")
+        rooms_sold = row["rooms_sold"] or 0
+        entry = {key: row[field] for key, field in zip(group_by, fields)}
+        entry.update(
+            rooms_sold=rooms_sold,
+            revenue=revenue,
+            guests=row["guests"],
+            arrivals=row["arrivals"],
+            departures=row["departures"],
+            no_shows=row["no_shows"],
+            occupancy=round(rooms_sold / room_nights, 4) if room_nights else None,
+            adr=(revenue / rooms_sold).quantize(Decimal("0.01")) if rooms_sold else None,
+            revpar=(revenue / room_nights).quantize(Decimal("0.01")) if room_nights else None,
+        )
+        report.append(entry)
+    return report
+
+
+# a write to any of these tables changes the complaint dashboard
+COMPLAINT_TABLES = [
+    models.Complaint,
+    models.Complaint.hashtags.through,
+    models.AssignComplaint,
+    models.ProcessComplaint,
+]
+COMPLAINT_DASHBOARD_TIMEOUT = 60
+COMPLAINT_DASHBOARD_DIMENSIONS = {
+    "by_status": "status__name",
+    "by_department": "department__name",
+    "by_priority": "priority__name",
+}
+
+
+def complaint_dashboard(start_date: date, end_date: date) -> dict:
+    '''
+    Complaint counts by status, department, priority, hashtag and day, and the
+    mean time from a complaint to its first resolving process entry, for the
+    complaints made between the two days. Every breakdown is one grouped query.
+    '''
+    complaints = models.Complaint.objects.filter(
+        date_created__date__range=(start_date, end_date)
+    )
+    dashboard = {"total": complaints.count()}
+    for key, field in COMPLAINT_DASHBOARD_DIMENSIONS.items():
+        dashboard[key] = {
+            name: count
+            for name, count in complaints.order_by()
+            .values_list(field)
+            .annotate(count=Count("id"))
+        }
+    dashboard["by_hashtag"] = dict(
+        models.Complaint.hashtags.through.objects.filter(complaint__in=complaints)
+        .order_by()
+        .values_list("hashtag__name")
+        .annotate(count=Count("id"))
+    )
+    dashboard["by_day"] = [
+        {"date": day, "count": count}
+        for day, count in complaints.annotate(day=TruncDate("date_created"))
+        .order_by("day")
+        .values_list("day")
+        .annotate(count=Count("id"))
+    ]
+    resolutions = (
+        complaints.annotate(
+            resolved_at=Subquery(
+                models.ProcessComplaint.objects.filter(
+                    complaint=OuterRef("pk"),
+                    complaint_status__name__iregex=r"^(%s)$" % "|".join(complaint_sla.CLOSED_COMPLAINT_STATUSES),
+                )
+                .order_by("process_complaint_date")
+                .values("process_complaint_date")[:1]
+            )
+        )
+        .filter(resolved_at__isnull=False)
+        .aggregate(
+            resolved=Count("id"),
+            mean_time=Avg(
+                ExpressionWrapper(F("resolved_at") - F("date_created"), output_field=DurationField())
+            ),
+        )
+    )
+    dashboard["resolved"] = resolutions["resolved"]
+    mean_time = resolutions["mean_time"]
+    dashboard["mean_hours_to_resolution"] = (
+        round(mean_time.total_seconds() / 3600, 2) if mean_time is not None else None
+    )
+    return dashboard
+
+
+def cached_complaint_dashboard(start_date: date, end_date: date) -> dict:
+    '''
+    The complaint dashboard served from the cache for a short while. The key
+    includes the complaint tables' versions, so any complaint write makes the
+    next request compute it afresh.
+    '''
+    key = f"complaint-dashboard:{versions.etag(COMPLAINT_TABLES, start_date, end_date)}"
+    dashboard = cache.get(key)
+    if dashboard is None:
+        dashboard = complaint_dashboard(start_date, end_date)
+        cache.set(key, dashboard, COMPLAINT_DASHBOARD_TIMEOUT)
+    return dashboard
+
+
+# room-keeping tasks in these states count as done by their assignee
+COMPLETED_TASK_STATUSES = ["Ended", "Completed", "Confirmed"]
+
+
+def _hours(duration: timedelta) -> Decimal:
+    return Decimal(duration.total_seconds() / 3600).quantize(Decimal("0.01"))
+
+
+def rebuild_daily_labor(start_date: date, end_date: date) -> int:
+    '''
+    Recomputes the DailyLabor rows for every day in [start_date, end_date]
+    from the shifts worked, read between their start and end stamps, and the
+    room-keeping tasks completed on those days. Time a shift was worked
+    beyond its own scheduled length is overtime, so a missed shift does not
+    offset another that ran over.
+    Returns:
+        int: the number of rows written.
+    '''
+    facts = defaultdict(lambda: defaultdict(int))
+    shifts = (
+        models.ProfileShiftAssign.objects.filter(date__range=(start_date, end_date))
+        .values_list(
+            "profile_id",
+            "profile__department_id",
+            "date",
+            "shift_start_time",
+            "shift_end_time",
+            "time_started",
+            "time_ended",
+        )
+        .iterator(chunk_size=2000)
+    )
+    for profile_id, department_id, day, start, end, started, ended in shifts:
+        row = facts[(day, profile_id)]
+        row["department_id"] = department_id
+        scheduled = (end - start).total_seconds() if start and end else 0
+        row["scheduled"] += scheduled
+        if started and ended and ended > started:
+            worked = (ended - started).total_seconds()
+            row["shifts"] += 1
+            row["worked"] += worked
+            if scheduled:
+                row["overtime"] += max(worked - scheduled, 0)
+    tasks = (
+        models.RoomKeepingAssign.objects.filter(
+            assignment_date__range=(start_date, end_date),
+            current_status__in=COMPLETED_TASK_STATUSES,
+            assigned_to__isnull=False,
+        )
+        .values("assigned_to_id", "assigned_to__department_id", "assignment_date")
+        .annotate(tasks=Count("id"), rooms=Count("room", distinct=True))
+    )
+    for task in tasks:
+        row = facts[(task["assignment_date"], task["assigned_to_id"])]
+        row["department_id"] = task["assigned_to__department_id"]
+        row["tasks"] += task["tasks"]
+        row["rooms"] += task["rooms"]
+
+    rows = [
+        models.DailyLabor(
+            date=day,
+            profile_id=profile_id,
+            department_id=values["department_id"],
+            shifts=values["shifts"],
+            scheduled_hours=_hours(timedelta(seconds=values["scheduled"])),
+            hours_worked=_hours(timedelta(seconds=values["worked"])),
+            overtime_hours=_hours(timedelta(seconds=values["overtime"])),
+            tasks_completed=values["tasks"],
+            rooms_cleaned=values["rooms"],
+        )
+        for (day, profile_id), values in facts.items()
+    ]
+    with transaction.atomic():
+        models.DailyLabor.objects.filter(date__range=(start_date, end_date)).delete()
+        models.DailyLabor.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def refresh_daily_labor() -> dict:
+    '''
+    Rebuilds only the days of shifts and room-keeping tasks changed since
+    the last run and the days invalidated since, then advances the watermark.
+    Returns:
+        dict: the rebuilt window and the number of rows written.
+    '''
+    watermark, _ = models.ReportWatermark.objects.get_or_create(name=DAILY_LABOR_WATERMARK)
+    high_water_mark = timezone.now()
+    changed_shifts = models.ProfileShiftAssign.objects.all()
+    changed_tasks = models.RoomKeepingAssign.objects.all()
+    if watermark.last_processed:
+        # rows are stamped when saved, not when committed, so the overlap
+        # picks up transactions that were still open at the last run
+        since = watermark.last_processed - REPORT_WATERMARK_OVERLAP
+        changed_shifts = changed_shifts.filter(date_modified__gt=since)
+        changed_tasks = changed_tasks.filter(date_modified__gt=since)
+    shift_window = changed_shifts.aggregate(start=Min("date"), end=Max("date"))
+    task_window = changed_tasks.aggregate(start=Min("assignment_date"), end=Max("assignment_date"))
+    start_date, end_date, invalidations = _refresh_window(
+        DAILY_LABOR_WATERMARK,
+        [
+            (shift_window["start"], shift_window["end"]),
+            (task_window["start"], task_window["end"]),
+        ],
+    )
+    summary = {"start_date": start_date, "end_date": end_date, "rows": 0}
+    with transaction.atomic():
+        if start_date:
+            summary["rows"] = rebuild_daily_labor(start_date, end_date)
+        models.ReportInvalidation.objects.filter(id__in=invalidations).delete()
+        watermark.last_processed = high_water_mark
+        watermark.save()
+    return summary
+
+
+LABOR_REPORT_DIMENSIONS = {
+    "department": {"department": "department__name"},
+    "date": {"date": "date"},
+    # grouped by id so namesakes stay apart, with the name to show
+    "staff": {"staff_id": "profile_id", "staff": "profile__full_name"},
+}
+
+
+def labor_report(start_date: date, end_date: date, group_by: list, department_id=None) -> list:
+    '''
+    Reads hours, overtime and productivity from the DailyLabor rollup with a
+    single query.
+    Args:
+        start_date (date): first day of the report.
+        end_date (date): last day of the report.
+        group_by (list): keys of LABOR_REPORT_DIMENSIONS to group the rows by.
+        department_id: limits the report to one department.
+    Returns:
+        list: one dict per group with the summed facts and rooms cleaned per hour.
+    '''
+    columns = {
+        key: field for dimension in group_by for key, field in LABOR_REPORT_DIMENSIONS[dimension].items()
+    }
+    fields = list(columns.values())
+    rows = models.DailyLabor.objects.filter(date__range=(start_date, end_date))
+    if department_id:
+        rows = rows.filter(department_id=department_id)
+    rows = (
+        rows.values(*fields)
+        .annotate(
+            staff_count=Count("profile", distinct=True),
+            shifts=Sum("shifts"),
+            scheduled_hours=Sum("scheduled_hours"),
+            hours_worked=Sum("hours_worked"),
+            overtime_hours=Sum("overtime_hours"),
+            tasks_completed=Sum("tasks_completed"),
+            rooms_cleaned=Sum("rooms_cleaned"),
+        )
+        .order_by(*fields)
+    )
+    report = []
+    for row in rows:
+        hours_worked = row["hours_worked"] or Decimal("0.00")
+        entry = {key: row[field] for key, field in columns.items()}
+        entry.update(
+            staff_count=row["staff_count"],
+            shifts=row["shifts"],
+            scheduled_hours=row["scheduled_hours"],
+            hours_worked=hours_worked,
+            overtime_hours=row["overtime_hours"],
+            tasks_completed=row["tasks_completed"],
+            rooms_cleaned=row["rooms_cleaned"],
+            rooms_cleaned_per_hour=(
+                (row["rooms_cleaned"] / hours_worked).quantize(Decimal("0.01"))
+                if hours_worked
+                else None
+            ),
+        )
+        report.append(entry)
+    return report
@@ -0,0 +1,90 @@
+from decimal import Decimal
+from django.db.models import Count, Q
+from api import models
+from utils import amenities
+
+# query parameter: field the rooms are filtered and grouped on
+ROOM_FACETS = {
+    "floor": "floor__name",
+    "room_view": "room_view__name",
+    "bed_type": "bed_type__name",
+    "room_category": "room_category__name",
+    "room_type": "room_type__name",
+    "occupancy": "max_occupancy",
+}
+
+# band key: (lowest price, price the band stops at)
+PRICE_BANDS = {
+    "0-100": (Decimal("0"), Decimal("100")),
+    "100-200": (Decimal("100"), Decimal("200")),
+    "200-500": (Decimal("200"), Decimal("500")),
+    "500+": (Decimal("500"), None),
+}
+
+
+def _price_band_filter(band: str) -> Q:
+    low, high = PRICE_BANDS[band]
+    condition = Q(current_price__gte=low)
+    if high is not None:
+        condition &= Q(current_price__lt=high)
+    return condition
+
+
+def _filter(rooms, filters: dict, skip: str = None):
+    '''
+    Applies every filter except `skip`. Values of one dimension are OR-ed,
+    dimensions are AND-ed, and all requested amenities must be present.
+    '''
+    for key, field in ROOM_FACETS.items():
+        if filters.get(key) and key != skip:
+            rooms = rooms.filter(**{f"{field}__in": filters[key]})
+    if filters.get("price_band") and skip != "price_band":
+        condition = Q()
+        for band in filters["price_band"]:
+            condition |= _price_band_filter(band)
+        rooms = rooms.filter(condition)
+    if filters.get("amenities"):
+        rooms = amenities.apply_amenity_filter(rooms, filters["resolved_amenities"])
+    return rooms
+
+
+def search_rooms(filters: dict):
+    '''
+    Returns the rooms matching the filters and the facet counts for every
+    dimension. Each dimension is counted with one grouped query that ignores
+    that dimension's own selection, so options stay visible while selected.
+    Args:
+        filters (dict): keys of ROOM_FACETS, "price_band" and "amenities",
+            each mapped to a list of selected values.
+    Returns:
+        tuple: (rooms queryset, facets dict)
+    '''
+    rooms = models.Room.objects.all()
+    if filters.get("amenities"):
+        # names are looked up once, not once per facet query
+        filters = {**filters, "resolved_amenities": amenities.resolve_amenities(filters["amenities"])}
+    facets = {}
+    for key, field in ROOM_FACETS.items():
+        counts = (
+            _filter(rooms, filters, skip=key)
+            .exclude(**{f"{field}__isnull": True})
+            .values_list(field)
+            .annotate(total=Count("id"))
+            .order_by(field)
+        )
+        facets[key] = [{"value": value, "count": total} for value, total in counts]
+    band_counts = _filter(rooms, filters, skip="price_band").aggregate(
+        **{band: Count("id", filter=_price_band_filter(band)) for band in PRICE_BANDS}
+    )
+    facets["price_band"] = [
+        {"value": band, "count": band_counts[band]} for band in PRICE_BANDS
+    ]
+    matching = _filter(rooms, filters)
+    amenity_counts = (
+        models.RoomAmenity.objects.filter(room__in=matching)
+        .values_list("amenity__name")
+        .annotate(total=Count("room_id", distinct=True))
+        .order_by("amenity__name")
+    )
+    facets["amenities"] = [{"value": value, "count": total} for value, total in amenity_counts]
+    return matching, facets
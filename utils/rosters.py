@@ -0,0 +1,272 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from django.db import IntegrityError, transaction
+from django.core.cache import cache
+from django.db.models import Count, FilteredRelation, Q
+from django.utils import timezone
+from rest_framework import serializers
+from api import models
+from utils import defaults, versions
+
+MAX_ROSTER_ENTRIES = 5000
+MAX_CALENDAR_DAYS = 62
+CALENDAR_TIMEOUT = 300
+CALENDAR_TABLES = [models.Profile, models.ProfileShiftAssign, models.RoomKeepingAssign]
+
+
+def shift_times(shift: models.Shift, day: date) -> tuple:
+    '''
+    Returns the start and end of a shift worked on the given day, in the
+    current time zone. A shift ending at or before its start time, e.g.
+    22:00 to 07:00, ends on the next day.
+    '''
+    start = timezone.make_aware(datetime.combine(day, shift.start_time))
+    end = timezone.make_aware(datetime.combine(day, shift.end_time))
+    if end <= start:
+        end = timezone.make_aware(datetime.combine(day + timedelta(days=1), shift.end_time))
+    return start, end
+
+
+def overlapping(assignments, start, end):
+    '''
+    Narrows assignments to those whose interval overlaps [start, end). The
+    (profile, start, end) index turns this into a range scan per person.
+    '''
+    return assignments.filter(shift_start_time__lt=end, shift_end_time__gt=start)
+
+
+def expand_pattern(profile_ids, shift, start_date: date, end_date: date, weekdays=None) -> list:
+    '''
+    Turns a staff x dates x shift pattern into roster entries.
+    Args:
+        weekdays (list): the days of the week to roster, 0 for Monday. Defaults to every day.
+    Returns:
+        list: (profile_id, date, shift) entries.
+    '''
+    days = [
+        start_date + timedelta(days=offset)
+        for offset in range((end_date - start_date).days + 1)
+    ]
+    return [
+        (profile_id, day, shift)
+        for day in days
+        if weekdays is None or day.weekday() in weekdays
+        for profile_id in profile_ids
+    ]
+
+
+def pattern_size(profile_count: int, start_date: date, end_date: date, weekdays=None) -> int:
+    '''
+    The number of entries expand_pattern would return, worked out without
+    building them so oversized patterns are refused cheaply.
+    '''
+    days = (end_date - start_date).days + 1
+    if days <= 0:
+        return 0
+    if weekdays is None:
+        return profile_count * days
+    weekdays = set(weekdays)
+    weeks, rest = divmod(days, 7)
+    rostered = weeks * len(weekdays & set(range(7))) + sum(
+        (start_date.weekday() + offset) % 7 in weekdays for offset in range(rest)
+    )
+    return profile_count * rostered
+
+
+def find_conflicts(entries: list) -> list:
+    '''
+    Checks roster entries against each other and against the assignments
+    already made for the same staff in the period, which are read once.
+    Returns:
+        list: one dict per entry that duplicates or overlaps another shift,
+            with the entry's position in the roster.
+    '''
+    if not entries:
+        return []
+    intervals = [shift_times(shift, day) for _, day, shift in entries]
+    existing = overlapping(
+        models.ProfileShiftAssign.objects.filter(
+            profile_id__in={profile_id for profile_id, _, _ in entries}
+        ),
+        min(start for start, _ in intervals),
+        max(end for _, end in intervals),
+    ).values_list("profile_id", "date", "shift_id", "shift_start_time", "shift_end_time")
+    booked = defaultdict(list)
+    for profile_id, day, shift_id, start, end in existing:
+        booked[profile_id].append((day, shift_id, start, end))
+    conflicts = []
+    for position, (profile_id, day, shift) in enumerate(entries):
+        start, end = intervals[position]
+        clash = next(
+            (
+                (other_day, other_shift_id)
+                for other_day, other_shift_id, other_start, other_end in booked[profile_id]
+                if (other_day, other_shift_id) == (day, shift.id)
+                or (start < other_end and other_start < end)
+            ),
+            None,
+        )
+        if clash:
+            conflicts.append(
+                {
+                    "entry": position,
+                    "profile": profile_id,
+                    "date": day,
+                    "shift": shift.name,
+                    "reason": "duplicate" if clash == (day, shift.id) else "overlap",
+                }
+            )
+            continue
+        booked[profile_id].append((day, shift.id, start, end))
+    return conflicts
+
+
+def generate_roster(entries: list, created_by: models.Profile, status=None, skip_conflicts=False) -> dict:
+    '''
+    Creates the shift assignments of a roster with one batch insert. The
+    author's rights and the staff's department are checked once for the
+    whole roster and conflicts are found in memory.
+    Args:
+        entries (list): (profile_id, date, shift) entries.
+        created_by (models.Profile): the supervisor making the roster.
+        status (models.ShiftStatus): the status of the new assignments, Pending by default.
+        skip_conflicts (bool): create the entries that do not conflict instead of
+            rejecting the whole roster.
+    Returns:
+        dict: the assignments created and the conflicting entries skipped.
+    Raises:
+        ValidationError: if the roster is invalid, or conflicts and skip_conflicts is False.
+    '''
+    if len(entries) > MAX_ROSTER_ENTRIES:
+        raise serializers.ValidationError(
+            {"error": f"a roster can have at most {MAX_ROSTER_ENTRIES} assignments"}
+        )
+    if not created_by.roles.exclude(role__name__iexact="staff").exists():
+        raise serializers.ValidationError(
+            {"error": "Your account role does not have the authorization to perform this action"}
+        )
+    if any(day < timezone.localdate() for _, day, _ in entries):
+        raise serializers.ValidationError(
+            {"error": "you are trying to assign a shift for a past date."}
+        )
+    profile_ids = {profile_id for profile_id, _, _ in entries}
+    departments = dict(
+        models.Profile.objects.filter(id__in=profile_ids).values_list("id", "department_id")
+    )
+    outsiders = [
+        str(profile_id)
+        for profile_id in profile_ids
+        if profile_id not in departments or departments[profile_id] != created_by.department_id
+    ]
+    if outsiders:
+        raise serializers.ValidationError(
+            {"error": f"staff not in your department: {', '.join(sorted(outsiders))}"}
+        )
+    status = status or defaults.get_reference_default("ShiftStatus", "Pending")
+    with transaction.atomic():
+        conflicts = find_conflicts(entries)
+        if conflicts and not skip_conflicts:
+            raise serializers.ValidationError({"error": "the roster has conflicts", "conflicts": conflicts})
+        clashing = {conflict["entry"] for conflict in conflicts}
+        assignments = []
+        for position, (profile_id, day, shift) in enumerate(entries):
+            if position in clashing:
+                continue
+            start, end = shift_times(shift, day)
+            assignment = models.ProfileShiftAssign(
+                department_id=created_by.department_id,
+                profile_id=profile_id,
+                date=day,
+                shift=shift,
+                shift_start_time=start,
+                shift_end_time=end,
+                status=status,
+                created_by=created_by,
+            )
+            # bulk_create skips save(), which schedules the shift's lifecycle
+            assignment.next_transition_at = assignment.next_transition()
+            assignments.append(assignment)
+        try:
+            models.ProfileShiftAssign.objects.bulk_create(assignments, batch_size=1000)
+            versions.bump(models.ProfileShiftAssign)
+        except IntegrityError:
+            # another roster took one of these slots since the check; the
+            # transaction is rolled back as the error leaves it
+            raise serializers.ValidationError(
+                {"error": "the roster overlaps shifts assigned in the meantime, please retry"}
+            )
+    return {"created": assignments, "skipped": conflicts}
+
+
+def roster_calendar(department_id, start_date: date, end_date: date) -> dict:
+    '''
+    Builds the staff x day grid of a department's shifts with one query: the
+    department's staff joined to their shifts in the window, with each
+    shift's status and room-keeping task count. Staff without shifts get
+    empty rows.
+    Returns:
+        dict: the days of the window and one row per staff member, whose
+            `shifts` hold a list of shifts for each day, in day order.
+    '''
+    days = [
+        start_date + timedelta(days=offset)
+        for offset in range((end_date - start_date).days + 1)
+    ]
+    position = {day: index for index, day in enumerate(days)}
+    cells = (
+        models.Profile.objects.filter(department_id=department_id)
+        .annotate(
+            window_shift=FilteredRelation(
+                "shifts", condition=Q(shifts__date__range=(start_date, end_date))
+            )
+        )
+        .values(
+            "id",
+            "full_name",
+            "window_shift__id",
+            "window_shift__date",
+            "window_shift__shift__name",
+            "window_shift__status__name",
+            "window_shift__shift_start_time",
+            "window_shift__shift_end_time",
+        )
+        .annotate(tasks=Count("window_shift__room_keeping_assignments"))
+        .order_by("full_name", "id", "window_shift__shift_start_time")
+    )
+    staff = {}
+    for cell in cells:
+        row = staff.setdefault(
+            cell["id"],
+            {
+                "profile": cell["id"],
+                "employee_name": cell["full_name"],
+                "shifts": [[] for _ in days],
+            },
+        )
+        if cell["window_shift__id"] is None:
+            continue
+        row["shifts"][position[cell["window_shift__date"]]].append(
+            {
+                "id": cell["window_shift__id"],
+                "shift": cell["window_shift__shift__name"],
+                "status": cell["window_shift__status__name"],
+                "shift_start_time": cell["window_shift__shift_start_time"],
+                "shift_end_time": cell["window_shift__shift_end_time"],
+                "tasks": cell["tasks"],
+            }
+        )
+    return {"days": days, "staff": list(staff.values())}
+
+
+def cached_roster_calendar(department_id, start_date: date, end_date: date) -> dict:
+    '''
+    The roster calendar served from the cache. The key includes the versions
+    of the staff, shift and room-keeping tables, so any write to them makes
+    the next request build it afresh.
+    '''
+    key = f"roster-calendar:{versions.etag(CALENDAR_TABLES, department_id, start_date, end_date)}"
+    calendar = cache.get(key)
+    if calendar is None:
+        calendar = roster_calendar(department_id, start_date, end_date)
+        cache.set(key, calendar, CALENDAR_TIMEOUT)
+    return calendar
@@ -0,0 +1,145 @@
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from api import models
+from utils import defaults, reference, versions
+
+LIFECYCLE_BATCH_SIZE = 1000
+# room-keeping tasks in these states are left alone when their shift expires
+FINISHED_TASK_STATUSES = ["Ended", "Completed", "Confirmed", "Faulty", "Cancelled", "Unfinished"]
+UNFINISHED_TASK_STATUS = "Unfinished"
+
+
+def _statuses(status_ids) -> dict:
+    statuses = {
+        status_id: reference.get(models.ShiftStatus, status_id)
+        for status_id in set(status_ids) - {None}
+    }
+    missing = [status_id for status_id, status in statuses.items() if status is None]
+    if missing:
+        statuses.update(models.ShiftStatus.objects.in_bulk(missing))
+    return statuses
+
+
+def advance_shifts(now=None, batch_size: int = LIFECYCLE_BATCH_SIZE) -> dict:
+    '''
+    Moves one batch of shifts due for a transition along their lifecycle with
+    a fixed number of statements, reading only the shifts whose next
+    transition time has passed. Scheduled shifts whose start has come are
+    started. Shifts whose end has passed stop being scheduled, are expired if
+    their status changes after expiry and leave their unfinished room-keeping
+    tasks "Unfinished".
+    Returns:
+        dict: the number of shifts read, started and expired and of tasks left unfinished.
+    '''
+    now = now or timezone.now()
+    with transaction.atomic():
+        # skip_locked lets an overlapping run take the next batch instead of waiting
+        due = list(
+            models.ProfileShiftAssign.objects.filter(next_transition_at__lte=now)
+            .select_for_update(skip_locked=True)
+            .order_by("next_transition_at")
+            .values("id", "profile_id", "date", "status_id", "shift_end_time")[:batch_size]
+        )
+        summary = {"due": len(due), "started": 0, "expired": 0, "unfinished_tasks": 0}
+        if not due:
+            return summary
+        started_status = defaults.get_reference_default(
+            "ShiftStatus", models.ProfileShiftAssign.STARTED_STATUS
+        )
+        expired_status = defaults.get_reference_default(
+            "ShiftStatus", models.ProfileShiftAssign.EXPIRED_STATUS
+        )
+        statuses = _statuses(row["status_id"] for row in due)
+        starting, running, expiring, ending = [], [], [], []
+        for row in due:
+            status = statuses.get(row["status_id"])
+            if row["shift_end_time"] is None or row["shift_end_time"] <= now:
+                (expiring if status is None or status.change_after_expiry else ending).append(row)
+            elif status is None or status.name == models.ProfileShiftAssign.SCHEDULED_STATUS:
+                starting.append(row)
+            else:
+                # started by hand before its start time
+                running.append(row)
+        shifts = models.ProfileShiftAssign.objects.all()
+        if starting:
+            shifts.filter(id__in=[row["id"] for row in starting]).update(
+                status=started_status, next_transition_at=F("shift_end_time"), date_modified=now
+            )
+        if running:
+            shifts.filter(id__in=[row["id"] for row in running]).update(
+                next_transition_at=F("shift_end_time")
+            )
+        if expiring:
+            shifts.filter(id__in=[row["id"] for row in expiring]).update(
+                status=expired_status, next_transition_at=None, date_modified=now
+            )
+        if ending:
+            shifts.filter(id__in=[row["id"] for row in ending]).update(next_transition_at=None)
+        models.OutboxEvent.objects.publish_many(
+            "shift.status_changed",
+            [
+                (
+                    models.ProfileShiftAssign(id=row["id"]),
+                    {
+                        "profile": row["profile_id"],
+                        "date": row["date"],
+                        "previous_status": getattr(statuses.get(row["status_id"]), "name", None),
+                        "status": new_status.name,
+                        "changed_by": None,
+                    },
+                )
+                for rows, new_status in ((starting, started_status), (expiring, expired_status))
+                for row in rows
+            ],
+        )
+        summary["started"], summary["expired"] = len(starting), len(expiring)
+        summary["unfinished_tasks"] = _leave_tasks_unfinished(
+            [row["id"] for row in expiring + ending], now
+        )
+        # bulk writes send no signals
+        versions.bump(models.ProfileShiftAssign, models.RoomKeepingAssign)
+    return summary
+
+
+def _leave_tasks_unfinished(shift_ids, now) -> int:
+    if not shift_ids:
+        return 0
+    tasks = list(
+        models.RoomKeepingAssign.objects.filter(member_shift_id__in=shift_ids)
+        .exclude(current_status__in=FINISHED_TASK_STATUSES)
+        .select_related("room")
+    )
+    if not tasks:
+        return 0
+    unfinished = defaults.get_reference_default("HouseKeepingState", UNFINISHED_TASK_STATUS)
+    models.RoomKeepingAssign.objects.filter(id__in=[task.id for task in tasks]).update(
+        current_status=unfinished.name, date_modified=now
+    )
+    models.ProcessRoomKeeping2.objects.bulk_create(
+        [
+            models.ProcessRoomKeeping2(
+                room_keeping_assign=task,
+                room_number=task.room.room_number,
+                status=unfinished,
+            )
+            for task in tasks
+        ]
+    )
+    models.OutboxEvent.objects.publish_many(
+        "room_keeping.status_changed",
+        [
+            (
+                task,
+                {
+                    "room": task.room_id,
+                    "room_number": task.room.room_number,
+                    "previous_status": task.current_status,
+                    "status": unfinished.name,
+                    "changed_by": None,
+                },
+            )
+            for task in tasks
+        ],
+    )
+    return len(tasks)
@@ -0,0 +1,54 @@
+import hashlib
+from uuid import uuid4
+from django.core.cache import cache
+from django.db import transaction
+
+KEY_PREFIX = "table-version"
+
+
+def _key(model) -> str:
+    return f"{KEY_PREFIX}:{model._meta.db_table}"
+
+
+def get_versions(*tables) -> dict:
+    '''
+    Returns the current change version of each model's table from the cache.
+    A table seen for the first time, or evicted from the cache, gets a fresh
+    random version so an old ETag can never match it again.
+    Args:
+        tables: the model classes to read versions for.
+    Returns:
+        dict: {cache key: version}
+    '''
+    keys = [_key(model) for model in tables]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            # add() keeps whichever process got there first
+            cache.add(key, uuid4().hex, None)
+            versions[key] = cache.get(key)
+    return versions
+
+
+def bump(*tables):
+    '''
+    Gives each model's table a new change version once the current transaction
+    commits, so readers never pair a new version with uncommitted data.
+    Queryset update()/bulk_create() do not send signals and must call this.
+    '''
+    keys = [_key(model) for model in tables]
+    transaction.on_commit(
+        lambda: cache.set_many({key: uuid4().hex for key in keys}, None)
+    )
+
+
+def etag(tables, *parts) -> str:
+    '''
+    Builds an entity tag from the versions of the tables a response is read
+    from plus anything else it varies on, e.g. the query string.
+    '''
+    versions = get_versions(*tables)
+    digest = hashlib.sha1(
+        "|".join([*(f"{key}={versions[key]}" for key in sorted(versions)), *map(str, parts)]).encode()
+    ).hexdigest()
+    return f'"{digest}"'